@@ -0,0 +1,343 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+
+# Make src modules importable when run from the repository root
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(ROOT, 'src'))
+
+import soundfile as sf
+
+from stub_llm import stub_report
+from synthetic_audio import fixture_path
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+DEFAULT_DURATIONS = [10, 60, 300, 1800]
+ALL_STAGES = ["convert_to_wav", "load_audio", "load_audio_librosa", "acoustic_pyin", "acoustic_fast",
+              "transcribe", "text", "report"]
+
+
+def current_rss():
+    """
+    Resident set size of this process in bytes, or None if it can't be determined.
+    """
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class StageMeter:
+    def __init__(self, interval=0.01):
+        """
+        Context manager measuring wall time, CPU time and peak RSS of the enclosed block.
+        Peak RSS is sampled on a background thread every `interval` seconds.
+        """
+        self.interval = interval
+        self.wall_sec = None
+        self.cpu_sec = None
+        self.peak_rss = None
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.is_set():
+            rss = current_rss()
+            if rss is not None:
+                self.peak_rss = max(self.peak_rss or 0, rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak_rss = current_rss()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        self.cpu_sec = time.process_time() - self._cpu_start
+        self.wall_sec = time.perf_counter() - self._wall_start
+        self._stop.set()
+        self._sampler.join()
+        rss = current_rss()
+        if rss is not None:
+            self.peak_rss = max(self.peak_rss or 0, rss)
+        return False
+
+
+class StubLLMClient:
+    """
+    Stands in for a provider client so the report stage can be timed without network access.
+    """
+    model_id = "stub"
+
+    def generate_json(self, prompt, audio_path=None, audio=None, system=None, usage=None):
+        # Same signature as the real clients: a mismatch would make Reporter fall back silently
+        if usage is not None:
+            usage.update(prompt_tokens=(len(system or "") + len(prompt)) // 4, cached_prompt_tokens=0,
+                         completion_tokens=200)
+        return stub_report()
+
+
+def word_error_rate(reference, hypothesis):
+    """
+    Word-level edit distance divided by the reference length, ignoring case and punctuation.
+    Returns None when the reference has no words.
+    """
+    def words(text):
+        return "".join(c.lower() if c.isalnum() or c.isspace() else " " for c in text).split()
+
+    ref, hyp = words(reference), words(hypothesis)
+    if not ref:
+        return None
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def load_transcriber(model_size, precision, threads, state):
+    """
+    Loads (once per precision) and returns a Transcriber, recording its load cost and resident size.
+    """
+    transcribers = state.setdefault("transcribers", {})
+    if precision not in transcribers:
+        from transcriber import Transcriber
+        from model_registry import _model_size_bytes
+        rss_before = current_rss()
+        with StageMeter() as meter:
+            transcribers[precision] = Transcriber(model_size=model_size, precision=precision, threads=threads)
+        rss_after = current_rss()
+        state.setdefault("model_load", []).append({
+            "stage": "model_load", "precision": precision, "duration_sec": None,
+            "wall_sec": meter.wall_sec, "cpu_sec": meter.cpu_sec,
+            "peak_rss_mb": meter.peak_rss / (1024 * 1024) if meter.peak_rss else None,
+            "rss_delta_mb": (rss_after - rss_before) / (1024 * 1024) if rss_before and rss_after else None,
+            "model_size_mb": _model_size_bytes(transcribers[precision]) / (1024 * 1024)
+        })
+    return transcribers[precision]
+
+
+def compare_precisions(results, model_load):
+    """
+    Compares each precision's transcribe stage with the first one listed (the reference):
+    weight memory saved, speedup, and word error rate of its transcript against the reference transcript.
+    """
+    sizes = {row["precision"]: row["model_size_mb"] for row in model_load}
+    by_fixture = {}
+    for row in results:
+        if "precision" in row:
+            by_fixture.setdefault(row["fixture"], []).append(row)
+
+    comparison = []
+    print("\n--- Precision comparison ---")
+    print(f"{'fixture':<28} {'precision':<9} {'memory saved':>13} {'speedup':>8} {'WER':>7}")
+    for fixture, rows in by_fixture.items():
+        reference = rows[0]
+        for row in rows[1:]:
+            wer = word_error_rate(reference["transcript"], row["transcript"])
+            entry = {
+                "fixture": fixture,
+                "reference": reference["precision"],
+                "precision": row["precision"],
+                "memory_saved_mb": sizes[reference["precision"]] - sizes[row["precision"]],
+                "speedup": reference["wall_sec"] / row["wall_sec"] if row["wall_sec"] else None,
+                "wer_vs_reference": wer
+            }
+            comparison.append(entry)
+            wer_text = f"{wer:.1%}" if wer is not None else "n/a"
+            print(f"{fixture:<28} {row['precision']:<9} {entry['memory_saved_mb']:>10.0f} MB {entry['speedup']:>7.2f}x {wer_text:>7}")
+    return comparison
+
+
+def run_stages(path, duration, stages, model_size, state, precisions=("fp32",), threads=None):
+    """
+    Runs the selected stages on one fixture and returns one result row per stage.
+    The transcribe stage runs once per precision; precisions other than fp32 are reported
+    as transcribe_<precision> so fp32 rows stay comparable with older baselines.
+    """
+    from audio_processor import AudioProcessor
+    from analyzer import AcousticAnalyzer, TextAnalyzer
+    from reporter import Reporter
+
+    processor = AudioProcessor()
+    rows = []
+
+    def record(stage, func):
+        print(f"  {stage}...", end=" ", flush=True)
+        with StageMeter() as meter:
+            result = func()
+        print(f"{meter.wall_sec:.2f}s")
+        rows.append({
+            "duration_sec": duration,
+            "stage": stage,
+            "wall_sec": meter.wall_sec,
+            "cpu_sec": meter.cpu_sec,
+            "peak_rss_mb": meter.peak_rss / (1024 * 1024) if meter.peak_rss else None,
+            "realtime_factor": meter.wall_sec / duration
+        })
+        return result
+
+    if "convert_to_wav" in stages:
+        wav_path = record("convert_to_wav", lambda: processor.convert_to_wav(path))
+        os.remove(wav_path)
+    if "load_audio_librosa" in stages:
+        record("load_audio_librosa", lambda: processor.load_audio_librosa(path))
+
+    # Every later stage needs the decoded buffer, so decode even if the stage itself isn't being timed
+    if "load_audio" in stages:
+        y, sr = record("load_audio", lambda: processor.load_audio(path))
+    else:
+        y, sr = processor.load_audio(path)
+
+    acoustic_metrics = None
+    for mode in ("pyin", "fast"):
+        if f"acoustic_{mode}" in stages:
+            analyzer = AcousticAnalyzer(pitch_mode=mode)
+            acoustic_metrics = record(f"acoustic_{mode}", lambda: analyzer.analyze(y, sr))
+
+    transcript_data = {"text": "", "segments": [], "language": "en"}
+    if "transcribe" in stages:
+        for i, precision in enumerate(precisions):
+            transcriber = load_transcriber(model_size, precision, threads, state)
+            stage = "transcribe" if precision == "fp32" else f"transcribe_{precision}"
+            data = record(stage, lambda: transcriber.transcribe(y, language="en"))
+            rows[-1].update({"precision": precision, "fixture": os.path.basename(path), "transcript": data["text"]})
+            if i == 0:
+                transcript_data = data
+
+    text_metrics = {}
+    if "text" in stages:
+        text_metrics = record("text", lambda: TextAnalyzer().analyze(transcript_data))
+
+    if "report" in stages:
+        reporter = Reporter(api_key=None, provider="none")
+        reporter.client = StubLLMClient()
+        reporter.provider = "stub"
+        record("report", lambda: reporter.generate_report(
+            transcript_data["text"], acoustic_metrics or {}, text_metrics, audio=(y, sr)))
+        # Otherwise the stage silently timed the local fallback instead of the LLM path
+        assert not reporter.used_fallback, "Report stage fell back to the local report; check StubLLMClient"
+
+    return rows
+
+
+def compare(results, baseline, tolerance, min_delta=0.05):
+    """
+    Compares wall time per (duration, stage) against a baseline report.
+    Returns a list of regressions slower than baseline by more than `tolerance` (fraction)
+    and by at least `min_delta` seconds, so sub-millisecond stages don't flap.
+    """
+    reference = {(row["duration_sec"], row["stage"]): row for row in baseline.get("results", [])}
+    regressions = []
+    print("\n--- Comparison against baseline ---")
+    print(f"{'duration':>9} {'stage':<20} {'baseline':>10} {'current':>10} {'change':>8}")
+    for row in results:
+        ref = reference.get((row["duration_sec"], row["stage"]))
+        if ref is None or not ref.get("wall_sec"):
+            continue
+        change = row["wall_sec"] / ref["wall_sec"] - 1
+        flag = ""
+        if change > tolerance and row["wall_sec"] - ref["wall_sec"] >= min_delta:
+            flag = "  REGRESSION"
+            regressions.append({"duration_sec": row["duration_sec"], "stage": row["stage"],
+                                "baseline_sec": ref["wall_sec"], "current_sec": row["wall_sec"], "change": change})
+        print(f"{row['duration_sec']:>8}s {row['stage']:<20} {ref['wall_sec']:>9.2f}s {row['wall_sec']:>9.2f}s {change:>+7.0%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the analysis pipeline stages on synthetic audio")
+    parser.add_argument("--durations", help="Comma-separated fixture durations in seconds", default=",".join(str(d) for d in DEFAULT_DURATIONS))
+    parser.add_argument("--stages", help="Comma-separated stages to run", default=",".join(ALL_STAGES))
+    parser.add_argument("--model", help="Whisper model size for the transcribe stage", default="tiny")
+    parser.add_argument("--precisions", help="Comma-separated Whisper precisions to transcribe with (fp32, int8); the first is the reference for speedup and WER", default="fp32")
+    parser.add_argument("--threads", help="torch threads for Whisper inference", type=int, default=None)
+    parser.add_argument("--audio", help="Extra recordings (e.g. real speech, for a meaningful WER) to run alongside the fixtures", nargs="*", default=[])
+    parser.add_argument("--fixtures_dir", help="Where generated WAV fixtures are cached", default=os.path.join(ROOT, "benchmarks", "fixtures"))
+    parser.add_argument("--output", help="Where to write the JSON report", default=os.path.join(ROOT, "output", "benchmark.json"))
+    parser.add_argument("--baseline", help="Baseline JSON report to compare against", default=os.path.join(ROOT, "benchmarks", "baseline.json"))
+    parser.add_argument("--tolerance", help="Allowed slowdown vs baseline before flagging a regression (0.2 = 20%%)", type=float, default=0.2)
+    parser.add_argument("--min_delta", help="Ignore slowdowns smaller than this many seconds", type=float, default=0.05)
+    parser.add_argument("--no_warmup", help="Skip the untimed warm-up pass (imports, numba JIT, model load)", action="store_true")
+    parser.add_argument("--update_baseline", help="Write this run's results as the new baseline", action="store_true")
+
+    args = parser.parse_args()
+
+    durations = [int(d) for d in args.durations.split(",") if d]
+    stages = [s for s in args.stages.split(",") if s]
+    unknown = set(stages) - set(ALL_STAGES)
+    if unknown:
+        parser.error(f"Unknown stage(s): {', '.join(sorted(unknown))}. Choose from: {', '.join(ALL_STAGES)}")
+
+    precisions = [p for p in args.precisions.split(",") if p]
+    state = {}
+    results = []
+
+    if not args.no_warmup:
+        # First calls pay for lazy imports and librosa's numba JIT; keep that out of the measurements
+        print("Warm-up (not recorded)...")
+        run_stages(fixture_path(2, args.fixtures_dir), 2, stages, args.model, state, precisions, args.threads)
+
+    inputs = [(fixture_path(duration, args.fixtures_dir), duration) for duration in durations]
+    for path in args.audio:
+        inputs.append((path, round(sf.info(path).duration, 1)))
+
+    for path, duration in inputs:
+        print(f"Fixture: {duration}s ({path})")
+        results.extend(run_stages(path, duration, stages, args.model, state, precisions, args.threads))
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "model": args.model,
+            "precisions": precisions,
+            "threads": args.threads
+        },
+        "results": results
+    }
+    if "model_load" in state:
+        report["model_load"] = state["model_load"]
+        if len(precisions) > 1:
+            report["precision_comparison"] = compare_precisions(results, state["model_load"])
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.min_delta)
+    report["regressions"] = regressions
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"\nReport saved to {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=4)
+        print(f"Baseline updated: {args.baseline}")
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
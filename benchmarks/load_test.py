@@ -0,0 +1,428 @@
+import argparse
+import io
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+# Make src modules importable when run from the repository root
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(ROOT, 'src'))
+
+import numpy as np
+import soundfile as sf
+
+from stub_llm import StubLLMServer
+from synthetic_audio import SAMPLE_RATE, synthesize_speech_like
+from tts_cache import StubSynthesizer
+
+# Outcomes that mean the server returned someone else's data or a damaged file
+CORRUPTION_OUTCOMES = ("mismatch", "corrupt")
+
+
+class Fixture:
+    def __init__(self, seed, duration_sec):
+        """
+        A generated speech-like WAV held in memory. Each seed is a different recording, so the result
+        cache doesn't turn repeated uploads into hits.
+        """
+        y = synthesize_speech_like(duration_sec, seed=seed)
+        buffer = io.BytesIO()
+        sf.write(buffer, y, SAMPLE_RATE, format="WAV", subtype="PCM_16")
+        self.name = f"load_{seed}.wav"
+        self.data = buffer.getvalue()
+        self.duration_sec = len(y) / SAMPLE_RATE
+
+
+class Recorder:
+    def __init__(self):
+        self.results = []  # (endpoint, started_at, latency_sec, outcome, extra)
+        self._lock = threading.Lock()
+
+    def add(self, endpoint, started_at, outcome, extra=None):
+        latency = time.perf_counter() - started_at
+        with self._lock:
+            self.results.append((endpoint, started_at, latency, outcome, extra or {}))
+
+    def summary(self, elapsed):
+        with self._lock:
+            results = list(self.results)
+        endpoints = {}
+        for endpoint in sorted({r[0] for r in results}):
+            rows = [r for r in results if r[0] == endpoint]
+            ok = [r for r in rows if r[3] == "ok"]
+            errors = {}
+            error_samples = {}
+            for r in rows:
+                if r[3] != "ok":
+                    errors[r[3]] = errors.get(r[3], 0) + 1
+                    if "error" in r[4]:
+                        error_samples.setdefault(r[3], r[4]["error"])
+            stats = {
+                "requests": len(rows),
+                "ok": len(ok),
+                "errors": errors,
+                "error_samples": error_samples,
+                "error_rate": (len(rows) - len(ok)) / len(rows),
+                "throughput_rps": len(ok) / elapsed if elapsed else 0.0,
+                "latency_ms": _percentiles([r[2] * 1000 for r in ok])
+            }
+            waits = [r[4]["queue_wait_sec"] * 1000 for r in ok if "queue_wait_sec" in r[4]]
+            if waits:
+                stats["queue_wait_ms"] = _percentiles(waits)
+            endpoints[endpoint] = stats
+        return endpoints
+
+
+class MemorySampler:
+    def __init__(self, base_url, interval=1.0):
+        """
+        Polls the server's memory every `interval` seconds: /workers (serve.py, all workers) or
+        /memory (a single app.py process).
+        """
+        self.base_url = base_url
+        self.interval = interval
+        self.samples = []  # (seconds since start, rss_bytes, pss_bytes)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="memory-sampler", daemon=True)
+
+    def start(self):
+        self._start = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            memory = _server_memory(self.base_url)
+            if memory:
+                self.samples.append((time.perf_counter() - self._start, memory.get("rss_bytes", 0), memory.get("pss_bytes", 0)))
+            self._stop.wait(self.interval)
+
+    def summary(self):
+        if not self.samples:
+            return None
+        rss = [s[1] for s in self.samples]
+        pss = [s[2] for s in self.samples]
+        mb = 1024 * 1024
+        return {
+            "rss_start_mb": rss[0] / mb,
+            "rss_peak_mb": max(rss) / mb,
+            "rss_end_mb": rss[-1] / mb,
+            "pss_peak_mb": max(pss) / mb,
+            "samples": [[round(t, 2), r, p] for t, r, p in self.samples]
+        }
+
+
+def _server_memory(base_url):
+    status, body = _request(f"{base_url}/workers", timeout=5)
+    if status == 200:
+        return body["totals"]
+    status, body = _request(f"{base_url}/memory", timeout=5)
+    return body if status == 200 else None
+
+
+def _request(url, data=None, headers=None, timeout=60, raw=False):
+    """
+    Returns (status, parsed JSON body or raw bytes); status 0 for connection errors.
+    """
+    request = urllib.request.Request(url, data=data, headers=headers or {})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            content = response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        content = e.read()
+        status = e.code
+    except (OSError, ValueError):
+        return 0, None
+    if raw:
+        return status, content
+    try:
+        return status, json.loads(content)
+    except ValueError:
+        return status, None
+
+
+def _multipart(fields, file_field, filename, data):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+                 f'Content-Type: audio/wav\r\n\r\n'.encode() + data + b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+
+
+def analyze_once(base_url, fixture, recorder, args):
+    """
+    One /analyze round trip: upload, then poll the job until it finishes. Checks that the result
+    describes the uploaded recording (duration), which catches buffers mixed up between requests.
+    """
+    started_at = time.perf_counter()
+    fields = {"model_size": args.model, "language": "en", "pitch_mode": args.pitch_mode,
+              "ai_feedback": "0" if args.no_ai_feedback else "1"}
+    body, headers = _multipart(fields, "audio", fixture.name, fixture.data)
+    status, submitted = _request(f"{base_url}/analyze", data=body, headers=headers, timeout=args.timeout)
+    if status == 429:
+        return recorder.add("analyze", started_at, "rejected")
+    if status != 202 or not submitted:
+        return recorder.add("analyze", started_at, f"http_{status}", _error(submitted))
+
+    deadline = started_at + args.timeout
+    while True:
+        time.sleep(args.poll_interval)
+        status, job = _request(f"{base_url}{submitted['status_url']}", timeout=args.timeout)
+        if status != 200 or not job:
+            return recorder.add("analyze", started_at, f"poll_http_{status}")
+        if job["status"] in ("done", "failed"):
+            break
+        if time.perf_counter() > deadline:
+            return recorder.add("analyze", started_at, "timeout")
+
+    extra = {"queue_wait_sec": (job.get("started_at") or job["created_at"]) - job["created_at"]}
+    if job["status"] == "failed":
+        return recorder.add("analyze", started_at, "failed", dict(extra, error=job.get("error")))
+    duration = job["result"]["metrics"]["acoustic"]["duration_sec"]
+    if abs(duration - fixture.duration_sec) > 0.05:
+        return recorder.add("analyze", started_at, "mismatch", extra)
+    recorder.add("analyze", started_at, "ok", extra)
+
+
+def tts_once(base_url, text, recorder, args):
+    """
+    One /tts round trip including the audio download. With the stub synthesizer the clip length
+    is known from the text, so a file overwritten or served for another request is caught.
+    """
+    started_at = time.perf_counter()
+    status, body = _request(f"{base_url}/tts", data=json.dumps({"text": text}).encode(),
+                            headers={"Content-Type": "application/json"}, timeout=args.timeout)
+    if status != 200 or not body:
+        return recorder.add("tts", started_at, f"http_{status}", _error(body))
+    status, audio = _request(f"{base_url}{body['audio_url']}", timeout=args.timeout, raw=True)
+    if status != 200:
+        return recorder.add("tts", started_at, f"audio_http_{status}")
+    if args.verify_tts:
+        try:
+            frames = sf.info(io.BytesIO(audio)).frames
+        except RuntimeError:
+            frames = None
+        if frames != StubSynthesizer.expected_frames(text):
+            return recorder.add("tts", started_at, "corrupt")
+    recorder.add("tts", started_at, "ok")
+
+
+def run_load(base_url, fixtures, texts, args):
+    """
+    Runs `concurrency` virtual users for `duration` seconds. Each picks /analyze or /tts by the
+    mix weights for every request and starts the next one as soon as the last finishes.
+    """
+    recorder = Recorder()
+    weights = _parse_mix(args.mix)
+    endpoints = list(weights)
+    deadline = time.perf_counter() + args.duration
+
+    def user(index):
+        rng = random.Random(index)
+        while time.perf_counter() < deadline:
+            endpoint = rng.choices(endpoints, weights=[weights[e] for e in endpoints])[0]
+            try:
+                if endpoint == "analyze":
+                    analyze_once(base_url, rng.choice(fixtures), recorder, args)
+                else:
+                    tts_once(base_url, rng.choice(texts), recorder, args)
+            except Exception as e:
+                recorder.add(endpoint, time.perf_counter(), f"client_{type(e).__name__}")
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=user, args=(i,), name=f"user-{i}") for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder.summary(time.perf_counter() - start), time.perf_counter() - start
+
+
+def start_server(args, stub):
+    """
+    Starts src/web/serve.py on a free port with the LLM pointed at the stub server and the stub
+    TTS synthesizer, and waits until /healthz reports ready (models loaded and warmed).
+    """
+    port = args.port or _free_port()
+    env = dict(os.environ)
+    env.update({
+        "GROQ_API_KEY": "gsk_loadtest",
+        "GROQ_BASE_URL": stub.url,
+        "GEMINI_BASE_URL": stub.url,
+        "LLM_MAX_RETRIES": str(args.llm_retries),
+        "TTS_SYNTHESIZER": "stub",
+        "TTS_STUB_DELAY_SEC": str(args.tts_latency),
+        "TTS_STUB_ERROR_RATE": str(args.tts_error_rate),
+    })
+    # An explicit PRELOAD_MODELS (even empty) wins, e.g. to skip loading Whisper for a /tts-only run
+    env.setdefault("PRELOAD_MODELS", args.model)
+    if not args.cache:
+        env["RESULT_CACHE"] = "0"
+    command = [sys.executable, os.path.join(ROOT, "src", "web", "serve.py"),
+               "--workers", str(args.workers), "--port", str(port)]
+    print(f"Starting server: {' '.join(command)} (log: {args.server_log})")
+    os.makedirs(os.path.dirname(os.path.abspath(args.server_log)), exist_ok=True)
+    with open(args.server_log, "w") as log:
+        process = subprocess.Popen(command, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.perf_counter() + args.startup_timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode} during startup")
+        status, health = _request(f"{base_url}/healthz", timeout=5)
+        if status == 200:
+            return process, base_url
+        if health and health.get("status") == "failed":
+            process.terminate()
+            raise RuntimeError(f"Server warm-up failed: {health.get('error')}")
+        time.sleep(1)
+    process.terminate()
+    raise RuntimeError(f"Server not ready after {args.startup_timeout}s")
+
+
+def _error(body):
+    return {"error": body["error"]} if isinstance(body, dict) and "error" in body else None
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _parse_mix(mix):
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition(":")
+        if name.strip() not in ("analyze", "tts"):
+            raise ValueError(f"Unknown endpoint '{name}' in --mix (use analyze and tts)")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def _percentiles(values):
+    if not values:
+        return None
+    values = np.asarray(values)
+    return {"p50": float(np.percentile(values, 50)), "p95": float(np.percentile(values, 95)),
+            "p99": float(np.percentile(values, 99)), "max": float(values.max()), "mean": float(values.mean())}
+
+
+def print_report(report):
+    print(f"\n--- Load test: {report['config']['concurrency']} users for {report['elapsed_sec']:.0f}s ---")
+    for endpoint, stats in report["endpoints"].items():
+        latency = stats["latency_ms"]
+        print(f"{endpoint}: {stats['requests']} requests, {stats['ok']} ok, {stats['throughput_rps']:.2f} ok/s, "
+              f"error rate {stats['error_rate']:.1%}")
+        if latency:
+            print(f"  latency ms: p50 {latency['p50']:.0f}  p95 {latency['p95']:.0f}  p99 {latency['p99']:.0f}  max {latency['max']:.0f}")
+        if stats.get("queue_wait_ms"):
+            print(f"  queue wait ms: p50 {stats['queue_wait_ms']['p50']:.0f}  p95 {stats['queue_wait_ms']['p95']:.0f}")
+        if stats["errors"]:
+            print(f"  errors: {', '.join(f'{kind} x{count}' for kind, count in sorted(stats['errors'].items()))}")
+            for kind, message in sorted(stats["error_samples"].items()):
+                print(f"    {kind}: {message}")
+    memory = report["memory"]
+    if memory:
+        print(f"server RSS: {memory['rss_start_mb']:.0f} MB at start, {memory['rss_peak_mb']:.0f} MB peak, "
+              f"{memory['rss_end_mb']:.0f} MB at end (PSS peak {memory['pss_peak_mb']:.0f} MB)")
+    if report.get("llm_stub"):
+        print(f"stub LLM: {report['llm_stub']['requests']} requests, {report['llm_stub']['errors']} injected errors")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive /analyze and /tts at a fixed concurrency against stub LLM and TTS providers")
+    parser.add_argument("--url", help="Test an already running server instead of starting one (no stubs are started)", default=None)
+    parser.add_argument("--concurrency", help="Concurrent virtual users", type=int, default=8)
+    parser.add_argument("--duration", help="Seconds to keep starting new requests", type=float, default=60)
+    parser.add_argument("--mix", help="Endpoint weights, e.g. 'analyze:1,tts:4'", default="analyze:1,tts:3")
+    parser.add_argument("--workers", help="Server worker processes (serve.py)", type=int, default=1)
+    parser.add_argument("--port", help="Port for the started server (default: a free one)", type=int, default=None)
+    parser.add_argument("--model", help="Whisper model size requested and preloaded", default="tiny")
+    parser.add_argument("--pitch_mode", help="Pitch tracker requested by /analyze", default="pyin")
+    parser.add_argument("--no_ai_feedback", help="Don't ask for the LLM report (local scoring only)", action="store_true")
+    parser.add_argument("--cache", help="Keep the server's result cache on (off by default so every upload is analyzed)", action="store_true")
+    parser.add_argument("--audio_sec", help="Length of the generated recordings", type=float, default=20)
+    parser.add_argument("--fixtures", help="Number of distinct recordings", type=int, default=4)
+    parser.add_argument("--tts_texts", help="Number of distinct /tts texts (fewer means more cache hits)", type=int, default=50)
+    parser.add_argument("--llm_latency", help="Stub LLM mean latency in seconds", type=float, default=1.0)
+    parser.add_argument("--llm_jitter", help="Stub LLM latency spread (0.2 = +-20%%)", type=float, default=0.2)
+    parser.add_argument("--llm_error_rate", help="Fraction of stub LLM requests that fail", type=float, default=0.0)
+    parser.add_argument("--llm_error_status", help="HTTP status of injected LLM failures (500 or 429)", type=int, default=500)
+    parser.add_argument("--llm_retries", help="LLM_MAX_RETRIES for the server", type=int, default=1)
+    parser.add_argument("--tts_latency", help="Stub TTS latency in seconds", type=float, default=0.3)
+    parser.add_argument("--tts_error_rate", help="Fraction of stub TTS syntheses that fail", type=float, default=0.0)
+    parser.add_argument("--poll_interval", help="Seconds between job status polls", type=float, default=0.25)
+    parser.add_argument("--timeout", help="Per-request timeout in seconds (for /analyze, upload to finished job)", type=float, default=600)
+    parser.add_argument("--startup_timeout", help="Seconds to wait for the server to load and warm up", type=float, default=900)
+    parser.add_argument("--sample_sec", help="Seconds between server memory samples", type=float, default=1.0)
+    parser.add_argument("--max_error_rate", help="Exit with status 1 if any endpoint's error rate is higher", type=float, default=None)
+    parser.add_argument("--output", help="Where to write the JSON report", default=os.path.join(ROOT, "output", "load_test.json"))
+    parser.add_argument("--server_log", help="Where the started server's output goes", default=os.path.join(ROOT, "output", "load_test_server.log"))
+    args = parser.parse_args()
+    # File contents can only be checked against the stub synthesizer
+    args.verify_tts = args.url is None
+
+    fixtures = [Fixture(seed, args.audio_sec) for seed in range(args.fixtures)]
+    texts = [f"Tip {i}: pause briefly before each key point" + " and breathe" * (i % 7) for i in range(args.tts_texts)]
+
+    stub = None
+    process = None
+    base_url = args.url.rstrip("/") if args.url else None
+    try:
+        if base_url is None:
+            stub = StubLLMServer(latency_sec=args.llm_latency, jitter=args.llm_jitter,
+                                 error_rate=args.llm_error_rate, error_status=args.llm_error_status).start()
+            process, base_url = start_server(args, stub)
+
+        sampler = MemorySampler(base_url, args.sample_sec).start()
+        endpoints, elapsed = run_load(base_url, fixtures, texts, args)
+        sampler.stop()
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+        if stub is not None:
+            stub.stop()
+
+    report = {
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "elapsed_sec": elapsed,
+        "endpoints": endpoints,
+        "memory": sampler.summary(),
+        "llm_stub": stub.stats() if stub is not None else None
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=4)
+    print_report(report)
+    print(f"\nReport saved to {args.output}")
+
+    corrupted = sum(stats["errors"].get(kind, 0) for stats in endpoints.values() for kind in CORRUPTION_OUTCOMES)
+    if corrupted:
+        print(f"{corrupted} response(s) carried another request's data or a damaged file")
+        sys.exit(1)
+    if args.max_error_rate is not None and any(stats["error_rate"] > args.max_error_rate for stats in endpoints.values()):
+        print(f"Error rate above {args.max_error_rate:.1%}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Make src modules importable when run from the repository root
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(ROOT, 'src'))
+
+from scorer import CATEGORIES, CONTENT_CATEGORIES
+
+
+def stub_report():
+    """
+    One JSON object that satisfies every prompt the Reporter sends: full and enrich reports
+    (ratings, summary, recommendations) and section notes (summary, notes).
+    """
+    return {
+        "ratings": {name: {"score": 7, "reason": "Stub rating."} for name in CATEGORIES},
+        "overall_summary": "Stub summary.",
+        "improvement_recommendations": ["Stub recommendation."],
+        "summary": "Stub section summary.",
+        "notes": {name: "Stub note." for name in CONTENT_CATEGORIES}
+    }
+
+
+class StubLLMServer:
+    def __init__(self, host="127.0.0.1", port=0, latency_sec=0.5, jitter=0.2, error_rate=0.0, error_status=500,
+                 fail_first=0):
+        """
+        Local stand-in for the Groq (OpenAI-compatible chat completions) and Gemini (generateContent)
+        endpoints. Point the app at it with GROQ_BASE_URL / GEMINI_BASE_URL set to url.
+        latency_sec: mean response delay; each response waits uniformly within +-jitter of it.
+        error_rate: fraction of requests answered with error_status (500, or 429 with Retry-After: 1)
+            instead of a report.
+        fail_first: the first this many requests always fail that way, for deterministic retry tests.
+        """
+        self.latency_sec = latency_sec
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.fail_first = fail_first
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                server._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="stub-llm", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _handle(self, handler):
+        length = int(handler.headers.get("Content-Length") or 0)
+        request = json.loads(handler.rfile.read(length) or b"{}")
+        with self._lock:
+            self.requests += 1
+            fail = self.requests <= self.fail_first or random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+
+        time.sleep(max(0.0, self.latency_sec * random.uniform(1 - self.jitter, 1 + self.jitter)))
+
+        if fail:
+            body = {"error": {"message": "Injected failure", "code": self.error_status}}
+            headers = {"Retry-After": "1"} if self.error_status == 429 else {}
+            return _send(handler, self.error_status, body, headers)
+
+        text = json.dumps(stub_report())
+        prompt_tokens = len(json.dumps(request)) // 4
+        completion_tokens = len(text) // 4
+        if ":generateContent" in handler.path:
+            body = {
+                "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP", "index": 0}],
+                "usageMetadata": {"promptTokenCount": prompt_tokens, "candidatesTokenCount": completion_tokens,
+                                  "totalTokenCount": prompt_tokens + completion_tokens}
+            }
+        else:
+            body = {
+                "id": "stub", "object": "chat.completion", "created": int(time.time()), "model": request.get("model", "stub"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens}
+            }
+        _send(handler, 200, body)
+
+    def stats(self):
+        with self._lock:
+            return {"requests": self.requests, "errors": self.errors}
+
+
+def _send(handler, status, body, headers=None):
+    data = json.dumps(body).encode()
+    handler.send_response(status)
+    handler.send_header("Content-Type", "application/json")
+    handler.send_header("Content-Length", str(len(data)))
+    for name, value in (headers or {}).items():
+        handler.send_header(name, value)
+    handler.end_headers()
+    handler.wfile.write(data)
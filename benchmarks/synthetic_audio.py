@@ -0,0 +1,52 @@
+import os
+import numpy as np
+import soundfile as sf
+
+SAMPLE_RATE = 16000
+
+
+def synthesize_speech_like(duration_sec, sr=SAMPLE_RATE, seed=0):
+    """
+    Generates deterministic speech-like audio offline: harmonic "syllables" with a wandering
+    pitch contour (90-220 Hz), syllable-rate amplitude envelopes, and pauses between phrases.
+    Silence makes up roughly a quarter of the signal, similar to read speech.
+    """
+    rng = np.random.default_rng(seed)
+    total = int(duration_sec * sr)
+    out = np.zeros(total, dtype=np.float32)
+
+    pos = int(rng.uniform(0.2, 0.5) * sr)
+    while pos < total:
+        # One phrase: a few syllables on a slowly drifting pitch
+        phrase_len = int(rng.uniform(1.0, 4.0) * sr)
+        n = min(phrase_len, total - pos)
+        t = np.arange(n) / sr
+
+        base_pitch = rng.uniform(90, 220)
+        contour = base_pitch * (1 + 0.08 * np.sin(2 * np.pi * rng.uniform(0.3, 1.0) * t + rng.uniform(0, np.pi)))
+        phase = 2 * np.pi * np.cumsum(contour) / sr
+        voiced = sum(np.sin(k * phase) / k for k in range(1, 8))
+
+        # ~4 syllables per second
+        syllable_rate = rng.uniform(3.0, 5.0)
+        envelope = np.clip(np.sin(np.pi * syllable_rate * t) ** 2, 0, 1)
+        phrase = 0.25 * voiced * envelope + rng.normal(0, 0.003, n)
+
+        out[pos:pos + n] = phrase.astype(np.float32)
+        pos += n + int(rng.uniform(0.3, 1.2) * sr)
+
+    # Low background noise so "silence" isn't digital zero
+    out += rng.normal(0, 0.0005, total).astype(np.float32)
+    return out
+
+
+def fixture_path(duration_sec, fixtures_dir, seed=0):
+    """
+    Returns the path of a cached WAV fixture for duration_sec, generating it if needed.
+    """
+    os.makedirs(fixtures_dir, exist_ok=True)
+    path = os.path.join(fixtures_dir, f"synthetic_{int(duration_sec)}s_seed{seed}.wav")
+    if not os.path.exists(path):
+        y = synthesize_speech_like(duration_sec, seed=seed)
+        sf.write(path, y, SAMPLE_RATE, subtype="PCM_16")
+    return path
@@ -1,76 +1,367 @@
+from collections import Counter
+
 import librosa
 import numpy as np
+from audio_processor import iter_blocks, split_nonsilent
+from pitch import yin_fast, yin_frame_length, PITCH_MODES
 
-class AcousticAnalyzer:
+# librosa.pyin's default frame (hop is a quarter of it)
+PYIN_FRAME_LENGTH = 2048
+
+class RunningStats:
+    """
+    Streaming mean and (population) standard deviation, merged one batch at a time with
+    Chan et al.'s parallel form of Welford's algorithm.
+    """
     def __init__(self):
-        pass
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        n = len(values)
+        if n == 0:
+            return
+        batch_mean = values.mean()
+        batch_m2 = np.square(values - batch_mean).sum()
+        delta = batch_mean - self.mean
+        total = self.count + n
+        self.mean += delta * n / total
+        self._m2 += batch_m2 + delta ** 2 * self.count * n / total
+        self.count = total
+
+    @property
+    def std(self):
+        return float(np.sqrt(self._m2 / self.count)) if self.count else 0.0
+
+
+class AcousticAnalyzer:
+    def __init__(self, pitch_mode="pyin", block_sec=30, margin_sec=1.0):
+        """
+        pitch_mode: 'pyin' (probabilistic YIN over C2-C7, most robust) or
+        'fast' (vectorized YIN over the 65-500 Hz speech range, see pitch.yin_fast for tolerance).
+        block_sec: pitch is tracked over blocks of this length, so pyin's probability matrices stay
+            the same size however long the recording is.
+        margin_sec: extra audio on each side of a block whose frames are computed but discarded,
+            so frames near block edges see the same context as in one pass over the whole signal.
+        """
+        if pitch_mode not in PITCH_MODES:
+            raise ValueError(f"Unknown pitch mode '{pitch_mode}'. Choose from: {', '.join(PITCH_MODES)}")
+        self.pitch_mode = pitch_mode
+        self.block_sec = block_sec
+        self.margin_sec = margin_sec
 
-    def analyze(self, y, sr):
+    def analyze(self, y, sr, timeline=None):
         """
         Extracts acoustic features: pitch variability, pause rate, speech rate (approx).
+        If a SpeechTimeline from AudioProcessor.detect_speech is given, its intervals are reused
+        for the pause metrics and pitch is only tracked over the speech spans.
+        Pitch tracking works block by block, so its working memory is bounded by the block size rather
+        than the length of y (y itself is held by the caller, who also needs it for Whisper).
         """
-        duration = librosa.get_duration(y=y, sr=sr)
-        
+        duration = len(y) / sr
+
         # 1. Pauses (Silence detection)
-        # Split at silence (default top_db=60)
-        non_silent_intervals = librosa.effects.split(y, top_db=20)
+        if timeline is not None:
+            non_silent_intervals = timeline.intervals
+        else:
+            non_silent_intervals = split_nonsilent(y, top_db=20)
+
+        # 2. Pitch (Fundamental Frequency), streamed block by block
+        blocks = timeline.iter_compact(y) if timeline is not None else iter_blocks(y)
+        peak = max(float(y.max()), -float(y.min())) if len(y) else 0.0
+        pitch = self._pitch_stats(blocks, sr, peak)
+
+        return self._metrics(duration, non_silent_intervals, sr, pitch)
+
+    def _pitch_stats(self, blocks, sr, peak):
+        if self.pitch_mode == "fast":
+            hop = yin_frame_length(sr) // 4
+        else:
+            hop = PYIN_FRAME_LENGTH // 4
+        # Block edges on the global frame grid, so the kept frames are exactly the whole-signal frames
+        block_len = max(1, round(self.block_sec * sr / hop)) * hop
+        margin = int(np.ceil(self.margin_sec * sr / hop)) * hop
+
+        stats = RunningStats()
+        for window, core_start, core_end in _windows(blocks, block_len, margin):
+            if self.pitch_mode == "fast":
+                f0, voiced_flag = yin_fast(window, sr, hop_length=hop, peak=peak)
+            else:
+                f0, voiced_flag, voiced_probs = librosa.pyin(window, fmin=librosa.note_to_hz('C2'), fmax=librosa.note_to_hz('C7'), sr=sr,
+                                                             frame_length=PYIN_FRAME_LENGTH, hop_length=hop)
+            positions = np.arange(len(f0)) * hop
+            f0 = f0[(positions >= core_start) & (positions < core_end)]
+            # Filter out NaNs
+            stats.update(f0[~np.isnan(f0)])
+        return stats
+
+    def _metrics(self, duration, non_silent_intervals, sr, pitch):
         non_silent_time = sum([ (end - start) / sr for start, end in non_silent_intervals ])
         pause_time = duration - non_silent_time
         pause_fraction = pause_time / duration if duration > 0 else 0
-        
-        # 2. Pitch (Fundamental Frequency)
-        # Use piptrack or pyin
-        f0, voiced_flag, voiced_probs = librosa.pyin(y, fmin=librosa.note_to_hz('C2'), fmax=librosa.note_to_hz('C7'))
-        # Filter out NaNs
-        f0_clean = f0[~np.isnan(f0)]
-        if len(f0_clean) > 0:
-            pitch_mean = np.mean(f0_clean)
-            pitch_std = np.std(f0_clean)
-        else:
-            pitch_mean = 0
-            pitch_std = 0
 
         return {
-            "duration_sec": duration,
-            "pause_time_sec": pause_time,
-            "pause_fraction": pause_fraction,
-            "pitch_mean_hz": pitch_mean,
-            "pitch_std_hz": pitch_std
+            "duration_sec": float(duration),
+            "pause_time_sec": float(pause_time),
+            "pause_fraction": float(pause_fraction),
+            "pitch_mean_hz": float(pitch.mean) if pitch.count else 0,
+            "pitch_std_hz": pitch.std,
+            "pitch_mode": self.pitch_mode
         }
 
+
+def _windows(blocks, block_len, margin):
+    """
+    Regroups a stream of sample blocks of any size into analysis windows. Yields
+    (window, core_start, core_end): the window covers [core_start, core_end) plus up to `margin`
+    samples of context on each side; consecutive cores tile the stream without overlap.
+    At most block_len + 2 * margin samples plus one input block are buffered.
+    """
+    buffer = np.zeros(0, dtype=np.float32)
+    buffer_start = 0  # stream index of buffer[0]
+    core = 0  # stream index where the next core starts
+    for block in blocks:
+        buffer = np.concatenate((buffer, block))
+        while buffer_start + len(buffer) >= core + block_len + margin:
+            lo = max(core - margin, 0)
+            yield buffer[lo - buffer_start:core + block_len + margin - buffer_start], core - lo, core - lo + block_len
+            core += block_len
+            keep_from = max(core - margin, 0)
+            buffer = buffer[keep_from - buffer_start:]
+            buffer_start = keep_from
+    end = buffer_start + len(buffer)
+    if end > core:
+        lo = max(core - margin, 0)
+        yield buffer[lo - buffer_start:], core - lo, end - lo
+
+
+# Filler words and phrases per Whisper language code: hesitations that are fillers wherever they occur.
+# Whisper tends to drop hesitations, so these counts are a lower bound. Romanized Hindi/Marathi forms
+# are included for code-mixed transcripts.
+FILLERS = {
+    "en": {"um", "umm", "uh", "uhh", "uhm", "er", "erm", "ah", "hmm"},
+    "hi": {"हम्म", "अं", "उम्म", "um", "umm", "uh", "क्या बोलते हैं", "क्या कहते हैं"},
+    "mr": {"हम्म", "अं", "उम्म", "um", "umm", "uh", "काय म्हणतात", "काय म्हणायचं"},
+}
+# Discourse markers that also have an ordinary meaning ("I like it", "अच्छा है"). They only count as
+# fillers when set off by a comma or dash; other occurrences are reported as possible fillers, which
+# the scorer doesn't penalize.
+DISCOURSE_MARKERS = {
+    "en": {"like", "basically", "actually", "literally", "you know", "i mean", "sort of", "kind of"},
+    "hi": {"मतलब", "यानी", "अच्छा", "matlab", "yaani", "accha", "achha", "है ना"},
+    "mr": {"म्हणजे", "बरं", "mhanje", "bara"},
+}
+# Characters stripped from both ends of a token, including the Devanagari danda
+PUNCTUATION = "\"'.,!?;:()[]{}-–—…“”‘’«»।॥"
+# Punctuation that sets a discourse marker off from the rest of its clause
+CLAUSE_BREAKS = ",;-–—…"
+# Gaps between segments at least this long count as long pauses
+LONG_PAUSE_SEC = 1.0
+GAP_BINS = (0.25, 0.5, 1.0, 2.0)
+
+
 class TextAnalyzer:
-    def __init__(self):
-        pass
+    def __init__(self, rolling_window_sec=30, ttr_segment_words=50):
+        """
+        rolling_window_sec: window for the rolling speaking rate (stepped by half a window).
+        ttr_segment_words: chunk size for the mean segmental type-token ratio, which unlike the plain
+            ratio doesn't fall just because the speech is longer.
+        """
+        self.rolling_window_sec = rolling_window_sec
+        self.ttr_segment_words = ttr_segment_words
 
     def analyze(self, transcript_data):
         """
-        Analyzes text features: word count, sentence count, average sentence length.
+        Analyzes text features from the transcript and its segment timestamps: word and sentence counts,
+        overall, per-segment and rolling speaking rate, gaps between segments, filler words (en/hi/mr),
+        repetitions and vocabulary variety.
+        Every step is a single pass or a NumPy operation over per-segment/per-word arrays, so cost stays
+        linear in the transcript length.
         """
         text = transcript_data["text"]
         segments = transcript_data["segments"]
-        
-        words = text.split()
+        language = transcript_data.get("language")
+
+        words, set_off = _tokenize(text)
         word_count = len(words)
         
         # Simple sentence splitting by punctuation
-        sentences = [s.strip() for s in text.replace('!', '.').replace('?', '.').split('.') if s.strip()]
+        sentences = [s.strip() for s in text.replace('!', '.').replace('?', '.').replace('।', '.').split('.') if s.strip()]
         sentence_count = len(sentences)
         
         avg_sentence_length = word_count / sentence_count if sentence_count > 0 else 0
-        
-        # Estimate WPM based on transcript timestamps if available, or just total duration
-        # Segments usually have start/end
-        if segments:
-            start_time = segments[0]['start']
-            end_time = segments[-1]['end']
-            speech_duration = end_time - start_time
-            wpm = (word_count / (speech_duration / 60)) if speech_duration > 0 else 0
-        else:
-            wpm = 0
 
-        return {
+        metrics = {
             "word_count": word_count,
             "sentence_count": sentence_count,
             "avg_sentence_length": avg_sentence_length,
-            "wpm": wpm
+            "language": language
+        }
+        metrics.update(self._rate_metrics(segments, word_count))
+        metrics.update(self._filler_metrics(words, set_off, language))
+        metrics.update(self._lexical_metrics(words))
+        return metrics
+
+    def _rate_metrics(self, segments, word_count):
+        if not segments:
+            return {"wpm": 0, "articulation_wpm": 0, "segment_wpm": None, "rolling_wpm": None, "gaps": None}
+
+        starts = np.array([segment["start"] for segment in segments], dtype=np.float64)
+        ends = np.maximum(np.array([segment["end"] for segment in segments], dtype=np.float64), starts)
+        counts = np.array([len(segment.get("text", "").split()) for segment in segments], dtype=np.float64)
+        durations = ends - starts
+
+        # Overall rate over the span from first to last segment, pauses included
+        speech_duration = ends[-1] - starts[0]
+        wpm = word_count / (speech_duration / 60) if speech_duration > 0 else 0
+        # Articulation rate leaves out the gaps between segments
+        spoken = durations.sum()
+        articulation_wpm = counts.sum() / (spoken / 60) if spoken > 0 else 0
+
+        timed = durations > 0
+        segment_wpm = counts[timed] / durations[timed] * 60
+        segment_summary = _summary(segment_wpm) if len(segment_wpm) else None
+
+        # Cumulative words as a piecewise-linear function of time: words spread evenly within each segment,
+        # flat across gaps. A window's rate is the difference of that function at its two edges.
+        knots = np.column_stack([starts, ends]).ravel()
+        cumulative = np.cumsum(counts)
+        knot_words = np.column_stack([cumulative - counts, cumulative]).ravel()
+        order = np.argsort(knots, kind="stable")
+        knots, knot_words = knots[order], np.maximum.accumulate(knot_words[order])
+
+        window = self.rolling_window_sec
+        if ends[-1] - starts[0] > window:
+            edges = np.arange(starts[0], ends[-1] - window + 1e-9, window / 2)
+        else:
+            # Shorter than one window: a single window over the whole span
+            edges = np.array([starts[0]])
+            window = max(ends[-1] - starts[0], 1e-9)
+        rolling = (np.interp(edges + window, knots, knot_words) - np.interp(edges, knots, knot_words)) / window * 60
+        rolling_summary = _summary(rolling)
+        rolling_summary.update({"window_sec": float(window), "step_sec": float(window / 2),
+                                "values": [round(float(v), 1) for v in rolling]})
+
+        gaps = np.clip(starts[1:] - ends[:-1], 0, None)
+        gap_summary = None
+        if len(gaps):
+            histogram = np.histogram(gaps, bins=(0,) + GAP_BINS + (np.inf,))[0]
+            labels = [f"<{GAP_BINS[0]}"] + [f"{lo}-{hi}" for lo, hi in zip(GAP_BINS, GAP_BINS[1:])] + [f">={GAP_BINS[-1]}"]
+            gap_summary = {
+                "count": int(len(gaps)),
+                "mean_sec": float(gaps.mean()),
+                "median_sec": float(np.median(gaps)),
+                "p90_sec": float(np.percentile(gaps, 90)),
+                "max_sec": float(gaps.max()),
+                "long_pause_count": int((gaps >= LONG_PAUSE_SEC).sum()),
+                "histogram": dict(zip(labels, histogram.tolist()))
+            }
+
+        return {
+            "wpm": float(wpm),
+            "articulation_wpm": float(articulation_wpm),
+            "segment_wpm": segment_summary,
+            "rolling_wpm": rolling_summary,
+            "gaps": gap_summary
         }
+
+    def _filler_metrics(self, words, set_off, language):
+        lexicon = FILLERS.get(language) or FILLERS["en"]
+        markers = DISCOURSE_MARKERS.get(language) or DISCOURSE_MARKERS["en"]
+
+        fillers = Counter()
+        possible = Counter()
+        for n in sorted({f.count(" ") + 1 for f in lexicon | markers}):
+            for i in range(len(words) - n + 1):
+                phrase = words[i] if n == 1 else " ".join(words[i:i + n])
+                if phrase in lexicon:
+                    fillers[phrase] += 1
+                elif phrase in markers:
+                    # Set off on either side: ", like," / "like, ..." / "..., you know"
+                    if set_off[i][0] or set_off[i + n - 1][1]:
+                        fillers[phrase] += 1
+                    else:
+                        possible[phrase] += 1
+
+        filler_count = sum(fillers.values())
+        return {
+            "filler_count": filler_count,
+            "filler_per_100_words": filler_count / len(words) * 100 if words else 0,
+            "fillers": dict(fillers.most_common()),
+            "possible_filler_count": sum(possible.values()),
+            "possible_fillers": dict(possible.most_common())
+        }
+
+    def _lexical_metrics(self, words):
+        if not words:
+            return {"repeated_words": 0, "repeated_phrases": 0, "type_token_ratio": 0, "segmental_ttr": 0}
+
+        vocabulary = {}
+        ids = np.fromiter((vocabulary.setdefault(w, len(vocabulary)) for w in words), dtype=np.int64, count=len(words))
+
+        # "the the" and "i think i think"
+        repeated_words = int((ids[1:] == ids[:-1]).sum())
+        repeated_phrases = int(((ids[:-3] == ids[2:-1]) & (ids[1:-2] == ids[3:])).sum()) if len(ids) >= 4 else 0
+
+        # Mean type-token ratio over consecutive chunks: a word is new to its chunk if its previous
+        # occurrence lies before the chunk start
+        size = self.ttr_segment_words
+        full = len(ids) // size * size
+        if full:
+            order = np.argsort(ids, kind="stable")
+            previous = np.full(len(ids), -1)
+            same = ids[order[1:]] == ids[order[:-1]]
+            previous[order[1:][same]] = order[:-1][same]
+            positions = np.arange(full)
+            new_in_chunk = previous[:full] < positions // size * size
+            segmental_ttr = float(np.bincount(positions // size, weights=new_in_chunk).mean() / size)
+        else:
+            segmental_ttr = len(vocabulary) / len(ids)
+
+        return {
+            "repeated_words": repeated_words,
+            "repeated_phrases": repeated_phrases,
+            "type_token_ratio": len(vocabulary) / len(ids),
+            "segmental_ttr": segmental_ttr
+        }
+
+
+def _tokenize(text):
+    """
+    Splits text into lowercased words without surrounding punctuation, and for each word whether a
+    clause break (CLAUSE_BREAKS) comes right before and right after it.
+    """
+    words = []
+    set_off = []
+    pending_break = False
+    for token in text.split():
+        word = token.strip(PUNCTUATION).lower()
+        has_break = any(c in CLAUSE_BREAKS for c in token)
+        if not word:
+            # Free-standing punctuation such as " - " or " ... "
+            if has_break:
+                pending_break = True
+                if set_off:
+                    set_off[-1][1] = True
+            continue
+        stripped = token.lstrip(PUNCTUATION)
+        leading, trailing = token[:len(token) - len(stripped)], stripped[len(stripped.rstrip(PUNCTUATION)):]
+        before = pending_break or any(c in CLAUSE_BREAKS for c in leading)
+        if before and set_off:
+            set_off[-1][1] = True
+        after = any(c in CLAUSE_BREAKS for c in trailing)
+        words.append(word)
+        set_off.append([before, after])
+        pending_break = after
+    return words, set_off
+
+
+def _summary(values):
+    return {
+        "mean": float(np.mean(values)),
+        "std": float(np.std(values)),
+        "min": float(np.min(values)),
+        "max": float(np.max(values))
+    }
@@ -1,37 +1,412 @@
 import os
-from pydub import AudioSegment
+import subprocess
+import tempfile
+import threading
+from collections import deque
+from contextlib import contextmanager
 import librosa
 import soundfile as sf
 import numpy as np
+from transcript import Segment
+
+# Whisper expects 16 kHz mono audio, and the acoustic metrics work fine at that rate too
+TARGET_SR = 16000
+# Samples handed to streaming analysis at a time (about a minute at 16 kHz)
+BLOCK_SAMPLES = 1 << 20
+
+
+def iter_blocks(y, block_len=BLOCK_SAMPLES):
+    """
+    Yields consecutive views of y, each at most block_len samples long.
+    """
+    for start in range(0, len(y), block_len):
+        yield y[start:start + block_len]
+
+
+class FrameEnergy:
+    def __init__(self, frame_length=2048, hop_length=512):
+        """
+        Streaming version of the framing behind librosa.effects.split: feed audio in chunks of any size
+        with update(), then call intervals(). Frames are centered and zero-padded at both ends exactly as
+        librosa does, so the intervals match librosa.effects.split(y, top_db) on the whole signal.
+        Only one mean-square value per hop is kept (1/hop_length of the audio), never the frame matrix.
+        """
+        self.frame_length = frame_length
+        self.hop_length = hop_length
+        self.total_samples = 0
+        self._buffer = np.zeros(frame_length // 2, dtype=np.float32)
+        self._power = []
+
+    def update(self, chunk):
+        self.total_samples += len(chunk)
+        self._buffer = np.concatenate((self._buffer, np.asarray(chunk, dtype=np.float32)))
+        self._consume()
+
+    def _consume(self):
+        if len(self._buffer) < self.frame_length:
+            return
+        count = 1 + (len(self._buffer) - self.frame_length) // self.hop_length
+        frames = np.lib.stride_tricks.sliding_window_view(self._buffer, self.frame_length)[::self.hop_length][:count]
+        # Bounded by the chunk size: at most one chunk's worth of frames is materialized at once
+        self._power.append(np.einsum("ij,ij->i", frames, frames, dtype=np.float64) / self.frame_length)
+        self._buffer = self._buffer[count * self.hop_length:]
+
+    def intervals(self, top_db=20):
+        """
+        Finishes the stream and returns non-silent (start, end) sample ranges, like librosa.effects.split.
+        """
+        self._buffer = np.concatenate((self._buffer, np.zeros(self.frame_length // 2, dtype=np.float32)))
+        self._consume()
+        power = np.concatenate(self._power) if self._power else np.zeros(0)
+        self._power = [power]
+        if not len(power):
+            return np.zeros((0, 2), dtype=np.int64)
+
+        # Same decibel conversion as librosa.amplitude_to_db(rms, ref=np.max) with amin=1e-5
+        db = 10 * np.log10(np.maximum(1e-10, power)) - 10 * np.log10(max(1e-10, power.max()))
+        non_silent = db > -top_db
+
+        edges = [np.flatnonzero(np.diff(non_silent.astype(int))) + 1]
+        if non_silent[0]:
+            edges.insert(0, [0])
+        if non_silent[-1]:
+            edges.append([len(non_silent)])
+        edges = np.minimum(np.concatenate(edges) * self.hop_length, self.total_samples)
+        return edges.reshape((-1, 2)).astype(np.int64)
+
+
+def split_nonsilent(y, top_db=20, frame_length=2048, hop_length=512):
+    """
+    Drop-in for librosa.effects.split(y, top_db) that never builds librosa's full frame matrix
+    (about 4x the size of the signal).
+    """
+    energy = FrameEnergy(frame_length, hop_length)
+    for block in iter_blocks(y):
+        energy.update(block)
+    return energy.intervals(top_db)
+
+
+class SpeechTimeline:
+    def __init__(self, intervals, spans, sr, total_samples):
+        """
+        Result of voice activity detection on one buffer.
+        intervals: raw non-silent (start, end) sample ranges, as used for pause metrics.
+        spans: padded, merged (start, end) ranges that are kept when compacting the audio.
+        Maps times in the compacted audio back onto the original timeline.
+        """
+        self.intervals = np.asarray(intervals, dtype=np.int64).reshape(-1, 2)
+        self.spans = np.asarray(spans, dtype=np.int64).reshape(-1, 2)
+        self.sr = sr
+        self.total_samples = total_samples
+
+        lengths = self.spans[:, 1] - self.spans[:, 0]
+        self._lengths = lengths
+        self._compact_starts = np.concatenate([[0], np.cumsum(lengths)[:-1]]) if len(lengths) else np.zeros(0, dtype=np.int64)
+
+    @property
+    def speech_samples(self):
+        return int(self._lengths.sum())
+
+    @property
+    def removed_sec(self):
+        return (self.total_samples - self.speech_samples) / self.sr
+
+    def compact(self, y):
+        """
+        Concatenates only the speech spans of `y`.
+        """
+        if len(self.spans) == 1 and self.spans[0][0] == 0 and self.spans[0][1] == len(y):
+            return y
+        return np.concatenate([y[start:end] for start, end in self.spans])
+
+    def iter_compact(self, y, block_len=BLOCK_SAMPLES):
+        """
+        Yields the speech spans of `y` as views of at most block_len samples, in order: the same samples
+        as compact(y) without building the concatenated copy.
+        """
+        for start, end in self.spans:
+            yield from iter_blocks(y[start:end], block_len)
+
+    def to_original(self, t):
+        """
+        Converts a time in seconds in the compacted audio to seconds in the original recording.
+        """
+        sample = t * self.sr
+        index = int(np.searchsorted(self._compact_starts, sample, side="right")) - 1
+        index = min(max(index, 0), len(self.spans) - 1)
+        offset = min(max(sample - self._compact_starts[index], 0), self._lengths[index])
+        return float((self.spans[index][0] + offset) / self.sr)
+
+    def remap_chunk(self, chunk):
+        """
+        Returns a copy of a streamed transcript chunk (see Transcriber.transcribe_stream) with its
+        start, end and segment timestamps on the original timeline.
+        """
+        remapped = dict(chunk, start=self.to_original(chunk["start"]), end=self.to_original(chunk["end"]))
+        if chunk.get("segments"):
+            remapped["segments"] = self.remap_transcript({"segments": chunk["segments"]})["segments"]
+        return remapped
+
+    def remap_transcript(self, transcript_data):
+        """
+        Returns a copy of transcript_data with segment (and word) timestamps moved back onto the original timeline.
+        """
+        segments = []
+        for segment in transcript_data["segments"]:
+            if isinstance(segment, Segment):
+                segments.append(Segment(segment.id, self.to_original(segment.start), self.to_original(segment.end), segment.text))
+                continue
+            segment = dict(segment)
+            segment["start"] = self.to_original(segment["start"])
+            segment["end"] = self.to_original(segment["end"])
+            if segment.get("words"):
+                segment["words"] = [
+                    dict(word, start=self.to_original(word["start"]), end=self.to_original(word["end"]))
+                    for word in segment["words"]
+                ]
+            segments.append(segment)
+        remapped = dict(transcript_data)
+        remapped["segments"] = segments
+        return remapped
+
+
+class AudioLimitError(Exception):
+    """
+    Raised when an input exceeds the configured size or duration limit.
+    """
+    pass
+
+
+class StreamingDecoder:
+    def __init__(self, input_path=None, sr=TARGET_SR, max_duration_sec=None, max_input_bytes=None, read_size=1 << 16):
+        """
+        Decodes audio/video with an ffmpeg subprocess into a mono float32 buffer at `sr` Hz.
+        With input_path=None the encoded bytes are fed incrementally through write() (e.g. straight
+        from an HTTP upload), so the encoded file never needs to exist in full on disk or in memory.
+        PCM is collected as 16-bit chunks on a reader thread, so peak memory stays around 1.5x the
+        final float32 buffer. Exceeding max_duration_sec or max_input_bytes raises AudioLimitError.
+        """
+        self.sr = sr
+        self.max_duration_sec = max_duration_sec
+        self.max_input_bytes = max_input_bytes
+        self.read_size = read_size
+
+        self.input_bytes = 0
+        self._chunks = deque()
+        self._pcm_bytes = 0
+        self._limit_error = None
+        self._input_closed = False
+
+        command = ["ffmpeg", "-hide_banner", "-loglevel", "error"]
+        if input_path is not None:
+            command += ["-nostdin", "-i", input_path]
+        else:
+            command += ["-i", "pipe:0"]
+        command += ["-vn", "-ac", "1", "-ar", str(sr), "-f", "s16le", "pipe:1"]
+
+        # stderr goes to a temp file so a chatty ffmpeg can never block on a full pipe
+        self._stderr = tempfile.TemporaryFile()
+        try:
+            self._process = subprocess.Popen(
+                command,
+                stdin=subprocess.DEVNULL if input_path is not None else subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=self._stderr
+            )
+        except FileNotFoundError:
+            self._stderr.close()
+            raise RuntimeError("FFmpeg is not installed or not found in PATH. Please install FFmpeg to process audio files.")
+        if input_path is not None:
+            self._input_closed = True
+
+        self._reader = threading.Thread(target=self._read, daemon=True)
+        self._reader.start()
+
+    def _read(self):
+        max_pcm_bytes = None
+        if self.max_duration_sec is not None:
+            max_pcm_bytes = int(self.max_duration_sec * self.sr) * 2
+        while True:
+            data = self._process.stdout.read(self.read_size)
+            if not data:
+                return
+            self._chunks.append(data)
+            self._pcm_bytes += len(data)
+            if max_pcm_bytes is not None and self._pcm_bytes > max_pcm_bytes:
+                self._limit_error = AudioLimitError(f"Audio is longer than the {self.max_duration_sec:g} second limit")
+                self._chunks.clear()
+                self._process.kill()
+                return
+
+    def write(self, data):
+        """
+        Feeds the next piece of encoded input to ffmpeg.
+        """
+        if self._limit_error is not None:
+            raise self._limit_error
+        self.input_bytes += len(data)
+        if self.max_input_bytes is not None and self.input_bytes > self.max_input_bytes:
+            self._limit_error = AudioLimitError(f"Upload is larger than the {self.max_input_bytes / (1024 * 1024):g} MB limit")
+            self.abort()
+            raise self._limit_error
+        try:
+            self._process.stdin.write(data)
+        except (BrokenPipeError, OSError):
+            # ffmpeg has exited; finish() reports why
+            pass
+        return len(data)
+
+    def seek(self, offset, whence=0):
+        # Werkzeug seeks to the start once an uploaded file part is complete: that's the end of the input
+        self._close_input()
+        return 0
+
+    def _close_input(self):
+        if not self._input_closed:
+            self._input_closed = True
+            try:
+                self._process.stdin.close()
+            except (BrokenPipeError, OSError):
+                pass
+
+    def finish(self):
+        """
+        Waits for ffmpeg to drain and returns (y, sr).
+        """
+        self._close_input()
+        self._reader.join()
+        returncode = self._process.wait()
+        self._stderr.seek(0)
+        message = self._stderr.read().decode(errors="replace").strip()
+        self._stderr.close()
+
+        if self._limit_error is not None:
+            raise self._limit_error
+        if returncode != 0:
+            raise RuntimeError(f"Error processing audio file: {message.splitlines()[-1] if message else f'ffmpeg exited with {returncode}'}")
+
+        # Convert chunk by chunk, releasing each as it is copied
+        y = np.empty(self._pcm_bytes // 2, dtype=np.float32)
+        pos = 0
+        while self._chunks:
+            samples = np.frombuffer(self._chunks.popleft(), dtype=np.int16)
+            y[pos:pos + len(samples)] = samples
+            pos += len(samples)
+        # Scale integer PCM to [-1.0, 1.0]
+        y /= 32768.0
+        return y, self.sr
+
+    def abort(self):
+        """
+        Stops ffmpeg and drops anything decoded so far. Safe to call after finish().
+        """
+        self._close_input()
+        if self._process.poll() is None:
+            self._process.kill()
+        self._reader.join()
+        self._process.wait()
+        self._chunks.clear()
+        if not self._stderr.closed:
+            self._stderr.close()
+
 
 class AudioProcessor:
     def __init__(self):
         pass
 
-    def convert_to_wav(self, input_path):
+    def detect_speech(self, y, sr, top_db=20, pad_sec=0.1, min_gap_sec=0.3):
+        """
+        Voice activity detection based on the same librosa.effects.split threshold as the pause analysis.
+        Speech intervals are padded by pad_sec and merged across gaps shorter than min_gap_sec,
+        so only real pauses are cut out. Returns a SpeechTimeline.
+        """
+        intervals = split_nonsilent(y, top_db=top_db)
+        if len(intervals) == 0:
+            # Nothing above the threshold; keep everything rather than handing Whisper an empty buffer
+            return SpeechTimeline(intervals, [(0, len(y))], sr, len(y))
+
+        pad = int(pad_sec * sr)
+        min_gap = int(min_gap_sec * sr)
+        spans = []
+        for start, end in intervals:
+            start = max(0, int(start) - pad)
+            end = min(len(y), int(end) + pad)
+            if spans and start - spans[-1][1] < min_gap:
+                spans[-1][1] = max(spans[-1][1], end)
+            else:
+                spans.append([start, end])
+        return SpeechTimeline(intervals, spans, sr, len(y))
+
+    def load_audio(self, input_path, sr=TARGET_SR, max_duration_sec=None):
+        """
+        Decodes input audio/video once into a mono float32 NumPy buffer at `sr` Hz.
+        The buffer can be passed directly to Transcriber.transcribe and AcousticAnalyzer.analyze.
+        Returns (y, sr).
+        """
+        if not os.path.exists(input_path):
+            raise RuntimeError(f"Error processing audio file: {input_path} not found")
+        return StreamingDecoder(input_path, sr=sr, max_duration_sec=max_duration_sec).finish()
+
+    def convert_to_wav(self, input_path, output_path=None):
         """
         Converts input audio/video to WAV format suitable for processing.
-        Returns path to the temporary WAV file.
+        If output_path is not given, a unique temporary file is created; the caller is responsible for deleting it.
+        Returns path to the WAV file.
+        """
+        y, sr = self.load_audio(input_path)
+        return self.write_wav(y, sr, output_path)
+
+    def write_wav(self, y, sr, output_path=None):
+        """
+        Writes a decoded buffer to a WAV file. Only needed when a consumer requires a file (e.g. Gemini upload).
+        Returns path to the WAV file.
         """
-        file_ext = os.path.splitext(input_path)[1].lower()
-        output_path = "temp_audio.wav"
-        
+        if output_path is None:
+            fd, output_path = tempfile.mkstemp(prefix="audio_", suffix=".wav")
+            os.close(fd)
+        sf.write(output_path, y, sr, subtype="PCM_16")
+        return output_path
+
+    @contextmanager
+    def temp_wav(self, y, sr):
+        """
+        Yields the path of a request-unique temporary WAV file holding `y`, and deletes it afterwards.
+        """
+        path = self.write_wav(y, sr)
         try:
-            if file_ext == ".wav":
-                # Just copy or return original if it's already wav
-                # But to be safe and consistent with sampling rate, we might want to reload
-                audio = AudioSegment.from_file(input_path)
-            else:
-                audio = AudioSegment.from_file(input_path)
-            
-            # Export as wav, mono, 16kHz (good for Whisper)
-            audio = audio.set_channels(1).set_frame_rate(16000)
-            audio.export(output_path, format="wav")
-            return output_path
-        except FileNotFoundError:
-            raise RuntimeError("FFmpeg is not installed or not found in PATH. Please install FFmpeg to process audio files.")
-        except Exception as e:
-            raise RuntimeError(f"Error processing audio file: {str(e)}")
+            yield path
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def silence_chunks(self, y, sr, max_chunk_sec=30, top_db=20):
+        """
+        Plans contiguous chunks covering `y`, cut in the middle of silent gaps where possible,
+        none longer than max_chunk_sec. Returns a list of (start_sample, end_sample).
+        Uses the same librosa.effects.split threshold as the pause analysis.
+        """
+        max_len = int(max_chunk_sec * sr)
+        intervals = split_nonsilent(y, top_db=top_db)
+
+        chunks = []
+        chunk_start = 0
+        for i in range(1, len(intervals)):
+            cut = int((intervals[i - 1][1] + intervals[i][0]) // 2)
+            # Close the current chunk before the next voiced interval would push it past the limit
+            if intervals[i][1] - chunk_start > max_len and cut > chunk_start:
+                chunks.append((chunk_start, cut))
+                chunk_start = cut
+        chunks.append((chunk_start, len(y)))
+
+        # Voiced stretches without any usable gap still have to respect the limit
+        bounded = []
+        for start, end in chunks:
+            while end - start > max_len:
+                bounded.append((start, start + max_len))
+                start += max_len
+            if end > start:
+                bounded.append((start, end))
+        return bounded
 
     def load_audio_librosa(self, file_path):
         """
@@ -0,0 +1,234 @@
+import glob
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from audio_processor import AudioProcessor
+from analyzer import AcousticAnalyzer
+from metrics import observe_stage
+from result_cache import ResultCache
+
+
+def expand_inputs(inputs, manifest=None):
+    """
+    Resolves files, glob patterns and an optional manifest into a de-duplicated list of paths.
+    The manifest is either plain text (one path per line) or JSONL with a "file" or "path" field.
+    """
+    patterns = list(inputs or [])
+    if manifest:
+        with open(manifest, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                if line.startswith("{"):
+                    entry = json.loads(line)
+                    line = entry.get("file") or entry.get("path")
+                patterns.append(line)
+
+    paths = []
+    seen = set()
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        for path in matches:
+            if os.path.isdir(path):
+                continue
+            key = os.path.abspath(path)
+            if key not in seen:
+                seen.add(key)
+                paths.append(path)
+    return paths
+
+
+def load_completed(output_path):
+    """
+    Returns the set of files already processed successfully in an existing JSONL output.
+    A truncated last line from an interrupted run is ignored.
+    """
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("status") == "ok":
+                completed.add(os.path.abspath(record["file"]))
+    return completed
+
+
+def _terminate_last_line(output_path):
+    """
+    Makes sure new records don't get glued onto a half-written line left by an interrupted run.
+    """
+    if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+        return
+    with open(output_path, "rb+") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            f.write(b"\n")
+
+
+def _decode(path, vad=False, hash_audio=False):
+    """
+    Process pool task: decodes one file and detects speech (if vad). With hash_audio, also returns
+    the buffer's ResultCache.audio_hash, so the parent can look up cached results without hashing it.
+    """
+    processor = AudioProcessor()
+    timings = {}
+
+    start = time.perf_counter()
+    y, sr = processor.load_audio(path)
+    timings["decode"] = time.perf_counter() - start
+
+    timeline = None
+    if vad:
+        start = time.perf_counter()
+        timeline = processor.detect_speech(y, sr)
+        timings["vad"] = time.perf_counter() - start
+
+    audio_hash = ResultCache.audio_hash(y, sr) if hash_audio else None
+    return y, sr, timeline, audio_hash, timings
+
+
+def _analyze(y, sr, timeline, pitch_mode):
+    """
+    Process pool task: acoustic analysis of a decoded buffer. Returns (metrics, seconds).
+    """
+    start = time.perf_counter()
+    acoustic_metrics = AcousticAnalyzer(pitch_mode=pitch_mode).analyze(y, sr, timeline)
+    return acoustic_metrics, time.perf_counter() - start
+
+
+class _BatchItem:
+    def __init__(self, path, decode):
+        self.path = path
+        self.decode = decode
+        # Future of the acoustic analysis once started; stays None when the metrics are cached
+        self.acoustic = None
+        self.started = False
+
+
+class BatchRunner:
+    def __init__(self, pipeline, transcribe, reporter, transcribe_params, pitch_mode="pyin", workers=2, on_chunk=None):
+        """
+        Processes many files with a single Whisper model.
+        Decoding and acoustic analysis fan out over a process pool of `workers`, while
+        Whisper inference stays on the calling thread so the model is loaded exactly once.
+        Files whose acoustic metrics are already in the pipeline's cache (a re-run with other report
+        options, or a resumed batch) are only decoded; the analysis is not submitted again.
+        on_chunk: optional callable(chunk) for partial transcripts (see AnalysisPipeline.run).
+        """
+        self.pipeline = pipeline
+        self.transcribe = transcribe
+        self.reporter = reporter
+        self.transcribe_params = transcribe_params
+        self.pitch_mode = pitch_mode
+        self.workers = workers
+        self.on_chunk = on_chunk
+
+    def run(self, paths, output_path):
+        """
+        Appends one JSON line per file to output_path, skipping files already completed there.
+        Returns a summary dict with processed/skipped/failed counts.
+        """
+        completed = load_completed(output_path)
+        pending = [path for path in paths if os.path.abspath(path) not in completed]
+        skipped = len(paths) - len(pending)
+        if skipped:
+            print(f"Resuming: {skipped} file(s) already done, {len(pending)} to go")
+
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        _terminate_last_line(output_path)
+        processed = 0
+        failed = 0
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor, \
+                open(output_path, "a", encoding="utf-8") as out:
+            # Keep only a few decoded files in flight so memory stays bounded on large batches
+            in_flight = deque()
+            queue = deque(pending)
+            max_in_flight = self.workers * 2
+
+            hash_audio = self.pipeline.cache is not None
+
+            while queue or in_flight:
+                while queue and len(in_flight) < max_in_flight:
+                    path = queue.popleft()
+                    in_flight.append(_BatchItem(path, executor.submit(_decode, path, self.pipeline.vad, hash_audio)))
+                # Analysis of files decoded ahead runs in the pool while this thread transcribes
+                for item in in_flight:
+                    if not item.started and item.decode.done():
+                        self._start_acoustic(executor, item)
+
+                item = in_flight.popleft()
+                path = item.path
+                print(f"[{processed + failed + 1}/{len(pending)}] {path}")
+                try:
+                    record = self._process(executor, item)
+                    processed += 1
+                except Exception as e:
+                    print(f"Error processing {path}: {type(e).__name__}: {e}")
+                    record = {"file": path, "status": "error", "error": str(e)}
+                    failed += 1
+
+                out.write(json.dumps(record, default=_json_default) + "\n")
+                # Flush every line so an interrupted batch can resume from the last completed file
+                out.flush()
+                os.fsync(out.fileno())
+
+        return {"processed": processed, "skipped": skipped, "failed": failed, "output": output_path}
+
+    def _start_acoustic(self, executor, item):
+        item.started = True
+        if item.decode.exception() is not None:
+            return
+        y, sr, timeline, audio_hash, _ = item.decode.result()
+        if audio_hash is not None and self.pipeline.cached_acoustic(audio_hash) is not None:
+            return
+        item.acoustic = executor.submit(_analyze, y, sr, timeline, self.pitch_mode)
+
+    def _process(self, executor, item):
+        y, sr, timeline, audio_hash, worker_timings = item.decode.result()
+        if not item.started:
+            self._start_acoustic(executor, item)
+        acoustic_metrics = None
+        if item.acoustic is not None:
+            acoustic_metrics, worker_timings["acoustic"] = item.acoustic.result()
+        # Worker processes have their own metrics registry, so record their timings here
+        for stage, seconds in worker_timings.items():
+            observe_stage(stage, seconds, len(y) / sr)
+        # Without acoustic_metrics the pipeline reads them from the cache
+        result = self.pipeline.run(
+            y, sr, self.transcribe, self.reporter,
+            transcribe_params=self.transcribe_params, acoustic_metrics=acoustic_metrics,
+            timeline=timeline, audio_hash=audio_hash, on_chunk=self.on_chunk
+        )
+        timings = dict(result["timings"])
+        timings.update(worker_timings)
+        return {
+            "file": item.path,
+            "status": "ok",
+            "language": result["transcript_data"]["language"],
+            "transcript": result["transcript_data"]["text"],
+            "metrics": {
+                "acoustic": result["acoustic_metrics"],
+                "text": result["text_metrics"]
+            },
+            "report": result["report"],
+            "timings": timings,
+            "cache_hits": result["cache_hits"],
+            "llm_usage": result["llm_usage"],
+            "vad": result["vad"]
+        }
+
+
+def _json_default(value):
+    # NumPy scalars that leak into metrics dicts
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
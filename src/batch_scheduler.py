@@ -0,0 +1,264 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import torch
+import whisper
+
+from audio_processor import AudioProcessor, TARGET_SR
+from metrics import REGISTRY
+from transcript import compact_segments
+
+BATCH_SIZE = REGISTRY.histogram("speech_whisper_batch_size", "Windows decoded per batched Whisper pass",
+                                buckets=(1, 2, 4, 8, 16, 32))
+BATCH_WAIT = REGISTRY.histogram("speech_whisper_batch_wait_seconds", "Time a window waited before its batch started",
+                                buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5))
+
+# Whisper's timestamp tokens are 20 ms apart
+TIMESTAMP_RESOLUTION = 0.02
+
+
+class _Window:
+    def __init__(self, mel, language):
+        self.mel = mel
+        self.language = language
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class WhisperBatchScheduler:
+    def __init__(self, transcriber, lock, max_batch_size=8, max_wait_ms=30):
+        """
+        Collects pending 30-second windows from concurrent requests and decodes them as one
+        batched tensor on the shared Whisper model.
+        lock: the model's lock (from TranscriberRegistry); held for each batched pass only,
+            so other requests can queue windows in the meantime.
+        max_batch_size: most windows decoded in one pass.
+        max_wait_ms: how long the first window of a batch waits for company.
+
+        Decoding is greedy at temperature 0 with timestamps; unlike Transcriber.transcribe there is
+        no temperature fallback, and windows are the silence-delimited chunks from
+        AudioProcessor.silence_chunks rather than Whisper's own seek loop.
+        """
+        self.model = transcriber.model
+        self.lock = lock
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.device = next(self.model.parameters()).device
+        self.n_mels = getattr(self.model.dims, "n_mels", 80)
+
+        self._queue = queue.Queue()
+        self._stopped = threading.Event()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.windows = 0
+        self.total_wait = 0.0
+        self._active_requests = 0
+        # Set by the worker thread when it exits; requests can't register after that
+        self._exited = False
+
+        self._thread = threading.Thread(target=self._loop, name="whisper-batcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Lets the worker thread exit once requests already in progress have finished.
+        """
+        self._stopped.set()
+
+    def register(self):
+        """
+        Counts a request in progress, which keeps the worker thread running (even after stop)
+        until release(). Returns False if the thread has already exited.
+        """
+        with self._stats_lock:
+            if self._exited:
+                return False
+            self._active_requests += 1
+            return True
+
+    def release(self):
+        with self._stats_lock:
+            self._active_requests -= 1
+
+    def transcribe(self, audio, language=None, on_chunk=None, verbose=False):
+        """
+        Same contract as Transcriber.transcribe: returns text, segments and language.
+        on_chunk(chunk) is called for each window in order as its result becomes available.
+        Raises RuntimeError if the scheduler has already shut down; use TranscriberRegistry.scheduler,
+        which registers the request before the model can be evicted.
+        """
+        if not self.register():
+            raise RuntimeError("Whisper batch scheduler has shut down (its model was evicted)")
+        try:
+            return self._transcribe(audio, language, on_chunk, verbose)
+        finally:
+            self.release()
+
+    def _transcribe(self, audio, language, on_chunk, verbose):
+        chunks = AudioProcessor().silence_chunks(audio, TARGET_SR, max_chunk_sec=30)
+        if not chunks:
+            return {"text": "", "segments": [], "language": language}
+        if language is None:
+            language = self._detect_language(audio[chunks[0][0]:chunks[0][1]])
+
+        texts = []
+        segments = []
+        # Keep a bounded number of this request's windows in the queue so one long file can't starve others
+        in_flight = deque()
+        pending = deque(enumerate(chunks))
+        while pending or in_flight:
+            while pending and len(in_flight) < self.max_batch_size:
+                index, (start, end) = pending.popleft()
+                window = _Window(self._mel(audio[start:end]), language)
+                self._queue.put(window)
+                in_flight.append((index, start, end, window))
+
+            index, start, end, window = in_flight.popleft()
+            result = window.future.result()
+            chunk_segments = self._segments(result, language, start / TARGET_SR, end / TARGET_SR, len(segments))
+            if not verbose:
+                chunk_segments = compact_segments(chunk_segments)
+            chunk_text = "".join(segment["text"] for segment in chunk_segments)
+            texts.append(chunk_text)
+            segments.extend(chunk_segments)
+            if on_chunk:
+                on_chunk({
+                    "chunk": index,
+                    "chunks": len(chunks),
+                    "start": start / TARGET_SR,
+                    "end": end / TARGET_SR,
+                    "text": chunk_text,
+                    "segments": chunk_segments,
+                    "language": language
+                })
+
+        return {"text": "".join(texts), "segments": segments, "language": language}
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "batches": self.batches,
+                "windows": self.windows,
+                "mean_batch_size": self.windows / self.batches if self.batches else 0.0,
+                "mean_wait_sec": self.total_wait / self.windows if self.windows else 0.0,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000
+            }
+
+    def _mel(self, audio):
+        return whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), n_mels=self.n_mels)
+
+    def _detect_language(self, audio):
+        mel = self._mel(audio).to(self.device)
+        with self.lock:
+            _, probs = self.model.detect_language(mel)
+        return max(probs, key=probs.get)
+
+    def _finished(self):
+        with self._stats_lock:
+            if self._stopped.is_set() and self._active_requests == 0 and self._queue.empty():
+                self._exited = True
+            return self._exited
+
+    def _loop(self):
+        while not self._finished():
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            deadline = first.enqueued_at + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            # DecodingOptions carries a single language, so mixed-language batches are split
+            groups = {}
+            for window in batch:
+                groups.setdefault(window.language, []).append(window)
+            for language, windows in groups.items():
+                self._decode(language, windows)
+
+    def _decode(self, language, windows):
+        started = time.perf_counter()
+        waits = [started - window.enqueued_at for window in windows]
+        try:
+            mels = torch.stack([window.mel for window in windows]).to(self.device)
+            options = whisper.DecodingOptions(language=language, task="transcribe",
+                                              fp16=self.device.type == "cuda", without_timestamps=False)
+            with self.lock:
+                results = self.model.decode(mels, options)
+            for window, result in zip(windows, results):
+                window.future.set_result(result)
+        except Exception as e:
+            for window in windows:
+                if not window.future.done():
+                    window.future.set_exception(e)
+
+        BATCH_SIZE.observe(len(windows))
+        for wait in waits:
+            BATCH_WAIT.observe(wait)
+        with self._stats_lock:
+            self.batches += 1
+            self.windows += len(windows)
+            self.total_wait += sum(waits)
+
+    def _segments(self, result, language, offset, window_end, first_id):
+        """
+        Splits a window's decoded tokens into segments at Whisper's timestamp tokens.
+        """
+        # Same silence test as whisper.transcribe uses to skip windows
+        if result.no_speech_prob > 0.6 and result.avg_logprob < -1:
+            return []
+
+        tokenizer = self._tokenizer(language)
+        timestamp_begin = tokenizer.timestamp_begin
+        spans = []
+        start = None
+        text_tokens = []
+        for token in result.tokens:
+            if token >= timestamp_begin:
+                t = (token - timestamp_begin) * TIMESTAMP_RESOLUTION
+                if text_tokens:
+                    spans.append((start if start is not None else 0.0, t, text_tokens))
+                    text_tokens = []
+                    start = None
+                else:
+                    start = t
+            elif token < tokenizer.eot:
+                text_tokens.append(token)
+        if text_tokens:
+            spans.append((start if start is not None else 0.0, window_end - offset, text_tokens))
+
+        segments = []
+        for i, (start, end, tokens) in enumerate(spans):
+            segments.append({
+                "id": first_id + i,
+                "seek": int(offset * 100),
+                "start": offset + start,
+                "end": min(offset + end, window_end),
+                "text": tokenizer.decode(tokens),
+                "tokens": tokens,
+                "temperature": result.temperature,
+                "avg_logprob": result.avg_logprob,
+                "compression_ratio": result.compression_ratio,
+                "no_speech_prob": result.no_speech_prob
+            })
+        return segments
+
+    def _tokenizer(self, language):
+        try:
+            return whisper.tokenizer.get_tokenizer(self.model.is_multilingual, num_languages=self.model.num_languages,
+                                                   language=language, task="transcribe")
+        except TypeError:
+            # Older openai-whisper releases don't take num_languages
+            return whisper.tokenizer.get_tokenizer(self.model.is_multilingual, language=language, task="transcribe")
@@ -0,0 +1,162 @@
+import threading
+import queue
+import time
+import uuid
+
+
+class QueueFullError(Exception):
+    """
+    Raised when a job is submitted while the queue is at its maximum depth.
+    """
+    pass
+
+
+class Job:
+    def __init__(self, func, args, kwargs, id_prefix=""):
+        self.id = f"{id_prefix}{uuid.uuid4()}"
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+        self.status = "queued"  # queued -> running -> done | failed
+        self.stage = "queued"
+        self.events = []
+        self.result = None
+        self.error = None
+
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+        self._cond = threading.Condition()
+
+    def update(self, stage, **data):
+        """
+        Records a progress event for this job and wakes up any waiting streams.
+        """
+        with self._cond:
+            self.stage = stage
+            event = {"stage": stage, "time": time.time()}
+            event.update(data)
+            self.events.append(event)
+            self._cond.notify_all()
+
+    def _finish(self, status, result=None, error=None):
+        with self._cond:
+            self.status = status
+            self.stage = status
+            self.result = result
+            self.error = error
+            self.finished_at = time.time()
+            self.events.append({"stage": status, "time": self.finished_at})
+            self._cond.notify_all()
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed")
+
+    def wait_for_events(self, seen, timeout=None):
+        """
+        Blocks until there are more than `seen` events or the job finishes.
+        Returns the list of new events.
+        """
+        with self._cond:
+            if len(self.events) <= seen and not self.finished:
+                self._cond.wait(timeout)
+            return self.events[seen:]
+
+    def to_dict(self):
+        with self._cond:
+            data = {
+                "job_id": self.id,
+                "status": self.status,
+                "stage": self.stage,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+            if self.status == "done":
+                data["result"] = self.result
+            elif self.status == "failed":
+                data["error"] = self.error
+            return data
+
+
+class JobQueue:
+    def __init__(self, num_workers=2, max_queue=8, result_ttl=600, id_prefix=""):
+        """
+        Bounded job queue served by a fixed pool of worker threads.
+        num_workers: number of jobs processed concurrently.
+        max_queue: maximum number of jobs waiting to start; submit() raises QueueFullError beyond this.
+        result_ttl: seconds a finished job is kept around for polling.
+        id_prefix: prepended to job ids, so a multi-process server can tell which process owns a job.
+        """
+        self.num_workers = num_workers
+        self.max_queue = max_queue
+        self.result_ttl = result_ttl
+        self.id_prefix = id_prefix
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._workers = []
+
+        for i in range(num_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Queues func(job, *args, **kwargs) for execution and returns the Job.
+        The function receives the Job so it can report progress via job.update().
+        """
+        self._prune()
+        job = Job(func, args, kwargs, id_prefix=self.id_prefix)
+        with self._lock:
+            self._jobs[job.id] = job
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job.id]
+            raise QueueFullError(f"Job queue is full ({self.max_queue} jobs waiting)")
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def depth(self):
+        """
+        Number of jobs waiting to be picked up by a worker.
+        """
+        return self._queue.qsize()
+
+    def _worker_loop(self):
+        while True:
+            job = self._queue.get()
+            job.started_at = time.time()
+            job.status = "running"
+            job.update("running")
+            try:
+                result = job.func(job, *job.args, **job.kwargs)
+                job._finish("done", result=result)
+            except Exception as e:
+                print(f"Job {job.id} failed: {type(e).__name__}: {e}")
+                import traceback
+                traceback.print_exc()
+                job._finish("failed", error=str(e))
+            finally:
+                self._queue.task_done()
+
+    def _prune(self):
+        """
+        Drops finished jobs older than result_ttl.
+        """
+        cutoff = time.time() - self.result_ttl
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished and job.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
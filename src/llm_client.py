@@ -0,0 +1,279 @@
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+GROQ_MODEL_ID = "llama-3.3-70b-versatile"
+GEMINI_MODEL_ID = "gemini-2.0-flash"
+
+
+class LLMError(Exception):
+    """
+    Raised when an LLM call fails after all retries.
+    """
+    pass
+
+
+class ProviderClient:
+    def __init__(self, api_key, model_id, timeout=60.0, max_retries=3, max_concurrency=4,
+                 backoff_base=1.0, backoff_max=30.0, base_url=None):
+        """
+        Long-lived client for one provider. The underlying SDK client (and its HTTP connection pool)
+        is created once and shared by every request.
+        timeout: per-attempt timeout in seconds.
+        max_retries: retries after the first attempt on 429/5xx and connection errors.
+        max_concurrency: maximum in-flight calls to this provider across all threads.
+        base_url: override the API endpoint, e.g. to point at a local stand-in server.
+        """
+        self.api_key = api_key
+        self.model_id = model_id
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.base_url = base_url
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+
+    def generate_json(self, prompt, audio_path=None, audio=None, system=None, usage=None):
+        """
+        Sends the prompt and returns the parsed JSON response.
+        system: static instructions sent ahead of the prompt (system message / system instruction).
+            Keeping them byte-identical across requests lets providers that cache prompt prefixes reuse them.
+        usage: optional dict filled with the provider's prompt_tokens, cached_prompt_tokens and
+            completion_tokens for this call, where the provider reports them.
+        """
+        raise NotImplementedError
+
+    def _with_retries(self, func):
+        """
+        Calls func() under the concurrency limit, retrying retryable errors with exponential backoff and jitter.
+        """
+        attempt = 0
+        while True:
+            try:
+                with self._semaphore:
+                    return func()
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    raise LLMError(f"{type(self).__name__} failed after {attempt + 1} attempt(s): {type(e).__name__}: {e}") from e
+                delay = _retry_after(e)
+                if delay is None:
+                    delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+                    delay *= random.uniform(0.5, 1.0)
+                print(f"{type(self).__name__}: {type(e).__name__} on attempt {attempt + 1}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+
+
+class GroqClient(ProviderClient):
+    def __init__(self, api_key, model_id=GROQ_MODEL_ID, **kwargs):
+        super().__init__(api_key, model_id, **kwargs)
+        from groq import Groq
+        # Retries are handled by _with_retries so they can share the backoff policy with other providers
+        self.sdk = Groq(api_key=api_key, base_url=self.base_url, timeout=self.timeout, max_retries=0)
+
+    def generate_json(self, prompt, audio_path=None, audio=None, system=None, usage=None):
+        # For Groq, we just use the text prompt since it's Llama 3 (audio upload not native in this context)
+        # We append a specific JSON instruction for Llama to ensure strict parsing
+        prompt = prompt + "\nIMPORTANT: Valid JSON output only."
+
+        def call():
+            chat_completion = self.sdk.chat.completions.create(
+                messages=[
+                    {
+                        "role": "system",
+                        "content": system or "You are a helpful assistant that outputs strictly in JSON."
+                    },
+                    {
+                        "role": "user",
+                        "content": prompt,
+                    }
+                ],
+                model=self.model_id,
+                response_format={"type": "json_object"},
+            )
+            counts = getattr(chat_completion, "usage", None)
+            if usage is not None and counts is not None:
+                details = getattr(counts, "prompt_tokens_details", None)
+                usage.update(prompt_tokens=counts.prompt_tokens or 0, completion_tokens=counts.completion_tokens or 0,
+                             cached_prompt_tokens=getattr(details, "cached_tokens", None) or 0)
+            return json.loads(chat_completion.choices[0].message.content)
+
+        return self._with_retries(call)
+
+
+class GeminiClient(ProviderClient):
+    def __init__(self, api_key, model_id=GEMINI_MODEL_ID, **kwargs):
+        super().__init__(api_key, model_id, **kwargs)
+        from google import genai
+        from google.genai import types
+        self._types = types
+        http_options = types.HttpOptions(timeout=int(self.timeout * 1000), base_url=self.base_url)
+        self.sdk = genai.Client(api_key=api_key, http_options=http_options)
+
+    def generate_json(self, prompt, audio_path=None, audio=None, system=None, usage=None):
+        contents = []
+
+        # If audio is available, upload and include it
+        audio_file = self._upload_audio(audio_path, audio)
+        if audio_file is not None:
+            contents.append(audio_file)
+            prompt = "Listen to the attached audio and analyze the speech based on the transcript and metrics below.\n" + prompt
+
+        contents.append(prompt)
+
+        def call():
+            response = self.sdk.models.generate_content(
+                model=self.model_id,
+                contents=contents,
+                config=self._types.GenerateContentConfig(
+                    response_mime_type="application/json",
+                    system_instruction=system
+                )
+            )
+            counts = getattr(response, "usage_metadata", None)
+            if usage is not None and counts is not None:
+                usage.update(prompt_tokens=counts.prompt_token_count or 0, completion_tokens=counts.candidates_token_count or 0,
+                             cached_prompt_tokens=counts.cached_content_token_count or 0)
+            return json.loads(response.text)
+
+        return self._with_retries(call)
+
+    def _upload_audio(self, audio_path, audio):
+        """
+        Uploads audio from a path, or from an in-memory (y, sr) buffer via a request-unique temp file.
+        """
+        if audio_path and os.path.exists(audio_path):
+            print(f"Uploading audio to Gemini: {audio_path}")
+            return self._with_retries(lambda: self.sdk.files.upload(file=audio_path))
+        if audio is not None:
+            from audio_processor import AudioProcessor
+            y, sr = audio
+            with AudioProcessor().temp_wav(y, sr) as temp_path:
+                print(f"Uploading audio to Gemini: {temp_path}")
+                return self._with_retries(lambda: self.sdk.files.upload(file=temp_path))
+        return None
+
+
+class HedgedClient:
+    def __init__(self, primary, secondary, deadline):
+        """
+        Sends to `primary` and only starts `secondary` if no answer arrives within `deadline`
+        seconds (or primary fails). The first successful response wins.
+        """
+        self.primary = primary
+        self.secondary = secondary
+        self.deadline = deadline
+        self.model_id = f"{primary.model_id}|{secondary.model_id}"
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-hedge")
+
+    def generate_json(self, prompt, audio_path=None, audio=None, system=None, usage=None):
+        # Each attempt counts its own tokens; only the winner's are reported
+        usages = {}
+
+        def submit(client):
+            usages[client] = {}
+            return self._executor.submit(client.generate_json, prompt, audio_path=audio_path, audio=audio,
+                                         system=system, usage=usages[client])
+
+        def result(future, client):
+            if usage is not None:
+                usage.update(usages[client])
+            return future.result()
+
+        primary_future = submit(self.primary)
+        done, _ = wait([primary_future], timeout=self.deadline)
+        if done and primary_future.exception() is None:
+            return result(primary_future, self.primary)
+
+        print(f"Primary LLM {'failed' if done else 'exceeded ' + str(self.deadline) + 's'}, hedging to {type(self.secondary).__name__}")
+        secondary_future = submit(self.secondary)
+        clients = {primary_future: self.primary, secondary_future: self.secondary}
+        pending = {primary_future, secondary_future}
+        errors = []
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return result(future, clients[future])
+                errors.append(future.exception())
+        raise LLMError(f"All hedged providers failed: {'; '.join(str(e) for e in errors)}")
+
+
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+
+PROVIDER_CLASSES = {
+    "groq": GroqClient,
+    "gemini": GeminiClient,
+}
+
+
+def get_client(provider, api_key):
+    """
+    Returns the shared client for (provider, api_key), creating it on first use.
+    Timeouts, retries, concurrency and endpoints come from LLM_TIMEOUT, LLM_MAX_RETRIES,
+    LLM_MAX_CONCURRENCY and GROQ_BASE_URL / GEMINI_BASE_URL.
+    """
+    key = (provider, api_key)
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            client = PROVIDER_CLASSES[provider](
+                api_key,
+                timeout=float(os.getenv("LLM_TIMEOUT", "60")),
+                max_retries=int(os.getenv("LLM_MAX_RETRIES", "3")),
+                max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "4")),
+                base_url=os.getenv(f"{provider.upper()}_BASE_URL") or None
+            )
+            _CLIENTS[key] = client
+        return client
+
+
+def get_hedged_client(primary, secondary, deadline):
+    """
+    Returns the shared HedgedClient for (primary, secondary, deadline), creating it on first use,
+    so its worker threads are started once per process rather than once per report.
+    """
+    key = ("hedged", primary, secondary, deadline)
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            client = HedgedClient(primary, secondary, deadline)
+            _CLIENTS[key] = client
+        return client
+
+
+def _status_code(error):
+    # groq.APIStatusError exposes status_code, google.genai.errors.APIError exposes code
+    for attr in ("status_code", "code"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def _is_retryable(error):
+    status = _status_code(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    # Connection resets and timeouts from the SDKs (APIConnectionError, APITimeoutError, httpx errors)
+    name = type(error).__name__
+    return isinstance(error, (TimeoutError, ConnectionError)) or "Timeout" in name or "Connection" in name
+
+
+def _retry_after(error):
+    """
+    Seconds to wait according to the server's Retry-After header, if it sent one.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
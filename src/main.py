@@ -1,25 +1,130 @@
 import argparse
 import os
+import sys
 import json
 from audio_processor import AudioProcessor
-from transcriber import Transcriber
-from analyzer import AcousticAnalyzer, TextAnalyzer
-from reporter import Reporter
-from groq import Groq
+from transcriber import Transcriber, PRECISIONS
+from pipeline import AnalysisPipeline
+from analyzer import AcousticAnalyzer
+from pitch import PITCH_MODES
+from result_cache import ResultCache
+from reporter import Reporter, LLM_MODES
+from batch import BatchRunner, expand_inputs
+from metrics import REGISTRY, stage_timer
+from transcript import TRANSCRIPT_FORMATS, write_transcript
 
-def main():
+def add_common_arguments(parser):
+    """
+    Options shared by single-file and batch mode.
+    """
+    parser.add_argument("--api_key", help="Gemini API Key (optional, can be set via env var GEMINI_API_KEY)", default=None)
+    parser.add_argument("--groq_api_key", help="Groq API Key (optional, can be set via env var GROQ_API_KEY)", default=None)
+    parser.add_argument("--provider", help="LLM Provider: 'auto', 'gemini', 'groq'", default="auto")
+    parser.add_argument("--llm_mode", help="'off': metric-based scores only (no network); 'enrich': LLM adds content ratings, summary and tips; 'full': LLM rates everything",
+                        choices=LLM_MODES, default="enrich")
+    parser.add_argument("--token_budget", help="Estimated tokens per LLM prompt; longer transcripts are summarized in sections first", type=int, default=8000)
+    parser.add_argument("--hedge_deadline", help="Seconds to wait for Groq before also asking Gemini (needs both keys)", type=float, default=None)
+    parser.add_argument("--language", help="Language code (e.g., 'en', 'mr', 'hi'). If not set, auto-detects.", default=None)
+    parser.add_argument("--model", help="Whisper model size (tiny, base, small, medium, large)", default="base")
+    parser.add_argument("--precision", help="Whisper weights: 'fp32' or 'int8' (dynamic quantization, CPU only)", choices=PRECISIONS, default="fp32")
+    parser.add_argument("--threads", help="torch threads for Whisper inference (default: torch's choice)", type=int, default=None)
+    parser.add_argument("--cache_path", help="SQLite file for cached stage results", default=os.path.join("output", "cache", "results.sqlite"))
+    parser.add_argument("--no_cache", help="Disable the result cache", action="store_true")
+    parser.add_argument("--stream", help="Transcribe in silence-delimited chunks and print partial transcripts as they finish", action="store_true")
+    parser.add_argument("--profile", help="Write per-stage timings, real-time factors and model-load events as JSON (default path: output/profile.json)",
+                        nargs="?", const=os.path.join("output", "profile.json"), default=None)
+    parser.add_argument("--no_vad", help="Feed silences to Whisper and the pitch tracker instead of trimming them first", action="store_true")
+    parser.add_argument("--pitch_mode", help="Pitch tracker: 'pyin' (accurate) or 'fast' (vectorized YIN, speech range)", choices=PITCH_MODES, default="pyin")
+    parser.add_argument("--verbose_transcript", help="Keep Whisper's raw segment fields (tokens, temperature, log-probabilities) in the transcript", action="store_true")
+
+def build_reporter(args):
+    # Initialize reporter with keys and provider preference
+    # api_key is used for Gemini, groq_api_key explicitly for Groq
+    return Reporter(api_key=args.api_key, provider=args.provider, groq_api_key=args.groq_api_key,
+                    hedge_deadline=args.hedge_deadline, llm_mode=args.llm_mode, token_budget=args.token_budget)
+
+def build_transcribe_params(args):
+    # Everything that changes the transcript, so cached transcripts are only reused when they match
+    return {"model_size": args.model, "language": args.language, "chunked": args.stream, "precision": args.precision,
+            "verbose": args.verbose_transcript}
+
+def make_transcribe(args):
+    """
+    Returns a transcribe(audio, on_chunk) callable (see AnalysisPipeline.run) that loads the Whisper
+    model on first use and then reuses it. A fully cached run never loads the model at all.
+    """
+    transcriber = None
+
+    def transcribe(audio, on_chunk=None):
+        nonlocal transcriber
+        if transcriber is None:
+            transcriber = Transcriber(model_size=args.model, precision=args.precision, threads=args.threads)
+        return transcriber.transcribe(audio, language=args.language, chunked=args.stream, on_chunk=on_chunk,
+                                      verbose=args.verbose_transcript)
+
+    return transcribe
+
+def print_chunk(chunk):
+    print(f"[{chunk['start']:.1f}s - {chunk['end']:.1f}s] {chunk['text'].strip()}")
+
+def write_profile(path):
+    """
+    Dumps the collected metrics (same data as the web app's /metrics endpoint) as JSON.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(REGISTRY.snapshot(), f, indent=4)
+    print(f"Profile saved to {path}")
+
+def add_ffmpeg_to_path():
     # Add FFmpeg to PATH for the current session
     ffmpeg_path = r"C:\Users\Admin\AppData\Local\Microsoft\WinGet\Packages\Gyan.FFmpeg_Microsoft.Winget.Source_8wekyb3d8bbwe\ffmpeg-8.0.1-full_build\bin"
     if os.path.exists(ffmpeg_path):
         os.environ["PATH"] += os.pathsep + ffmpeg_path
+
+def batch_main(argv):
+    parser = argparse.ArgumentParser(prog="main.py batch", description="Analyze many audio files with a single model load")
+    parser.add_argument("inputs", nargs="*", help="Audio files or glob patterns (quote globs, e.g. \"recordings/**/*.mp3\")")
+    parser.add_argument("--manifest", help="Text file with one path per line, or JSONL with a 'file' field", default=None)
+    parser.add_argument("--output", help="JSONL file to append results to (existing results are skipped on resume)", default=os.path.join("output", "batch_results.jsonl"))
+    parser.add_argument("--workers", help="Processes for decoding and acoustic analysis", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    add_common_arguments(parser)
+
+    args = parser.parse_args(argv)
+
+    paths = expand_inputs(args.inputs, args.manifest)
+    if not paths:
+        print("Error: No input files found")
+        return
+
+    reporter = build_reporter(args)
+    cache = None if args.no_cache else ResultCache(args.cache_path)
+    pipeline = AnalysisPipeline(acoustic_analyzer=AcousticAnalyzer(pitch_mode=args.pitch_mode), cache=cache, vad=not args.no_vad)
+    runner = BatchRunner(
+        pipeline, make_transcribe(args), reporter,
+        transcribe_params=build_transcribe_params(args),
+        pitch_mode=args.pitch_mode, workers=args.workers, on_chunk=print_chunk
+    )
+
+    print(f"Processing {len(paths)} file(s) with {args.workers} worker(s)...")
+    summary = runner.run(paths, args.output)
+    print(f"\nDone: {summary['processed']} processed, {summary['skipped']} skipped, {summary['failed']} failed")
+    print(f"Results saved to {summary['output']}")
+
+    if args.profile:
+        write_profile(args.profile)
+
+def main():
+    add_ffmpeg_to_path()
+
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        return batch_main(sys.argv[2:])
     
-    parser = argparse.ArgumentParser(description="Audio Analysis and Rating System")
+    parser = argparse.ArgumentParser(description="Audio Analysis and Rating System (use 'main.py batch --help' for batch mode)")
     parser.add_argument("input_file", help="Path to the input audio/video file")
-    parser.add_argument("--api_key", help="Gemini API Key (optional, can be set via env var GEMINI_API_KEY)", default=None)
-    parser.add_argument("--groq_api_key", help="Groq API Key (optional, can be set via env var GROQ_API_KEY)", default=None)
-    parser.add_argument("--provider", help="LLM Provider: 'auto', 'gemini', 'groq'", default="auto")
-    parser.add_argument("--language", help="Language code (e.g., 'en', 'mr', 'hi'). If not set, auto-detects.", default=None)
-    parser.add_argument("--model", help="Whisper model size (tiny, base, small, medium, large)", default="base")
+    parser.add_argument("--transcript_format", help="'json', 'jsonl' (one segment per line) or 'npz' (compressed binary arrays)",
+                        choices=TRANSCRIPT_FORMATS, default="json")
+    add_common_arguments(parser)
     
     args = parser.parse_args()
     
@@ -30,53 +135,34 @@ def main():
 
     print(f"Processing file: {input_path}")
     
-    # 1. Preprocessing
+    # 1. Preprocessing: decode once into a 16 kHz mono buffer shared by every stage
     processor = AudioProcessor()
     try:
-        wav_path = processor.convert_to_wav(input_path)
+        with stage_timer("decode"):
+            y, sr = processor.load_audio(input_path)
     except Exception as e:
         print(f"Error converting audio: {e}")
         return
 
     # 2. Transcription
-    transcriber = Transcriber(model_size=args.model)
-    transcript_data = transcriber.transcribe(wav_path, language=args.language)
+    # The Whisper model is only loaded if the transcript is not already cached
+    transcribe = make_transcribe(args)
+
+    # 3. Reporter setup
+    reporter = build_reporter(args)
+
+    # 4. Analysis and Reporting
+    # Acoustic analysis runs in parallel with transcription, then text metrics and the report join on both.
+    # The decoded audio is passed on to the report stage for native audio analysis if the provider supports it.
+    print("Running transcription and acoustic analysis...")
+    cache = None if args.no_cache else ResultCache(args.cache_path)
+    pipeline = AnalysisPipeline(acoustic_analyzer=AcousticAnalyzer(pitch_mode=args.pitch_mode), cache=cache, vad=not args.no_vad)
+    result = pipeline.run(y, sr, transcribe, reporter,
+                          transcribe_params=build_transcribe_params(args), on_chunk=print_chunk)
+    transcript_data = result["transcript_data"]
+    report = result["report"]
     print(f"Detected Language: {transcript_data['language']}")
     print(f"Transcript start: {transcript_data['text'][:100]}...")
-
-    # 3. Analysis
-    # Acoustic
-    print("Running acoustic analysis...")
-    y, sr = processor.load_audio_librosa(wav_path)
-    acoustic_analyzer = AcousticAnalyzer()
-    acoustic_metrics = acoustic_analyzer.analyze(y, sr)
-    
-    # Text
-    print("Running text analysis...")
-    text_analyzer = TextAnalyzer()
-    text_metrics = text_analyzer.analyze(transcript_data)
-
-    # 4. Reporting
-    # 4. Reporting
-    print("Generating report...")
-    # Initialize reporter with keys and provider preference
-    # Note: We pass api_key as 'api_key' which Reporter uses for Gemini, and groq_key explicitly if needed
-    # Ideally Reporter constructor handles the logic of which key to use based on provider
-    
-    # We pass the gemini key to api_key param for backward compat, and handle groq logic inside
-    reporter = Reporter(api_key=args.api_key, provider=args.provider)
-    if args.groq_api_key:
-        reporter.groq_key = args.groq_api_key
-        # Re-evaluate provider logic if key was just set (or better, modify Reporter __init__ to accept kwargs, but let's just set it)
-        if reporter.provider == "auto" or reporter.provider == "groq":
-             if reporter.groq_key and reporter.groq_key.startswith("gsk_"):
-                reporter.provider = "groq"
-                reporter.client = Groq(api_key=reporter.groq_key)
-                reporter.model_id = "llama-3.3-70b-versatile"
-                print("Using Provider: Groq (Llama 3) via explicit key")
-
-    # Pass wav_path for native audio analysis if available
-    report = reporter.generate_report(transcript_data['text'], acoustic_metrics, text_metrics, audio_path=wav_path)
     
     # Output
     output_dir = "output"
@@ -89,9 +175,8 @@ def main():
     print(f"Report saved to {output_path}")
     
     # Save transcript
-    transcript_path = os.path.join(output_dir, "transcript.json")
-    with open(transcript_path, "w") as f:
-        json.dump(transcript_data, f, indent=4)
+    transcript_path = os.path.join(output_dir, f"transcript.{args.transcript_format}")
+    write_transcript(transcript_data, transcript_path, args.transcript_format)
     print(f"Transcript saved to {transcript_path}")
     
     # Print summary to console
@@ -103,9 +188,31 @@ def main():
         for category, data in report["ratings"].items():
             print(f"{category}: {data['score']}/10 - {data['reason']}")
 
-    # Cleanup
-    if os.path.exists(wav_path) and wav_path != input_path:
-        os.remove(wav_path)
+    if result["vad"]:
+        print(f"\nVAD: {result['vad']['speech_sec']:.1f}s of speech kept, {result['vad']['removed_sec']:.1f}s of silence skipped")
+
+    usage = result["llm_usage"]
+    if usage:
+        print("\n--- LLM ---")
+        print(f"{usage['calls']} call(s) ({usage['sections']} section summaries) in {usage['latency_sec']:.2f}s, "
+              f"~{usage['estimated_prompt_tokens']} prompt tokens estimated")
+        if usage["prompt_tokens"]:
+            print(f"Provider counted {usage['prompt_tokens']} prompt tokens ({usage['cached_prompt_tokens']} cached), "
+                  f"{usage['completion_tokens']} completion tokens")
+
+    print("\n--- Cache ---")
+    for stage, hit in result["cache_hits"].items():
+        print(f"{stage}: {'hit' if hit else 'miss'}")
+
+    print("\n--- Stage Timings ---")
+    for stage, value in result["timings"].items():
+        if isinstance(value, float):
+            print(f"{stage}: {value:.2f}s")
+        else:
+            print(f"{stage}: {value}")
+
+    if args.profile:
+        write_profile(args.profile)
 
 if __name__ == "__main__":
     main()
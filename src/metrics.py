@@ -0,0 +1,217 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Buckets in seconds, from sub-second text analysis up to multi-minute transcriptions
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+# Real-time factor: processing time / audio duration
+RTF_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10)
+
+
+class _Metric:
+    type_name = None
+
+    def __init__(self, name, help_text, registry):
+        self.name = name
+        self.help = help_text
+        self._lock = registry._lock
+        self._values = {}
+
+    @staticmethod
+    def _key(labels):
+        return tuple(sorted(labels.items()))
+
+    @staticmethod
+    def _format_labels(key, extra=()):
+        pairs = list(key) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, value=1, **labels):
+        with self._lock:
+            key = self._key(labels)
+            self._values[key] = self._values.get(key, 0) + value
+
+    def _render(self):
+        return [f"{self.name}{self._format_labels(key)} {value}" for key, value in self._values.items()]
+
+    def _snapshot(self):
+        return [{"labels": dict(key), "value": value} for key, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def __init__(self, name, help_text, registry, callback=None):
+        super().__init__(name, help_text, registry)
+        self.callback = callback
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def _current(self):
+        if self.callback is not None:
+            return {(): self.callback()}
+        return self._values
+
+    def _render(self):
+        return [f"{self.name}{self._format_labels(key)} {value}" for key, value in self._current().items()]
+
+    def _snapshot(self):
+        return [{"labels": dict(key), "value": value} for key, value in self._current().items()]
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, help_text, registry, buckets):
+        super().__init__(name, help_text, registry)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        with self._lock:
+            key = self._key(labels)
+            entry = self._values.get(key)
+            if entry is None:
+                entry = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                self._values[key] = entry
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry["counts"][i] += 1
+            entry["sum"] += value
+            entry["count"] += 1
+
+    def _render(self):
+        lines = []
+        for key, entry in self._values.items():
+            for bound, count in zip(self.buckets, entry["counts"]):
+                lines.append(f"{self.name}_bucket{self._format_labels(key, [('le', bound)])} {count}")
+            lines.append(f"{self.name}_bucket{self._format_labels(key, [('le', '+Inf')])} {entry['count']}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {entry['sum']}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {entry['count']}")
+        return lines
+
+    def _snapshot(self):
+        return [
+            {
+                "labels": dict(key),
+                "count": entry["count"],
+                "sum": entry["sum"],
+                "mean": entry["sum"] / entry["count"] if entry["count"] else 0.0,
+                "buckets": dict(zip([str(b) for b in self.buckets], entry["counts"]))
+            }
+            for key, entry in self._values.items()
+        ]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """
+        Minimal in-process metrics store that renders the Prometheus text format.
+        """
+        self._lock = threading.RLock()
+        self._metrics = {}
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, help_text):
+        return self._register(Counter(name, help_text, self))
+
+    def gauge(self, name, help_text, callback=None):
+        return self._register(Gauge(name, help_text, self, callback=callback))
+
+    def histogram(self, name, help_text, buckets=DURATION_BUCKETS):
+        return self._register(Histogram(name, help_text, self, buckets))
+
+    def render_prometheus(self):
+        lines = []
+        with self._lock:
+            for metric in self._metrics.values():
+                lines.append(f"# HELP {metric.name} {metric.help}")
+                lines.append(f"# TYPE {metric.name} {metric.type_name}")
+                lines.extend(metric._render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """
+        The same data as render_prometheus, as a JSON-serializable dict.
+        """
+        with self._lock:
+            return {name: {"type": metric.type_name, "help": metric.help, "values": metric._snapshot()}
+                    for name, metric in self._metrics.items()}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram("speech_stage_duration_seconds", "Wall time spent in each pipeline stage")
+STAGE_RTF = REGISTRY.histogram("speech_stage_realtime_factor", "Stage wall time divided by audio duration", buckets=RTF_BUCKETS)
+STAGE_ERRORS = REGISTRY.counter("speech_stage_errors_total", "Pipeline stages that raised an exception")
+AUDIO_SECONDS = REGISTRY.counter("speech_audio_seconds_total", "Seconds of audio processed")
+REQUESTS = REGISTRY.counter("speech_analysis_total", "Completed analyses by outcome")
+MODEL_LOADS = REGISTRY.counter("speech_model_loads_total", "Whisper model loads")
+MODEL_LOAD_SECONDS = REGISTRY.histogram("speech_model_load_seconds", "Time to load a Whisper model")
+
+
+def observe_stage(stage, seconds, audio_duration=None):
+    """
+    Records one stage run, plus its real-time factor when the audio duration is known.
+    """
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    if audio_duration:
+        STAGE_RTF.observe(seconds / audio_duration, stage=stage)
+
+
+@contextmanager
+def stage_timer(stage, audio_duration=None):
+    """
+    Times the enclosed block as `stage`; exceptions are counted and re-raised.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        observe_stage(stage, time.perf_counter() - start, audio_duration)
+
+
+def process_memory(pid="self"):
+    """
+    Memory of a process in bytes from /proc/<pid>/smaps_rollup (Linux; empty dict elsewhere).
+    rss counts every resident page; shared is the part also mapped by other processes, such as
+    memory-mapped model weights; pss charges each shared page 1/N to each of the N processes
+    mapping it, so the pss of all workers adds up to their real footprint.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            lines = f.readlines()
+    except OSError:
+        return {}
+    fields = {}
+    for line in lines:
+        parts = line.split()
+        if len(parts) == 3 and parts[2] == "kB":
+            fields[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    return {
+        "rss_bytes": fields.get("Rss", 0),
+        "pss_bytes": fields.get("Pss", 0),
+        "shared_bytes": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+        "private_bytes": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    }
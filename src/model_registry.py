@@ -0,0 +1,168 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class _Entry:
+    def __init__(self, transcriber, size_bytes, load_time):
+        self.transcriber = transcriber
+        self.size_bytes = size_bytes
+        self.load_time = load_time
+        # Whisper models are not safe for concurrent inference, so each one gets its own lock
+        self.lock = threading.Lock()
+        # Created on demand by TranscriberRegistry.scheduler
+        self.scheduler = None
+
+
+class TranscriberRegistry:
+    def __init__(self, memory_budget_mb=4096, transcriber_factory=None):
+        """
+        Keeps several Whisper model sizes resident, evicting the least recently used
+        one once the total weight size exceeds memory_budget_mb.
+        The most recently requested model is always kept, even if it alone exceeds the budget.
+        transcriber_factory defaults to Transcriber, imported on first load so that creating
+        the registry doesn't pull in torch and whisper.
+        """
+        self.memory_budget_bytes = int(memory_budget_mb * 1024 * 1024)
+        self.transcriber_factory = transcriber_factory
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading = {}  # model_size -> Lock, so two requests never load the same checkpoint twice
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_time_sec = 0.0
+
+    @contextmanager
+    def acquire(self, model_size):
+        """
+        Yields a Transcriber for model_size with exclusive use of it for the duration of the block.
+        """
+        entry = self._get_entry(model_size)
+        with entry.lock:
+            yield entry.transcriber
+
+    @contextmanager
+    def scheduler(self, model_size, max_batch_size=8, max_wait_ms=30):
+        """
+        Yields the batching scheduler for model_size, creating it on first use.
+        The scheduler shares the model's lock, so it coexists with acquire() callers. The request
+        is registered with it before the registry lock is released, so evicting the model during
+        the block stops the scheduler only after the block has finished with it.
+        """
+        while True:
+            entry = self._get_entry(model_size)
+            with self._lock:
+                # Evicted since _get_entry returned: load it again rather than revive a dropped entry
+                if self._entries.get(model_size) is not entry:
+                    continue
+                if entry.scheduler is None:
+                    from batch_scheduler import WhisperBatchScheduler
+                    entry.scheduler = WhisperBatchScheduler(entry.transcriber, entry.lock,
+                                                            max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+                scheduler = entry.scheduler
+                # Eviction stops the scheduler under this lock, so a current entry's scheduler is running
+                if scheduler.register():
+                    break
+                entry.scheduler = None
+        try:
+            yield scheduler
+        finally:
+            scheduler.release()
+
+    def _get_entry(self, model_size):
+        with self._lock:
+            entry = self._entries.get(model_size)
+            if entry is not None:
+                self._entries.move_to_end(model_size)
+                self.hits += 1
+                return entry
+            load_lock = self._loading.setdefault(model_size, threading.Lock())
+
+        with load_lock:
+            # Another thread may have finished loading while we waited
+            with self._lock:
+                entry = self._entries.get(model_size)
+                if entry is not None:
+                    self._entries.move_to_end(model_size)
+                    self.hits += 1
+                    return entry
+                self.misses += 1
+
+            factory = self.transcriber_factory
+            if factory is None:
+                from transcriber import Transcriber
+                factory = Transcriber
+            start = time.perf_counter()
+            transcriber = factory(model_size=model_size)
+            load_time = time.perf_counter() - start
+            entry = _Entry(transcriber, _model_size_bytes(transcriber), load_time)
+
+            with self._lock:
+                self.load_time_sec += load_time
+                self._entries[model_size] = entry
+                self._evict(keep=model_size)
+                self._loading.pop(model_size, None)
+            return entry
+
+    def _evict(self, keep):
+        # Called with self._lock held
+        while self._total_bytes() > self.memory_budget_bytes and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            if oldest == keep:
+                break
+            print(f"Evicting Whisper model '{oldest}' from memory")
+            evicted = self._entries.pop(oldest)
+            if evicted.scheduler is not None:
+                evicted.scheduler.stop()
+            self.evictions += 1
+
+    def _total_bytes(self):
+        return sum(entry.size_bytes for entry in self._entries.values())
+
+    def loaded_models(self):
+        with self._lock:
+            return list(self._entries.keys())
+
+    def stats(self):
+        with self._lock:
+            return {
+                "loaded_models": {
+                    size: {
+                        "size_mb": entry.size_bytes / (1024 * 1024),
+                        "load_time_sec": entry.load_time,
+                        "in_use": entry.lock.locked(),
+                        "batching": entry.scheduler.stats() if entry.scheduler is not None else None
+                    }
+                    for size, entry in self._entries.items()
+                },
+                "memory_budget_mb": self.memory_budget_bytes / (1024 * 1024),
+                "memory_used_mb": self._total_bytes() / (1024 * 1024),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "load_time_sec": self.load_time_sec
+            }
+
+
+def _model_size_bytes(transcriber):
+    """
+    Approximate resident size of a model from its parameters and buffers.
+    """
+    model = getattr(transcriber, "model", None)
+    if model is None:
+        return 0
+    total = sum(p.numel() * p.element_size() for p in model.parameters())
+    total += sum(b.numel() * b.element_size() for b in model.buffers())
+    # Dynamically quantized layers keep their int8 weights in packed params, not parameters()
+    for module in model.modules():
+        if hasattr(module, "_packed_params") and callable(getattr(module, "weight", None)):
+            weight = module.weight()
+            total += weight.numel() * weight.element_size()
+            bias = module.bias()
+            if bias is not None:
+                total += bias.numel() * bias.element_size()
+    return total
@@ -0,0 +1,199 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from analyzer import AcousticAnalyzer, TextAnalyzer
+from audio_processor import AudioProcessor
+from result_cache import ResultCache
+from metrics import observe_stage, AUDIO_SECONDS
+
+
+class AnalysisPipeline:
+    def __init__(self, acoustic_analyzer=None, text_analyzer=None, executor=None, cache=None, vad=False):
+        """
+        Runs the analysis stages as a small dependency graph:
+
+            transcribe ──── text ──┐
+                                   ├── report
+            acoustic ──────────────┘
+
+        Acoustic analysis does not depend on the transcript, so it runs on `executor`
+        (a thread or process pool) while transcription runs on the calling thread.
+        If a ResultCache is given, the transcript, acoustic metrics and report are each
+        looked up by audio hash and stage parameters before being computed.
+        With vad=True, speech regions are detected once up front; Whisper and the pitch tracker
+        only see the speech spans, and transcript timestamps are mapped back to the original timeline.
+        """
+        self.acoustic_analyzer = acoustic_analyzer or AcousticAnalyzer()
+        self.text_analyzer = text_analyzer or TextAnalyzer()
+        self.executor = executor
+        self.cache = cache
+        self.vad = vad
+        self.audio_processor = AudioProcessor()
+
+    def run(self, y, sr, transcribe, reporter, progress=None, transcribe_params=None, acoustic_metrics=None, timeline=None,
+            audio_hash=None, on_chunk=None):
+        """
+        y, sr: decoded audio buffer.
+        transcribe: callable(audio, on_chunk) returning transcript data, calling on_chunk (if not None)
+            with each partial transcript chunk.
+        reporter: Reporter used for the final report stage.
+        progress: optional callable(stage) for status updates.
+        transcribe_params: parameters that determine the transcript (e.g. model size, language),
+            used as part of its cache key. The transcript is not cached without them.
+        acoustic_metrics: precomputed acoustic metrics (e.g. from a batch worker); skips the acoustic stage.
+        timeline: precomputed SpeechTimeline (e.g. from a batch worker); only used when vad is enabled.
+        audio_hash: precomputed ResultCache.audio_hash(y, sr), saving a pass over the buffer.
+        on_chunk: optional callable(chunk) for partial transcripts while transcribing. Like the final
+            transcript, chunk times are mapped back onto the original timeline when vad is enabled.
+        Returns a dict with transcript data, metrics, report, per-stage timings, cache hits and the
+        report's LLM usage (calls, tokens, latency; None when no LLM was called).
+        """
+        notify = progress or (lambda stage: None)
+        timings = {}
+        cache_hits = {}
+        pipeline_start = time.perf_counter()
+
+        speech = y
+        if self.vad:
+            if timeline is None:
+                timeline, timings["vad"] = _timed(self.audio_processor.detect_speech, y, sr)
+            speech = timeline.compact(y)
+        else:
+            timeline = None
+
+        if self.cache is None:
+            audio_hash = None
+        elif audio_hash is None:
+            audio_hash = ResultCache.audio_hash(y, sr)
+        transcript_key = None
+        acoustic_key = None
+        if audio_hash is not None:
+            if transcribe_params is not None:
+                transcript_key = ResultCache.make_key("transcript", audio=audio_hash, vad=self.vad, **transcribe_params)
+            acoustic_key = self._acoustic_key(audio_hash)
+
+        executor = self.executor
+        owns_executor = executor is None
+        if owns_executor:
+            executor = ThreadPoolExecutor(max_workers=1)
+
+        try:
+            notify("acoustic_analysis")
+            acoustic_future = None
+            if acoustic_metrics is not None:
+                cache_hits["acoustic"] = False
+                timings["acoustic"] = 0.0
+                self._cache_put(acoustic_key, acoustic_metrics)
+            else:
+                acoustic_metrics = self._cache_get(acoustic_key)
+                cache_hits["acoustic"] = acoustic_metrics is not None
+                if acoustic_metrics is None:
+                    acoustic_future = executor.submit(_timed, self.acoustic_analyzer.analyze, y, sr, timeline)
+                else:
+                    timings["acoustic"] = 0.0
+
+            notify("transcribing")
+            transcript_data = self._cache_get(transcript_key)
+            cache_hits["transcribe"] = transcript_data is not None
+            if transcript_data is None:
+                chunk_callback = on_chunk
+                if on_chunk is not None and timeline is not None:
+                    chunk_callback = lambda chunk: on_chunk(timeline.remap_chunk(chunk))
+                transcript_data, timings["transcribe"] = _timed(transcribe, speech, chunk_callback)
+                if timeline is not None:
+                    transcript_data = timeline.remap_transcript(transcript_data)
+                self._cache_put(transcript_key, transcript_data)
+            else:
+                timings["transcribe"] = 0.0
+
+            notify("text_analysis")
+            text_metrics, timings["text"] = _timed(self.text_analyzer.analyze, transcript_data)
+
+            if acoustic_future is not None:
+                acoustic_metrics, timings["acoustic"] = acoustic_future.result()
+                self._cache_put(acoustic_key, acoustic_metrics)
+        finally:
+            if owns_executor:
+                executor.shutdown(wait=True)
+
+        notify("generating_report")
+        report_key = None
+        # Local-only reports take milliseconds, so only LLM reports are worth caching
+        if audio_hash is not None and reporter.uses_llm:
+            report_key = ResultCache.make_key(
+                "report", audio=audio_hash, provider=reporter.provider, model=reporter.model_id,
+                llm_mode=reporter.llm_mode, token_budget=reporter.token_budget, transcript=transcript_data['text'],
+                acoustic=acoustic_metrics, text=text_metrics
+            )
+        report = self._cache_get(report_key)
+        cache_hits["report"] = report is not None
+        llm_usage = None
+        if report is None:
+            report, timings["report"] = _timed(
+                reporter.generate_report, transcript_data['text'], acoustic_metrics, text_metrics, audio=(y, sr)
+            )
+            llm_usage = reporter.usage
+            # Fallback reports are a symptom of a failed LLM call, so they are never cached
+            if not reporter.used_fallback:
+                self._cache_put(report_key, report)
+        else:
+            timings["report"] = 0.0
+
+        timings["total"] = time.perf_counter() - pipeline_start
+
+        # Only stages that actually ran are recorded, so cache hits don't drag the histograms down
+        audio_duration = len(y) / sr if sr else None
+        for stage in ("transcribe", "acoustic", "text", "report"):
+            if not cache_hits.get(stage) and timings[stage] > 0:
+                observe_stage(stage, timings[stage], audio_duration)
+        observe_stage("pipeline", timings["total"], audio_duration)
+        if audio_duration:
+            AUDIO_SECONDS.inc(audio_duration)
+        # The critical path is whichever branch finished last before the report stage
+        timings["critical_path"] = (
+            "transcribe" if timings["transcribe"] + timings["text"] >= timings["acoustic"] else "acoustic"
+        )
+
+        return {
+            "transcript_data": transcript_data,
+            "acoustic_metrics": acoustic_metrics,
+            "text_metrics": text_metrics,
+            "report": report,
+            "timings": timings,
+            "cache_hits": cache_hits,
+            "llm_usage": llm_usage,
+            "vad": {
+                "speech_sec": timeline.speech_samples / sr,
+                "removed_sec": timeline.removed_sec
+            } if timeline is not None else None
+        }
+
+    def cached_acoustic(self, audio_hash):
+        """
+        Cached acoustic metrics for audio with this hash (from ResultCache.audio_hash), or None.
+        Lets callers that analyze elsewhere (batch workers) skip recordings already analyzed.
+        """
+        return self._cache_get(self._acoustic_key(audio_hash))
+
+    def _acoustic_key(self, audio_hash):
+        return ResultCache.make_key(
+            "acoustic", audio=audio_hash, vad=self.vad, pitch_mode=getattr(self.acoustic_analyzer, "pitch_mode", None)
+        )
+
+    def _cache_get(self, key):
+        if self.cache is None or key is None:
+            return None
+        return self.cache.get(key)
+
+    def _cache_put(self, key, value):
+        if self.cache is not None and key is not None:
+            self.cache.put(key, value)
+
+
+def _timed(func, *args, **kwargs):
+    """
+    Calls func and returns (result, elapsed_seconds). Module-level so it can be sent to a process pool.
+    """
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
@@ -0,0 +1,99 @@
+import numpy as np
+
+# Pitch range covering adult and child speaking voices. Much narrower than the C2-C7 range
+# used with pyin, which keeps the lag search (and the cost per frame) small.
+SPEECH_FMIN = 65.0
+SPEECH_FMAX = 500.0
+
+PITCH_MODES = ("pyin", "fast")
+
+
+def yin_frame_length(sr, fmin=SPEECH_FMIN):
+    """
+    Frame length yin_fast uses at this sample rate: the next power of two holding two periods of fmin.
+    """
+    max_lag = int(np.ceil(sr / fmin))
+    return int(2 ** np.ceil(np.log2(2 * max_lag + 1)))
+
+
+def yin_fast(y, sr, fmin=SPEECH_FMIN, fmax=SPEECH_FMAX, hop_length=None, threshold=0.15, block_frames=2048, peak=None):
+    """
+    Vectorized YIN pitch tracker (de Cheveigné & Kawahara, 2002) without pyin's Viterbi decoding.
+    Frames are processed in blocks of `block_frames`, so memory does not grow with file length.
+    Returns (f0, voiced_flag) like librosa.pyin; unvoiced frames have f0 = NaN.
+
+    Measured on the synthetic speech fixtures against the default pyin mode (C2-C7), pitch_mean_hz
+    reads 1-7% higher (typically about 5%) and pitch_std_hz 1-25% lower (typically 5-10%; the
+    largest gaps on 10-second clips). Against pyin restricted to the same 65-500 Hz range the mean
+    is 2-4% higher and the std 5-10% lower. Without pyin's Viterbi smoothing, frame-level estimates
+    aren't tied to their neighbours, which accounts for most of the difference. Don't compare
+    scores across modes.
+    peak: the recording's peak amplitude, for the silence gate; defaults to the peak of y.
+    Pass it when y is one block of a longer recording.
+    """
+    y = np.asarray(y, dtype=np.float32)
+    min_lag = max(2, int(np.floor(sr / fmax)))
+    max_lag = int(np.ceil(sr / fmin))
+    frame_length = yin_frame_length(sr, fmin)
+    if hop_length is None:
+        hop_length = frame_length // 4
+    win = frame_length - max_lag
+
+    if len(y) < frame_length:
+        return np.full(0, np.nan), np.zeros(0, dtype=bool)
+
+    frames = np.lib.stride_tricks.sliding_window_view(y, frame_length)[::hop_length]
+    n_fft = int(2 ** np.ceil(np.log2(frame_length + win)))
+
+    f0 = np.full(len(frames), np.nan)
+    voiced = np.zeros(len(frames), dtype=bool)
+
+    # Frames quieter than this are treated as silence regardless of periodicity
+    if peak is None:
+        peak = max(float(y.max()), -float(y.min()))
+    silence_energy = (peak * 1e-2) ** 2 * win
+
+    for start in range(0, len(frames), block_frames):
+        block = frames[start:start + block_frames].astype(np.float64)
+
+        # Cross-correlation of the first `win` samples with the whole frame, for every lag
+        head = block[:, :win]
+        acf = np.fft.irfft(
+            np.conj(np.fft.rfft(head, n_fft)) * np.fft.rfft(block, n_fft), n_fft
+        )[:, :max_lag + 1]
+
+        # Sliding energy of the lagged window
+        cumsum = np.concatenate([np.zeros((len(block), 1)), np.cumsum(block ** 2, axis=1)], axis=1)
+        energy_lagged = cumsum[:, win:win + max_lag + 1] - cumsum[:, :max_lag + 1]
+        energy_head = energy_lagged[:, :1]
+
+        diff = np.maximum(energy_head + energy_lagged - 2 * acf, 0.0)
+
+        # Cumulative mean normalized difference
+        cmnd = np.ones_like(diff)
+        running = np.cumsum(diff[:, 1:], axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cmnd[:, 1:] = diff[:, 1:] * np.arange(1, max_lag + 1) / running
+        cmnd[~np.isfinite(cmnd)] = 1.0
+
+        # First local minimum below the threshold within the allowed lag range
+        search = cmnd[:, min_lag:max_lag]
+        candidates = (search < threshold) & (search <= cmnd[:, min_lag + 1:max_lag + 1])
+        has_candidate = candidates.any(axis=1) & (energy_head[:, 0] > silence_energy)
+        lag = np.argmax(candidates, axis=1) + min_lag
+
+        # Parabolic interpolation around the chosen lag for sub-sample precision
+        rows = np.arange(len(block))
+        prev_val = cmnd[rows, lag - 1]
+        curr_val = cmnd[rows, lag]
+        next_val = cmnd[rows, np.minimum(lag + 1, max_lag)]
+        denom = prev_val - 2 * curr_val + next_val
+        with np.errstate(divide="ignore", invalid="ignore"):
+            shift = np.where(np.abs(denom) > 1e-12, 0.5 * (prev_val - next_val) / denom, 0.0)
+        refined_lag = lag + np.clip(shift, -1.0, 1.0)
+
+        block_f0 = np.where(has_candidate, sr / refined_lag, np.nan)
+        f0[start:start + len(block)] = block_f0
+        voiced[start:start + len(block)] = has_candidate
+
+    return f0, voiced
@@ -0,0 +1,66 @@
+import re
+
+# Characters per token for English-like text with Llama/Gemini tokenizers; Devanagari runs closer to
+# 2-3, so the estimate errs on the small side there and the default budget leaves headroom
+CHARS_PER_TOKEN = 4
+DEFAULT_TOKEN_BUDGET = 8000
+
+_SENTENCE_END = re.compile(r"(?<=[.!?।])\s+")
+
+
+class PromptBuilder:
+    def __init__(self, token_budget=DEFAULT_TOKEN_BUDGET, chars_per_token=CHARS_PER_TOKEN):
+        """
+        Keeps prompts within token_budget (system and user part together, estimated from their length,
+        since the providers' tokenizers aren't available offline) and splits text that doesn't fit.
+        """
+        self.token_budget = token_budget
+        self.chars_per_token = chars_per_token
+
+    def estimate(self, *texts):
+        return sum(len(text) for text in texts if text) // self.chars_per_token + 1
+
+    def fits(self, system, user):
+        return self.estimate(system, user) <= self.token_budget
+
+    def room(self, system, user_template):
+        """
+        Tokens left for inserted text once the fixed parts of a prompt are counted.
+        """
+        return self.token_budget - self.estimate(system, user_template)
+
+    def split(self, text, max_tokens):
+        """
+        Splits text into consecutive chunks of at most max_tokens (estimated), at sentence boundaries
+        where possible and at word boundaries inside over-long sentences.
+        """
+        max_chars = max(1, max_tokens) * self.chars_per_token
+        chunks = []
+        current = ""
+        for sentence in _SENTENCE_END.split(text.strip()):
+            for piece in _pieces(sentence, max_chars):
+                if current and len(current) + 1 + len(piece) > max_chars:
+                    chunks.append(current)
+                    current = piece
+                else:
+                    current = f"{current} {piece}" if current else piece
+        if current:
+            chunks.append(current)
+        return chunks
+
+
+def _pieces(sentence, max_chars):
+    # A run-on sentence (common in unpunctuated transcripts) is cut at word boundaries
+    if len(sentence) <= max_chars:
+        return [sentence]
+    pieces = []
+    current = ""
+    for word in sentence.split():
+        if current and len(current) + 1 + len(word) > max_chars:
+            pieces.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        pieces.append(current)
+    return pieces
@@ -1,152 +1,343 @@
 import os
-from google import genai
-from google.genai import types
-from groq import Groq
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from llm_client import get_client, get_hedged_client
+from metrics import REGISTRY
+from prompt_builder import PromptBuilder, DEFAULT_TOKEN_BUDGET
+from scorer import LocalScorer, CATEGORIES, CONTENT_CATEGORIES
+
+LLM_MODES = ("off", "enrich", "full")
+
+LLM_TOKENS = REGISTRY.counter("speech_llm_tokens_total", "Report LLM tokens by kind (estimated_prompt, prompt, cached_prompt, completion)")
+LLM_CALL_SECONDS = REGISTRY.histogram("speech_llm_call_seconds", "Latency of one report LLM call by phase (single, map, reduce)")
+
+# Token counts in Reporter.usage; prompt, cached_prompt and completion come from the provider when it reports them
+USAGE_TOKEN_KEYS = ("estimated_prompt_tokens", "prompt_tokens", "cached_prompt_tokens", "completion_tokens")
+# Most section summaries requested at once; the client's own concurrency limit still applies
+MAX_PARALLEL_SECTIONS = 8
+# Rounds of summarizing summaries before the notes are sent as they are
+MAX_SECTION_LEVELS = 3
+
+_RATING_SCHEMA = '        "{}": {{ "score": int, "reason": "string" }}'
+
+# The instruction blocks below never change between requests. They go first, as the system
+# message, so providers that cache prompt prefixes (Groq, Gemini 2.x implicit caching) can reuse them.
+FULL_INSTRUCTIONS = """You are an expert communication coach. Analyze the speech and provided metrics to generate a detailed performance report.
+
+**Task:**
+Rate the speaker on a scale of 1-10 for the following categories and provide a brief justification for each.
+
+1. Clarity and Voice (Consider pitch metrics and transcript clarity)
+2. Expression and Tone (Consider pitch variability)
+3. Fluency (Consider WPM, its variation, gaps between phrases, fillers and repetitions)
+4. Length (Is it too short or too long? Context: General speech)
+5. Pauses and Punctuation Awareness (Consider pause fraction)
+6. Relevance and Creativity (Judge based on content)
+7. Sentence Size (Consider avg sentence length)
+8. Spelling and Punctuation (Judge based on transcript structure)
+9. Story Structure (Beginning, Middle, End?)
+10. Word Usage (Vocabulary richness; consider the type-token ratio)
+
+**Output Format:**
+Provide the output strictly as a JSON object with the following structure:
+{
+    "ratings": {
+""" + ",\n".join(_RATING_SCHEMA.format(name) for name in CATEGORIES) + """
+    },
+    "overall_summary": "string",
+    "improvement_recommendations": ["string", "string", ...]
+}
+"""
+
+ENRICH_INSTRUCTIONS = f"""You are an expert communication coach. The speaker's delivery has already been scored from measured metrics.
+Judge the content and write the feedback.
+
+**Task:**
+1. Rate {", ".join(CONTENT_CATEGORIES)} on a scale of 1-10 from the transcript, with a brief justification each.
+2. Write an overall summary covering both the delivery scores and the content.
+3. Give specific improvement recommendations.
+
+**Output Format:**
+Provide the output strictly as a JSON object with the following structure:
+{{
+    "ratings": {{
+""" + ",\n".join(_RATING_SCHEMA.format(name) for name in CONTENT_CATEGORIES) + """
+    },
+    "overall_summary": "string",
+    "improvement_recommendations": ["string", "string", ...]
+}
+"""
+
+SECTION_INSTRUCTIONS = f"""You are an expert communication coach taking notes on one section of a long speech.
+The speech will be rated from the notes on all of its sections, without the full transcript.
+
+**Task:**
+1. Summarize what the speaker says in this section in at most 80 words, keeping the order of ideas.
+2. For each of {", ".join(CONTENT_CATEGORIES)}, note in one or two sentences what this section shows
+   (e.g. examples and stories used, how ideas are introduced and linked, unclear or broken sentences).
+
+**Output Format:**
+Provide the output strictly as a JSON object with the following structure:
+{{
+    "summary": "string",
+    "notes": {{
+""" + ",\n".join(f'        "{name}": "string"' for name in CONTENT_CATEGORIES) + """
+    }
+}
+"""
 
 class Reporter:
-    def __init__(self, api_key=None, provider="auto"):
+    def __init__(self, api_key=None, provider="auto", groq_api_key=None, hedge_deadline=None, llm_mode="enrich", scorer=None,
+                 token_budget=DEFAULT_TOKEN_BUDGET):
+        """
+        api_key: Gemini key (also tried as the Groq key for backward compatibility).
+        groq_api_key: explicit Groq key, takes precedence over api_key for Groq.
+        hedge_deadline: if set and both providers have keys, Groq is tried first and Gemini is
+            only called once this many seconds pass without an answer.
+        llm_mode: every report starts from the local scorer's ratings (scorer.LocalScorer). 'off' returns
+            them as they are; 'enrich' asks the LLM only for the summary, recommendations and the
+            content categories metrics can't measure; 'full' has the LLM rate everything.
+        token_budget: most tokens one prompt may use (estimated). Longer transcripts are split into
+            sections that are summarized concurrently, and the report is written from the section notes.
+        LLM clients, hedged pairs included, are shared process-wide (see llm_client.get_client), so building a Reporter is cheap.
+        """
+        if llm_mode not in LLM_MODES:
+            raise ValueError(f"Unknown LLM mode '{llm_mode}'. Choose from: {', '.join(LLM_MODES)}")
+        self.llm_mode = llm_mode
+        self.scorer = scorer or LocalScorer()
+        self.prompts = PromptBuilder(token_budget)
+        self.token_budget = token_budget
         self.provider = provider
         self.gemini_key = api_key or os.getenv("GEMINI_API_KEY")
-        self.groq_key = api_key or os.getenv("GROQ_API_KEY") # Check same arg for simplicity or separate env var
+        self.groq_key = groq_api_key or api_key or os.getenv("GROQ_API_KEY") # Check same arg for simplicity or separate env var
         
         self.client = None
         self.model_id = None
+        # Set when the last generate_report call wanted the LLM but had to return the local report alone
+        self.used_fallback = False
+        # Calls, tokens and latency of the last generate_report call's LLM work (None if it made no calls)
+        self.usage = None
+        self._usage_lock = threading.Lock()
+
+        if llm_mode == "off":
+            self.provider = "local"
+            return
+
+        has_groq = bool(self.groq_key and self.groq_key.startswith("gsk_"))
         
         # Determine provider
-        if (self.provider == "auto" or self.provider == "groq") and self.groq_key and self.groq_key.startswith("gsk_"):
+        if (self.provider == "auto" or self.provider == "groq") and has_groq:
             self.provider = "groq"
             print("Using Provider: Groq (Llama 3)")
-            self.client = Groq(api_key=self.groq_key)
-            self.model_id = "llama-3.3-70b-versatile" 
+            self.client = get_client("groq", self.groq_key)
+            if hedge_deadline is not None and self.gemini_key:
+                print(f"Hedging to Google Gemini after {hedge_deadline}s")
+                self.provider = "groq+gemini"
+                self.client = get_hedged_client(self.client, get_client("gemini", self.gemini_key), hedge_deadline)
         elif (self.provider == "auto" or self.provider == "gemini") and self.gemini_key:
             self.provider = "gemini"
             print("Using Provider: Google Gemini")
-            self.client = genai.Client(api_key=self.gemini_key)
-            self.model_id = "gemini-2.0-flash"
+            self.client = get_client("gemini", self.gemini_key)
         else:
-            print("Warning: No valid API Key found (Gemini or Groq). Qualitative analysis will be limited.")
+            print("Warning: No valid API Key found (Gemini or Groq). Reports will use local scoring only.")
             self.client = None
 
-    def generate_report(self, transcript_text, acoustic_metrics, text_metrics, audio_path=None):
+        if self.client is not None:
+            self.model_id = self.client.model_id
+
+    @property
+    def uses_llm(self):
+        return self.client is not None and self.llm_mode != "off"
+
+    def generate_report(self, transcript_text, acoustic_metrics, text_metrics, audio_path=None, audio=None):
         """
-        Generates the final report using LLM for qualitative parts and hard metrics for others.
-        If audio_path is provided, it uploads the audio to Gemini for native multimodal analysis.
-        """
-        
-        # Base prompt structure
-        prompt_text = f"""
-        You are an expert communication coach. Analyze the speech and provided metrics to generate a detailed performance report.
-        
-        **Speech Transcript:**
-        "{transcript_text}"
-        
-        **Quantitative Metrics:**
-        - Duration: {acoustic_metrics.get('duration_sec', 0):.2f} seconds
-        - Speaking Rate: {text_metrics.get('wpm', 0):.2f} Words Per Minute
-        - Pause Fraction: {acoustic_metrics.get('pause_fraction', 0):.2%} of time is silence
-        - Pitch Variation (Std Dev): {acoustic_metrics.get('pitch_std_hz', 0):.2f} Hz (Higher means more expressive tone)
-        - Average Sentence Length: {text_metrics.get('avg_sentence_length', 0):.2f} words
-        
-        **Task:**
-        Rate the speaker on a scale of 1-10 for the following categories and provide a brief justification for each.
-        
-        1. Clarity and Voice (Consider pitch metrics and transcript clarity)
-        2. Expression and Tone (Consider pitch variability)
-        3. Fluency (Consider WPM and pauses)
-        4. Length (Is it too short or too long? Context: General speech)
-        5. Pauses and Punctuation Awareness (Consider pause fraction)
-        6. Relevance and Creativity (Judge based on content)
-        7. Sentence Size (Consider avg sentence length)
-        8. Spelling and Punctuation (Judge based on transcript structure)
-        9. Story Structure (Beginning, Middle, End?)
-        10. Word Usage (Vocabulary richness)
-        
-        **Output Format:**
-        Provide the output strictly as a JSON object with the following structure:
-        {{
-            "ratings": {{
-                "Clarity and Voice": {{ "score": int, "reason": "string" }},
-                "Expression and Tone": {{ "score": int, "reason": "string" }},
-                "Fluency": {{ "score": int, "reason": "string" }},
-                "Length": {{ "score": int, "reason": "string" }},
-                "Pauses and Punctuation Awareness": {{ "score": int, "reason": "string" }},
-                "Relevance and Creativity": {{ "score": int, "reason": "string" }},
-                "Sentence Size": {{ "score": int, "reason": "string" }},
-                "Spelling and Punctuation": {{ "score": int, "reason": "string" }},
-                "Story Structure": {{ "score": int, "reason": "string" }},
-                "Word Usage": {{ "score": int, "reason": "string" }}
-            }},
-            "overall_summary": "string",
-            "improvement_recommendations": ["string", "string", ...]
-        }}
+        Generates the final report: local metric-based ratings, enriched or replaced by the LLM per llm_mode.
+        If audio_path or audio (a (y, sr) tuple) is provided, the audio is uploaded to Gemini for native multimodal analysis.
+        A temporary file is only written for an in-memory buffer when the provider actually needs one.
+        If the LLM is unavailable or fails, the local report is returned and used_fallback is set.
+        Transcripts that don't fit token_budget are map-reduced: sections are summarized concurrently
+        (text only) and the final call sees their notes instead of the transcript.
         """
+        self.used_fallback = False
+        self.usage = None
+        local_report = self.scorer.score(transcript_text, acoustic_metrics, text_metrics)
 
-        if self.client:
-            try:
-                # GROQ IMPLEMENTATION
-                if self.provider == "groq":
-                    # For Groq, we just use the text prompt since it's Llama 3 (audio upload not native in this context)
-                    # We append a specific JSON instruction for Llama to ensure strict parsing
-                    prompt_text += "\nIMPORTANT: Valid JSON output only."
-                    
-                    chat_completion = self.client.chat.completions.create(
-                        messages=[
-                            {
-                                "role": "system",
-                                "content": "You are a helpful assistant that outputs strictly in JSON."
-                            },
-                            {
-                                "role": "user",
-                                "content": prompt_text,
-                            }
-                        ],
-                        model=self.model_id,
-                        response_format={"type": "json_object"}, 
-                    )
-                    return json.loads(chat_completion.choices[0].message.content)
-
-                # GEMINI IMPLEMENTATION
-                elif self.provider == "gemini":
-                    contents = []
-                    
-                    # If audio is available, upload and include it
-                    if audio_path and os.path.exists(audio_path):
-                        print(f"Uploading audio to Gemini: {audio_path}")
-                        audio_file = self.client.files.upload(file=audio_path)
-                        contents.append(audio_file)
-                        prompt_text = "Listen to the attached audio and analyze the speech based on the transcript and metrics below.\n" + prompt_text
-                    
-                    contents.append(prompt_text)
-
-                    response = self.client.models.generate_content(
-                        model=self.model_id,
-                        contents=contents,
-                        config=types.GenerateContentConfig(
-                            response_mime_type="application/json"
-                        )
-                    )
-                    
-                    return json.loads(response.text)
-
-            except Exception as e:
-                print(f"Error calling LLM ({self.provider}): {type(e).__name__}: {e}")
-                import traceback
-                traceback.print_exc()
-                return self._fallback_report(acoustic_metrics, text_metrics)
-        else:
+        if self.llm_mode == "off":
+            return local_report
+        if not self.client:
             print("Skipping LLM analysis (No valid API Key).")
-            return self._fallback_report(acoustic_metrics, text_metrics)
+            self.used_fallback = True
+            return local_report
+
+        self.usage = dict.fromkeys(USAGE_TOKEN_KEYS, 0)
+        self.usage.update(calls=0, sections=0, latency_sec=0.0)
+        start = time.perf_counter()
+        try:
+            system, user = self._prompt(_transcript_block(transcript_text), acoustic_metrics, text_metrics, local_report)
+            if not self.prompts.fits(system, user):
+                room = self.prompts.room(*self._prompt("", acoustic_metrics, text_metrics, local_report))
+                print(f"Transcript exceeds the {self.token_budget}-token budget; summarizing it in sections")
+                notes = self._section_notes(transcript_text, room)
+                system, user = self._prompt(notes, acoustic_metrics, text_metrics, local_report)
+            # Retries, timeouts and (for Gemini) the audio upload are handled by the client
+            result = self._call(system, user, "reduce" if self.usage["sections"] else "single",
+                                audio_path=audio_path, audio=audio)
+        except Exception as e:
+            print(f"Error calling LLM ({self.provider}): {type(e).__name__}: {e}")
+            import traceback
+            traceback.print_exc()
+            self.used_fallback = True
+            return local_report
+        finally:
+            self.usage["latency_sec"] = time.perf_counter() - start
+
+        if self.llm_mode == "full":
+            result.setdefault("scored_by", "llm")
+            return result
+        return _merge_enrichment(local_report, result)
 
-    def _fallback_report(self, acoustic_metrics, text_metrics):
+    def _prompt(self, transcript_block, acoustic_metrics, text_metrics, local_report):
         """
-        Fallback if no LLM is available.
+        Returns (system, user) for the report call. transcript_block is the quoted transcript, or
+        section notes for transcripts too long for the token budget.
         """
-        return {
-            "ratings": {
-                "Clarity and Voice": {"score": 5, "reason": "LLM unavailable. Neutral score."},
-                # ... fill others with defaults or simple heuristic logic
-            },
-            "overall_summary": "Report generated without LLM analysis. Only quantitative metrics are accurate.",
-            "improvement_recommendations": ["Check API key configuration."]
-        }
+        metrics = f"""**Quantitative Metrics:**
+- Duration: {acoustic_metrics.get('duration_sec', 0):.2f} seconds
+- Speaking Rate: {text_metrics.get('wpm', 0):.2f} Words Per Minute
+- Pause Fraction: {acoustic_metrics.get('pause_fraction', 0):.2%} of time is silence
+- Pitch Variation (Std Dev): {acoustic_metrics.get('pitch_std_hz', 0):.2f} Hz (Higher means more expressive tone)
+- Average Sentence Length: {text_metrics.get('avg_sentence_length', 0):.2f} words
+{_fluency_lines(text_metrics)}"""
+
+        if self.llm_mode == "full":
+            return FULL_INSTRUCTIONS, f"{transcript_block}\n\n{metrics}\n"
+
+        # 'enrich': the delivery categories are already scored from metrics, so the model only
+        # judges content and writes the summary and recommendations
+        local_ratings = "\n".join(
+            f"- {name}: {rating['score']}/10 ({rating['reason']})"
+            for name, rating in local_report["ratings"].items() if name not in CONTENT_CATEGORIES
+        )
+        return ENRICH_INSTRUCTIONS, f"""{transcript_block}
+
+{metrics}
+
+**Delivery Scores (already computed, do not change):**
+{local_ratings}
+"""
+
+    def _section_notes(self, transcript_text, room):
+        """
+        Map step for long transcripts: splits the transcript into sections that fit the budget,
+        summarizes them concurrently and returns the notes as a transcript block of at most `room`
+        tokens, summarizing the notes again if needed.
+        """
+        text = transcript_text
+        level = 0
+        while True:
+            section_room = max(self.prompts.room(SECTION_INSTRUCTIONS, _section_prompt("", 0, 0, level)), 500)
+            sections = self.prompts.split(text, section_room)
+
+            def summarize(item):
+                index, section = item
+                return self._call(SECTION_INSTRUCTIONS, _section_prompt(section, index + 1, len(sections), level), "map")
+
+            with ThreadPoolExecutor(max_workers=min(len(sections), MAX_PARALLEL_SECTIONS)) as pool:
+                notes = list(pool.map(summarize, enumerate(sections)))
+            self.usage["sections"] += len(sections)
+
+            block = _notes_block(notes, len(transcript_text.split()))
+            level += 1
+            if self.prompts.estimate(block) <= room or len(sections) == 1 or level >= MAX_SECTION_LEVELS:
+                return block
+            text = block
+
+    def _call(self, system, user, phase, audio_path=None, audio=None):
+        usage = {}
+        start = time.perf_counter()
+        result = self.client.generate_json(user, audio_path=audio_path, audio=audio, system=system, usage=usage)
+        LLM_CALL_SECONDS.observe(time.perf_counter() - start, phase=phase)
+
+        usage["estimated_prompt_tokens"] = self.prompts.estimate(system, user)
+        with self._usage_lock:
+            self.usage["calls"] += 1
+            for key in USAGE_TOKEN_KEYS:
+                self.usage[key] += usage.get(key, 0)
+        for key in USAGE_TOKEN_KEYS:
+            if usage.get(key):
+                LLM_TOKENS.inc(usage[key], kind=key[:-len("_tokens")])
+        return result if isinstance(result, dict) else {}
+
+
+def _merge_enrichment(local_report, enrichment):
+    """
+    Combines the local report with the LLM's content ratings, summary and recommendations.
+    Anything missing or malformed in the LLM response keeps the local value.
+    """
+    report = json.loads(json.dumps(local_report))
+    for name, rating in (enrichment.get("ratings") or {}).items():
+        if name in CATEGORIES and isinstance(rating, dict) and isinstance(rating.get("score"), (int, float)):
+            report["ratings"][name] = {"score": int(round(rating["score"])), "reason": str(rating.get("reason", ""))}
+    if enrichment.get("overall_summary"):
+        report["overall_summary"] = enrichment["overall_summary"]
+    if enrichment.get("improvement_recommendations"):
+        report["improvement_recommendations"] = list(enrichment["improvement_recommendations"])
+    report["scored_by"] = "local+llm"
+    return report
+
+def _fluency_lines(text_metrics):
+    """
+    Prompt lines for the timing and fluency numbers from TextAnalyzer, so the model doesn't have to
+    estimate them from the raw transcript. Metrics that couldn't be computed are left out.
+    """
+    lines = []
+    if text_metrics.get("articulation_wpm"):
+        lines.append(f"- Articulation Rate (excluding pauses): {text_metrics['articulation_wpm']:.0f} Words Per Minute")
+    rolling = text_metrics.get("rolling_wpm")
+    if rolling and len(rolling.get("values", [])) > 1:
+        lines.append(f"- Speaking Rate over {rolling['window_sec']:.0f}s windows: {rolling['min']:.0f}-{rolling['max']:.0f} WPM "
+                     f"(std {rolling['std']:.0f}; large swings mean uneven pacing)")
+    gaps = text_metrics.get("gaps")
+    if gaps:
+        lines.append(f"- Gaps Between Phrases: median {gaps['median_sec']:.2f}s, 90th percentile {gaps['p90_sec']:.2f}s, "
+                     f"{gaps['long_pause_count']} pauses of 1s or longer")
+    if "filler_count" in text_metrics:
+        fillers = ", ".join(f'"{word}" x{count}' for word, count in list(text_metrics.get("fillers", {}).items())[:5])
+        lines.append(f"- Filler Words: {text_metrics['filler_count']} ({text_metrics.get('filler_per_100_words', 0):.1f} per 100 words)"
+                     + (f": {fillers}" if fillers else ""))
+    if text_metrics.get("possible_filler_count"):
+        possible = ", ".join(f'"{word}" x{count}' for word, count in list(text_metrics["possible_fillers"].items())[:5])
+        lines.append(f"- Possible Fillers (discourse markers not set off by commas; judge from the transcript): {possible}")
+    if "repeated_words" in text_metrics:
+        lines.append(f"- Repetitions: {text_metrics['repeated_words']} repeated words, {text_metrics['repeated_phrases']} repeated two-word phrases")
+    if "segmental_ttr" in text_metrics:
+        lines.append(f"- Vocabulary Variety (type-token ratio per 50 words): {text_metrics['segmental_ttr']:.2f}")
+    return "\n".join(lines)
+
+
+def _transcript_block(transcript_text):
+    return f'**Speech Transcript:**\n"{transcript_text}"'
+
+
+def _section_prompt(section, index, count, level):
+    source = "Speech transcript" if level == 0 else "Notes on consecutive parts of the speech"
+    return f'**{source}, section {index} of {count}:**\n"{section}"\n'
+
+
+def _notes_block(notes, word_count):
+    """
+    Formats section notes (map results) as the transcript block of the final prompt.
+    Malformed entries are skipped.
+    """
+    lines = ["**Transcript Section Notes:**",
+             f"The transcript ({word_count} words) is too long to include, so here are notes on its {len(notes)} consecutive sections."]
+    for index, note in enumerate(notes, 1):
+        lines.append(f"Section {index}: {str(note.get('summary', '')).strip()}")
+        section_notes = note.get("notes")
+        if isinstance(section_notes, dict):
+            for name in CONTENT_CATEGORIES:
+                if section_notes.get(name):
+                    lines.append(f"  {name}: {str(section_notes[name]).strip()}")
+    return "\n".join(lines)
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from transcript import Segment
+
+
+class ResultCache:
+    def __init__(self, path, max_size_mb=512):
+        """
+        Persistent, content-addressed store for per-stage pipeline results, backed by SQLite.
+        Entries are evicted least-recently-used first once their total size exceeds max_size_mb.
+        """
+        self.path = path
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                stage TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_last_access ON results (last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def audio_hash(y, sr):
+        """
+        Hash of the decoded audio buffer, so re-encoded copies of the same recording still match.
+        """
+        digest = hashlib.sha256()
+        digest.update(str(sr).encode())
+        digest.update(np.ascontiguousarray(y, dtype=np.float32).tobytes())
+        return digest.hexdigest()
+
+    @staticmethod
+    def make_key(stage, **params):
+        """
+        Builds a cache key from a stage name and the parameters that determine its output.
+        """
+        payload = json.dumps(params, sort_keys=True, default=str)
+        return f"{stage}:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+    def get(self, key):
+        """
+        Returns the cached value for key, or None on a miss.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        data = json.dumps(value, default=_json_default)
+        stage = key.split(":", 1)[0]
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, stage, value, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, stage, data, len(data), time.time())
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # Called with self._lock held
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_size_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM results ORDER BY last_access ASC").fetchall()
+        for key, size in rows:
+            if total <= self.max_size_bytes:
+                break
+            self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+            total -= size
+
+    def stats(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT stage, COUNT(*), COALESCE(SUM(size), 0) FROM results GROUP BY stage"
+            ).fetchall()
+        return {
+            "max_size_mb": self.max_size_bytes / (1024 * 1024),
+            "stages": {stage: {"entries": count, "size_mb": size / (1024 * 1024)} for stage, count, size in rows}
+        }
+
+
+def _json_default(value):
+    if isinstance(value, Segment):
+        return value.to_dict()
+    # NumPy scalars and arrays that leak into metrics dicts
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,186 @@
+import numpy as np
+
+CATEGORIES = [
+    "Clarity and Voice", "Expression and Tone", "Fluency", "Length", "Pauses and Punctuation Awareness",
+    "Relevance and Creativity", "Sentence Size", "Spelling and Punctuation", "Story Structure", "Word Usage"
+]
+# Categories that depend on what was said rather than how; metrics can only approximate them,
+# so these are the ones worth asking an LLM about
+CONTENT_CATEGORIES = ["Relevance and Creativity", "Spelling and Punctuation", "Story Structure"]
+
+# Bands are (bad_low, good_low, good_high, bad_high): 10 inside the good range, falling linearly to 1
+# at the bad edges. Ramps are (bad, good): 1 at bad, 10 at good, either direction.
+DEFAULT_THRESHOLDS = {
+    "wpm": (80, 120, 160, 210),
+    "articulation_wpm": (100, 140, 190, 250),
+    "rolling_wpm_std": (40, 10),
+    "pitch_std_hz": (8, 30),
+    "filler_per_100_words": (10, 2),
+    "repetitions_per_100_words": (6, 1),
+    "duration_sec": (15, 60, 180, 420),
+    "pause_fraction": (0.02, 0.10, 0.25, 0.45),
+    "long_pauses_per_min": (6, 2),
+    "avg_sentence_length": (4, 10, 20, 35),
+    "sentence_words": (3, 35),  # sentences outside this many words look like transcription/punctuation trouble
+    "segmental_ttr": (0.45, 0.75),
+    "sentence_count": (2, 8),
+}
+
+RECOMMENDATIONS = {
+    "Clarity and Voice": "Articulate each word fully and keep a steady, moderate pace so every syllable is heard.",
+    "Expression and Tone": "Vary your pitch: lift it for questions and key points and let it fall at the end of statements.",
+    "Fluency": "Replace filler words with a short silent pause and avoid restarting sentences.",
+    "Length": "Plan your talk to fit about one to three minutes: an opening, two or three points, and a close.",
+    "Pauses and Punctuation Awareness": "Pause briefly at the end of each sentence and before important points, but keep pauses under a second.",
+    "Relevance and Creativity": "Use a concrete example or personal story to make your main point memorable.",
+    "Sentence Size": "Aim for sentences of 10 to 20 words: split long run-ons and combine very short fragments.",
+    "Spelling and Punctuation": "Finish each thought clearly before starting the next so sentence boundaries are easy to follow.",
+    "Story Structure": "Give your talk a clear beginning, middle and end, and signal each part.",
+    "Word Usage": "Swap repeated words for synonyms and use more specific vocabulary.",
+}
+
+
+class LocalScorer:
+    def __init__(self, thresholds=None):
+        """
+        Rule-based scorer for all ten report categories from AcousticAnalyzer and TextAnalyzer metrics.
+        Runs in well under a millisecond and needs no network, so it backs every report.
+        thresholds: overrides for DEFAULT_THRESHOLDS, by key.
+        """
+        self.thresholds = dict(DEFAULT_THRESHOLDS)
+        if thresholds:
+            self.thresholds.update(thresholds)
+
+    def score(self, transcript_text, acoustic_metrics, text_metrics):
+        """
+        Returns a report in the same shape as the LLM report: ratings, overall_summary and
+        improvement_recommendations.
+        """
+        t = self.thresholds
+        acoustic = acoustic_metrics or {}
+        text = text_metrics or {}
+        words = max(text.get("word_count", 0), 1)
+        duration = acoustic.get("duration_sec", 0)
+        ratings = {}
+
+        if not text.get("word_count"):
+            for category in CATEGORIES:
+                ratings[category] = _rating(1, "No speech was recognized in the recording.")
+            return self._report(ratings)
+
+        articulation = text.get("articulation_wpm") or text.get("wpm", 0)
+        filler_rate = text.get("filler_per_100_words", 0)
+        pitch_std = acoustic.get("pitch_std_hz", 0)
+        ratings["Clarity and Voice"] = _rating(
+            np.mean([_band(articulation, t["articulation_wpm"]), _ramp(filler_rate, t["filler_per_100_words"])]),
+            f"Articulation rate {articulation:.0f} WPM (target {t['articulation_wpm'][1]}-{t['articulation_wpm'][2]}), "
+            f"{filler_rate:.1f} fillers per 100 words."
+        )
+
+        ratings["Expression and Tone"] = _rating(
+            _ramp(pitch_std, t["pitch_std_hz"]),
+            f"Pitch varies by {pitch_std:.0f} Hz (std); {'lively' if pitch_std >= t['pitch_std_hz'][1] else 'flat' if pitch_std <= t['pitch_std_hz'][0] else 'moderate'} intonation."
+        )
+
+        wpm = text.get("wpm", 0)
+        repetitions = text.get("repeated_words", 0) + text.get("repeated_phrases", 0)
+        repetition_rate = repetitions / words * 100
+        rolling_std = (text.get("rolling_wpm") or {}).get("std")
+        fluency_parts = [_band(wpm, t["wpm"]), _ramp(filler_rate, t["filler_per_100_words"]),
+                         _ramp(repetition_rate, t["repetitions_per_100_words"])]
+        if rolling_std is not None and len((text.get("rolling_wpm") or {}).get("values", [])) > 1:
+            fluency_parts.append(_ramp(rolling_std, t["rolling_wpm_std"]))
+        ratings["Fluency"] = _rating(
+            np.mean(fluency_parts),
+            f"{wpm:.0f} WPM overall, {text.get('filler_count', 0)} filler words, {repetitions} repetitions"
+            + (f", pace varies by {rolling_std:.0f} WPM" if len(fluency_parts) == 4 else "") + "."
+        )
+
+        ratings["Length"] = _rating(
+            _band(duration, t["duration_sec"]),
+            f"{duration:.0f} seconds (target {t['duration_sec'][1]}-{t['duration_sec'][2]} s)."
+        )
+
+        pause_fraction = acoustic.get("pause_fraction", 0)
+        gaps = text.get("gaps") or {}
+        long_pauses = gaps.get("long_pause_count", 0)
+        long_pause_rate = long_pauses / (duration / 60) if duration > 0 else 0
+        ratings["Pauses and Punctuation Awareness"] = _rating(
+            np.mean([_band(pause_fraction, t["pause_fraction"]), _ramp(long_pause_rate, t["long_pauses_per_min"])]),
+            f"{pause_fraction:.0%} of the time is silence, {long_pauses} pauses of a second or more."
+        )
+
+        ttr = text.get("segmental_ttr", 0)
+        ratings["Relevance and Creativity"] = _rating(
+            np.mean([_ramp(ttr, t["segmental_ttr"]), _band(duration, t["duration_sec"])]),
+            "Estimated from vocabulary variety and length; content is not judged without AI feedback."
+        )
+
+        avg_sentence = text.get("avg_sentence_length", 0)
+        ratings["Sentence Size"] = _rating(
+            _band(avg_sentence, t["avg_sentence_length"]),
+            f"Sentences average {avg_sentence:.1f} words (target {t['avg_sentence_length'][1]}-{t['avg_sentence_length'][2]})."
+        )
+
+        lengths = np.array([len(s.split()) for s in _sentences(transcript_text)] or [0])
+        low, high = t["sentence_words"]
+        well_formed = float(np.mean((lengths >= low) & (lengths <= high)))
+        ratings["Spelling and Punctuation"] = _rating(
+            1 + 9 * well_formed,
+            f"{well_formed:.0%} of sentences have a clear boundary and a natural length ({low}-{high} words)."
+        )
+
+        sentence_count = text.get("sentence_count", 0)
+        ratings["Story Structure"] = _rating(
+            np.mean([_ramp(sentence_count, t["sentence_count"]), _band(duration, t["duration_sec"])]),
+            f"Estimated from {sentence_count} sentences over {duration:.0f} s; structure is not judged without AI feedback."
+        )
+
+        ratings["Word Usage"] = _rating(
+            _ramp(ttr, t["segmental_ttr"]),
+            f"Type-token ratio {ttr:.2f} per 50 words ({'varied' if ttr >= t['segmental_ttr'][1] else 'repetitive' if ttr <= t['segmental_ttr'][0] else 'fair'} vocabulary)."
+        )
+
+        return self._report(ratings)
+
+    def _report(self, ratings):
+        ordered = sorted(ratings.items(), key=lambda item: item[1]["score"])
+        average = np.mean([r["score"] for r in ratings.values()])
+        strongest = [name for name, r in reversed(ordered) if r["score"] >= 8][:2]
+        weakest = [name for name, r in ordered if r["score"] < 7][:3]
+
+        summary = f"Overall score {average:.1f}/10."
+        if strongest:
+            summary += f" Strongest: {' and '.join(strongest)}."
+        if weakest:
+            summary += f" Focus next on {', '.join(weakest)}."
+        return {
+            "ratings": {name: ratings[name] for name in CATEGORIES if name in ratings},
+            "overall_summary": summary,
+            "improvement_recommendations": [RECOMMENDATIONS[name] for name in weakest]
+                or ["Keep practising at this level and try a longer or more challenging topic."],
+            "scored_by": "local"
+        }
+
+
+def _band(value, limits):
+    bad_low, good_low, good_high, bad_high = limits
+    if good_low <= value <= good_high:
+        return 10.0
+    if value < good_low:
+        return _ramp(value, (bad_low, good_low))
+    return _ramp(value, (bad_high, good_high))
+
+
+def _ramp(value, limits):
+    bad, good = limits
+    position = (value - bad) / (good - bad) if good != bad else 1.0
+    return 1.0 + 9.0 * min(max(position, 0.0), 1.0)
+
+
+def _rating(score, reason):
+    return {"score": int(round(float(score))), "reason": reason}
+
+
+def _sentences(text):
+    return [s.strip() for s in text.replace('!', '.').replace('?', '.').replace('।', '.').split('.') if s.strip()]
@@ -1,25 +1,191 @@
+import dataclasses
+import os
+import time
 import whisper
 import torch
+from metrics import MODEL_LOADS, MODEL_LOAD_SECONDS
+from audio_processor import AudioProcessor, TARGET_SR
+from transcript import Segment, compact_segments
+
+PRECISIONS = ("fp32", "int8")
 
 class Transcriber:
-    def __init__(self, model_size="base"):
+    def __init__(self, model_size="base", precision="fp32", threads=None, mmap_dir=None):
+        """
+        precision: 'fp32' (full-precision weights) or 'int8' (dynamic int8 quantization of the
+            linear layers, CPU only; roughly halves resident size and speeds up CPU decoding).
+        threads: torch intra-op threads for this process. torch's setting is process-wide, so set it
+            per worker process to stop several workers oversubscribing the cores.
+        mmap_dir: on CPU, memory-map fp32 weights from a checkpoint exported to this directory on first
+            use (see _load_mmap), so every process on the host shares one copy of them in the page cache.
+        """
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision '{precision}'. Choose from: {', '.join(PRECISIONS)}")
+        if threads:
+            torch.set_num_threads(threads)
+
         device = "cuda" if torch.cuda.is_available() else "cpu"
-        print(f"Loading Whisper model '{model_size}' on {device}...")
-        self.model = whisper.load_model(model_size, device=device)
+        if precision == "int8" and device != "cpu":
+            print("int8 quantization runs on CPU only; loading on cpu")
+            device = "cpu"
+        self.device = device
+        self.precision = precision
+
+        print(f"Loading Whisper model '{model_size}' ({precision}) on {device}...")
+        start = time.perf_counter()
+        self.shared_weights = bool(mmap_dir) and device == "cpu"
+        if self.shared_weights:
+            self.model = _load_mmap(model_size, mmap_dir)
+        else:
+            self.model = whisper.load_model(model_size, device=device)
+        if precision == "int8":
+            self.model = _quantize_int8(self.model)
+        self.load_time = time.perf_counter() - start
+        MODEL_LOADS.inc(model_size=model_size, device=device, precision=precision)
+        MODEL_LOAD_SECONDS.observe(self.load_time, model_size=model_size)
 
-    def transcribe(self, audio_path, language=None):
+    def transcribe(self, audio, language=None, chunked=False, on_chunk=None, verbose=False):
         """
-        Transcribes the audio file.
-        Returns a dictionary with text and segments.
+        Transcribes audio given as a file path or a 16 kHz mono float32 NumPy array.
+        With chunked=True the audio is transcribed chunk by chunk (see transcribe_stream),
+        calling on_chunk(chunk) as each one finishes.
+        Returns a dictionary with text and segments. Segments are compact Segment objects
+        (id, start, end, text); verbose=True keeps Whisper's raw segment dicts with tokens and scores.
         """
+        if chunked:
+            texts = []
+            segments = []
+            detected_language = language
+            for chunk in self.transcribe_stream(audio, language=language, verbose=verbose):
+                texts.append(chunk["text"])
+                segments.extend(chunk["segments"])
+                detected_language = chunk["language"]
+                if on_chunk:
+                    on_chunk(chunk)
+            return {
+                "text": "".join(texts),
+                "segments": segments,
+                "language": detected_language
+            }
+
         print(f"Transcribing audio (Language: {language if language else 'Auto-detect'})...")
-        options = {}
+        options = {"fp16": self.device == "cuda"}
         if language:
             options["language"] = language
             
-        result = self.model.transcribe(audio_path, **options)
+        result = self.model.transcribe(audio, **options)
         return {
             "text": result["text"],
-            "segments": result["segments"],
+            "segments": result["segments"] if verbose else compact_segments(result["segments"]),
             "language": result["language"]
         }
+
+    def transcribe_stream(self, audio, language=None, max_chunk_sec=30, verbose=False):
+        """
+        Splits audio at silence boundaries and transcribes the chunks in order, yielding each
+        chunk's segments (with timestamps relative to the full recording) as soon as it is done.
+        The language detected on the first chunk is reused for the rest.
+        """
+        if isinstance(audio, str):
+            audio = whisper.load_audio(audio)
+
+        chunks = AudioProcessor().silence_chunks(audio, TARGET_SR, max_chunk_sec=max_chunk_sec)
+        print(f"Transcribing audio in {len(chunks)} chunk(s) (Language: {language if language else 'Auto-detect'})...")
+
+        segment_id = 0
+        previous_text = None
+        for index, (start, end) in enumerate(chunks):
+            options = {"fp16": self.device == "cuda"}
+            if language:
+                options["language"] = language
+            if previous_text:
+                # Carry context across chunk boundaries like Whisper does between its own windows
+                options["initial_prompt"] = previous_text
+
+            result = self.model.transcribe(audio[start:end], **options)
+            language = language or result["language"]
+            previous_text = result["text"]
+
+            offset = start / TARGET_SR
+            segments = []
+            for segment in result["segments"]:
+                if verbose:
+                    segment = dict(segment, id=segment_id, start=segment["start"] + offset, end=segment["end"] + offset)
+                else:
+                    segment = Segment(segment_id, segment["start"] + offset, segment["end"] + offset, segment["text"])
+                segments.append(segment)
+                segment_id += 1
+
+            yield {
+                "chunk": index,
+                "chunks": len(chunks),
+                "start": offset,
+                "end": end / TARGET_SR,
+                "text": result["text"],
+                "segments": segments,
+                "language": language
+            }
+
+
+def _quantize_int8(model):
+    """
+    Replaces the model's linear layers (attention projections and MLPs, nearly all of the weights)
+    with dynamically quantized int8 versions. Embeddings, convolutions and layer norms stay fp32.
+    """
+    # Whisper subclasses nn.Linear only to cast weights to the input dtype; quantize_dynamic
+    # matches exact types, so turn them back into plain nn.Linear first
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear):
+            module.__class__ = torch.nn.Linear
+    # In place: the default deep copy would briefly double the fp32 weights and unshare memory-mapped ones
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def _load_mmap(model_size, directory):
+    """
+    Builds the model around fp32 weights memory-mapped from directory/whisper-<size>-fp32.pt.
+    The mapping is copy-on-write and inference never writes to weights, so all processes that load
+    the same file read the same physical pages. Whisper's published checkpoints are fp16, so they
+    can't be mapped directly; the fp32 copy is exported once. Needs torch >= 2.1.
+    """
+    path = os.path.join(directory, f"whisper-{model_size}-fp32.pt")
+    if not os.path.exists(path):
+        _export_checkpoint(model_size, path)
+
+    checkpoint = torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+    model = whisper.model.Whisper(whisper.model.ModelDimensions(**checkpoint["dims"]))
+    # assign=True keeps the mapped tensors instead of copying them into the freshly initialized ones
+    model.load_state_dict(checkpoint["model_state_dict"], assign=True)
+    if model_size in whisper._ALIGNMENT_HEADS:
+        model.set_alignment_heads(whisper._ALIGNMENT_HEADS[model_size])
+    return model
+
+
+def _export_checkpoint(model_size, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Workers starting together wait for the first one's export instead of each writing a copy
+    with open(f"{path}.lock", "w") as lock:
+        _lock_exclusive(lock)
+        if os.path.exists(path):
+            return
+        print(f"Exporting fp32 weights of Whisper model '{model_size}' to {path}...")
+        model = whisper.load_model(model_size, device="cpu")
+        tmp_path = f"{path}.{os.getpid()}.part"
+        torch.save({"dims": dataclasses.asdict(model.dims), "model_state_dict": model.state_dict()}, tmp_path)
+        os.replace(tmp_path, path)
+
+
+def _lock_exclusive(f):
+    # Held until f is closed. fcntl is POSIX-only, so Windows locks the first byte with msvcrt
+    if os.name == "nt":
+        import msvcrt
+        while True:
+            try:
+                # LK_LOCK gives up after about 10 s of retries; an export can take longer
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+    else:
+        import fcntl
+        fcntl.flock(f, fcntl.LOCK_EX)
@@ -0,0 +1,117 @@
+import json
+
+import numpy as np
+
+TRANSCRIPT_FORMATS = ("json", "jsonl", "npz")
+
+
+class Segment:
+    """
+    One transcript segment: id, start and end (seconds) and text. Whisper's raw segments also carry
+    token ids, temperature, log-probability and compression fields; nothing downstream reads them,
+    and they make up most of a transcript's size, so they are dropped unless verbose output is asked for.
+    Supports segment["start"] and segment.get("text") like the raw dicts.
+    """
+    __slots__ = ("id", "start", "end", "text")
+
+    def __init__(self, id, start, end, text):
+        self.id = int(id)
+        # Whisper's timestamps are 20 ms apart; milliseconds keep remapped times exact enough
+        self.start = round(float(start), 3)
+        self.end = round(float(end), 3)
+        self.text = text
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def keys(self):
+        return self.__slots__
+
+    def to_dict(self):
+        return {"id": self.id, "start": self.start, "end": self.end, "text": self.text}
+
+    def __repr__(self):
+        return f"Segment({self.id}, {self.start}, {self.end}, {self.text!r})"
+
+
+def compact_segments(segments):
+    """
+    Converts raw Whisper segment dicts (or Segments) to Segments.
+    """
+    return [segment if isinstance(segment, Segment) else
+            Segment(segment.get("id", i), segment["start"], segment["end"], segment.get("text", ""))
+            for i, segment in enumerate(segments)]
+
+
+def write_transcript(transcript_data, path, fmt="json"):
+    """
+    Writes transcript data as:
+    json: one object, without indentation.
+    jsonl: a header line with the language, then one line per segment (the full text is the
+        concatenation of the segment texts), so large transcripts can be streamed line by line.
+    npz: compressed NumPy arrays: float32 start/end times, and every segment's text in one UTF-8
+        buffer with int64 offsets. The smallest format.
+    """
+    if fmt not in TRANSCRIPT_FORMATS:
+        raise ValueError(f"Unknown transcript format '{fmt}'. Choose from: {', '.join(TRANSCRIPT_FORMATS)}")
+    segments = transcript_data["segments"]
+
+    if fmt == "json":
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(transcript_data, f, ensure_ascii=False, separators=(",", ":"), default=_to_dict)
+    elif fmt == "jsonl":
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"language": transcript_data.get("language"), "segments": len(segments)}) + "\n")
+            for segment in segments:
+                f.write(json.dumps(_to_dict(segment), ensure_ascii=False, separators=(",", ":")) + "\n")
+    else:
+        encoded = [segment.get("text", "").encode("utf-8") for segment in segments]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(text) for text in encoded], out=offsets[1:])
+        with open(path, "wb") as f:
+            np.savez_compressed(
+                f,
+                start=np.array([segment["start"] for segment in segments], dtype=np.float32),
+                end=np.array([segment["end"] for segment in segments], dtype=np.float32),
+                text=np.frombuffer(b"".join(encoded), dtype=np.uint8),
+                text_offsets=offsets,
+                language=np.array(transcript_data.get("language") or "")
+            )
+
+
+def read_transcript(path):
+    """
+    Reads a transcript written by write_transcript (format from the extension) back into
+    {"text", "segments", "language"} with Segment objects.
+    """
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            text = data["text"].tobytes()
+            offsets = data["text_offsets"]
+            segments = [Segment(i, start, end, text[offsets[i]:offsets[i + 1]].decode("utf-8"))
+                        for i, (start, end) in enumerate(zip(data["start"], data["end"]))]
+            language = str(data["language"]) or None
+    elif path.endswith(".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            segments = compact_segments([json.loads(line) for line in f if line.strip()])
+        language = header.get("language")
+    else:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return {"text": data["text"], "segments": compact_segments(data["segments"]), "language": data.get("language")}
+
+    return {"text": "".join(segment.text for segment in segments), "segments": segments, "language": language}
+
+
+def _to_dict(value):
+    if isinstance(value, Segment):
+        return value.to_dict()
+    if isinstance(value, dict):
+        return value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,176 @@
+import asyncio
+import hashlib
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+import numpy as np
+import soundfile as sf
+
+from metrics import REGISTRY
+
+TTS_REQUESTS = REGISTRY.counter("speech_tts_requests_total", "TTS requests by outcome (hit, miss, shared)")
+
+
+class EdgeTTSSynthesizer:
+    """
+    Microsoft Edge neural voices via edge_tts (imported on first use).
+    """
+    extension = ".mp3"
+
+    async def synthesize(self, text, voice, path):
+        import edge_tts
+        communicate = edge_tts.Communicate(text, voice)
+        await communicate.save(path)
+
+
+class StubSynthesizer:
+    """
+    Offline stand-in for tests and load testing: writes a short tone whose length follows the text
+    (see expected_frames), after an optional artificial delay. error_rate is the fraction of
+    calls that fail, to exercise error handling under load.
+    """
+    extension = ".wav"
+
+    def __init__(self, delay_sec=0.0, sr=16000, error_rate=0.0):
+        self.delay_sec = delay_sec
+        self.sr = sr
+        self.error_rate = error_rate
+
+    @staticmethod
+    def expected_frames(text, sr=16000):
+        return int((min(0.05 * len(text), 10.0) + 0.1) * sr)
+
+    async def synthesize(self, text, voice, path):
+        if self.delay_sec:
+            await asyncio.sleep(self.delay_sec)
+        if self.error_rate and random.random() < self.error_rate:
+            raise RuntimeError("Injected TTS failure")
+        t = np.arange(self.expected_frames(text, self.sr)) / self.sr
+        sf.write(path, (0.1 * np.sin(2 * np.pi * 220 * t)).astype(np.float32), self.sr, subtype="PCM_16", format="WAV")
+
+
+class TTSCache:
+    def __init__(self, directory, synthesizer=None, max_size_mb=200, max_age_sec=7 * 24 * 3600, timeout=60):
+        """
+        Content-addressed store of synthesized speech keyed on (text, voice), so replayed tips are
+        served from disk. Concurrent requests for the same key share one synthesis (single flight).
+        Synthesis runs on one persistent event loop thread instead of an asyncio.run per request.
+        Files named tts_* in directory are evicted once older than max_age_sec, then oldest-used
+        first while their total size exceeds max_size_mb.
+        """
+        self.directory = directory
+        self.synthesizer = synthesizer or EdgeTTSSynthesizer()
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.max_age_sec = max_age_sec
+        self.timeout = timeout
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._inflight = {}  # filename -> Future shared by every request waiting on it
+
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.evictions = 0
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="tts-loop", daemon=True)
+        self._thread.start()
+
+    def filename(self, text, voice):
+        digest = hashlib.sha256(f"{voice}\0{text}".encode()).hexdigest()[:32]
+        return f"tts_{digest}{self.synthesizer.extension}"
+
+    def get(self, text, voice):
+        """
+        Returns the filename (inside directory) of the speech for text in voice, synthesizing it if needed.
+        """
+        filename = self.filename(text, voice)
+        path = os.path.join(self.directory, filename)
+
+        with self._lock:
+            if os.path.exists(path):
+                # mtime doubles as last access for eviction
+                os.utime(path)
+                self.hits += 1
+                TTS_REQUESTS.inc(outcome="hit")
+                return filename
+            future = self._inflight.get(filename)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[filename] = future
+                self.misses += 1
+            else:
+                self.shared += 1
+        TTS_REQUESTS.inc(outcome="miss" if leader else "shared")
+
+        if leader:
+            try:
+                self._synthesize(text, voice, path)
+                future.set_result(filename)
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._inflight.pop(filename, None)
+            self._evict(keep=filename)
+        return future.result()
+
+    def _synthesize(self, text, voice, path):
+        # Write under a temporary name so a half-written file is never served or counted as a hit
+        tmp_path = f"{path}.{threading.get_ident()}.part"
+        try:
+            task = asyncio.run_coroutine_threadsafe(self.synthesizer.synthesize(text, voice, tmp_path), self._loop)
+            try:
+                task.result(timeout=self.timeout)
+            except FutureTimeoutError:
+                # Only an alias of the builtin TimeoutError from Python 3.11
+                task.cancel()
+                raise RuntimeError(f"Speech synthesis timed out after {self.timeout}s")
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _evict(self, keep=None):
+        now = time.time()
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if not name.startswith("tts_") or name == keep or name.endswith(".part"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+            entries.sort()
+
+            total = sum(size for _, size, _ in entries)
+            keep_path = os.path.join(self.directory, keep) if keep else None
+            if keep_path and os.path.exists(keep_path):
+                total += os.path.getsize(keep_path)
+
+            for mtime, size, name in entries:
+                if now - mtime <= self.max_age_sec and total <= self.max_size_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+                total -= size
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "shared": self.shared,
+                "evictions": self.evictions,
+                "in_flight": len(self._inflight)
+            }
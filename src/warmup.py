@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from audio_processor import TARGET_SR
+from analyzer import AcousticAnalyzer, TextAnalyzer
+from pitch import PITCH_MODES
+
+
+def warmup_clip(duration_sec=2.0, sr=TARGET_SR):
+    """
+    A short voiced tone with a pause in the middle, enough to exercise pause detection,
+    both pitch trackers and a Whisper decode without shipping an audio file.
+    """
+    t = np.arange(int(duration_sec * sr)) / sr
+    f0 = 140 * (1 + 0.05 * np.sin(2 * np.pi * 0.7 * t))
+    phase = 2 * np.pi * np.cumsum(f0) / sr
+    y = 0.2 * sum(np.sin(k * phase) / k for k in range(1, 6))
+    y[len(y) * 2 // 5:len(y) * 3 // 5] = 0
+    return y.astype(np.float32)
+
+
+def warm_acoustic(pitch_modes=PITCH_MODES):
+    """
+    Runs the acoustic path once per pitch mode so librosa's numba kernels are compiled
+    before the first real request. Module-level so it can be a process pool's initializer.
+    """
+    y = warmup_clip()
+    timings = {}
+    for mode in pitch_modes:
+        start = time.perf_counter()
+        AcousticAnalyzer(pitch_mode=mode).analyze(y, TARGET_SR)
+        timings[f"acoustic_{mode}"] = time.perf_counter() - start
+    TextAnalyzer().analyze({"text": "Warm up.", "segments": [{"start": 0.0, "end": 1.0}]})
+    return timings
+
+
+def _worker_pid():
+    # Returns once the worker's initializer has run
+    time.sleep(0.05)
+    return os.getpid()
+
+
+class Warmup:
+    def __init__(self, registry, model_sizes=(), executor=None, executor_workers=1, pitch_modes=PITCH_MODES):
+        """
+        Preloads Whisper models into registry and JIT-warms the acoustic path on a background
+        thread, so the server can accept connections while it gets ready.
+        executor: the pool acoustic analysis runs on. Threads share this process's compiled kernels.
+            A process pool should be created with initializer=warm_acoustic, so every worker warms
+            itself before taking its first task; here warm-up only waits for the pool to start
+            (executor_workers tasks, which usually but not necessarily land on distinct workers).
+        """
+        self.registry = registry
+        self.model_sizes = list(model_sizes)
+        self.executor = executor
+        self.executor_workers = executor_workers
+        self.pitch_modes = pitch_modes
+
+        self.status = "pending"  # pending -> warming -> ready | failed
+        self.error = None
+        self.timings = {}
+        self._thread = None
+
+    def start(self):
+        self.status = "warming"
+        self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+        self._thread.start()
+
+    @property
+    def ready(self):
+        return self.status == "ready"
+
+    def _run(self):
+        start = time.perf_counter()
+        try:
+            self.timings.update(warm_acoustic(self.pitch_modes))
+            if isinstance(self.executor, ProcessPoolExecutor):
+                pool_start = time.perf_counter()
+                futures = [self.executor.submit(_worker_pid) for _ in range(self.executor_workers)]
+                self.timings["acoustic_workers"] = len({future.result() for future in futures})
+                self.timings["acoustic_pool"] = time.perf_counter() - pool_start
+
+            clip = warmup_clip()
+            for model_size in self.model_sizes:
+                print(f"Warming up Whisper model '{model_size}'...")
+                model_start = time.perf_counter()
+                with self.registry.acquire(model_size) as transcriber:
+                    # The first decode allocates buffers and picks kernels; pay for it here
+                    transcriber.transcribe(clip, language="en")
+                self.timings[f"model_{model_size}"] = time.perf_counter() - model_start
+        except Exception as e:
+            self.error = str(e)
+            self.status = "failed"
+            print(f"Warm-up failed: {e}")
+            return
+        self.timings["total"] = time.perf_counter() - start
+        self.status = "ready"
+        print(f"Warm-up finished in {self.timings['total']:.1f}s")
+
+    def to_dict(self):
+        return {
+            "status": self.status,
+            "error": self.error,
+            "model_sizes": self.model_sizes,
+            "timings": self.timings
+        }
@@ -1,27 +1,53 @@
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, Request, Response, render_template, request, jsonify, send_from_directory
 import os
 import sys
 import json
-import uuid
-from werkzeug.utils import secure_filename
-import subprocess
-import asyncio
-import edge_tts
+import gzip
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 # Add parent directory to path to import src modules
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from audio_processor import AudioProcessor
-from transcriber import Transcriber
-from analyzer import AcousticAnalyzer, TextAnalyzer
+from audio_processor import StreamingDecoder, AudioLimitError
+from model_registry import TranscriberRegistry
+from result_cache import ResultCache
+from pipeline import AnalysisPipeline
+from analyzer import AcousticAnalyzer
+from pitch import PITCH_MODES
 from reporter import Reporter
+from job_queue import JobQueue, QueueFullError
+from metrics import REGISTRY, REQUESTS, stage_timer, process_memory
+from warmup import Warmup, warm_acoustic
+from tts_cache import TTSCache, EdgeTTSSynthesizer, StubSynthesizer
+
+try:
+    import brotli  # optional; preferred over gzip when the client accepts it
+except ImportError:
+    brotli = None
+
+# Upload limits: encoded size (Flask answers 413 beyond it) and decoded duration
+MAX_UPLOAD_MB = float(os.getenv("MAX_UPLOAD_MB", "200"))
+MAX_AUDIO_SECONDS = float(os.getenv("MAX_AUDIO_SECONDS", "3600"))
+
+
+class StreamingUploadRequest(Request):
+    """
+    Pipes uploaded files straight into an ffmpeg decoder while the multipart body is parsed,
+    instead of spooling them to a temporary file. The only uploads this app accepts are audio.
+    """
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        decoder = StreamingDecoder(max_duration_sec=MAX_AUDIO_SECONDS,
+                                   max_input_bytes=int(MAX_UPLOAD_MB * 1024 * 1024))
+        self.environ.setdefault("speech.decoders", []).append(decoder)
+        return decoder
+
 
 app = Flask(__name__)
-app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(__file__), 'uploads')
+app.request_class = StreamingUploadRequest
 app.config['OUTPUT_FOLDER'] = os.path.join(os.path.dirname(__file__), 'output')
+app.config['MAX_CONTENT_LENGTH'] = int(MAX_UPLOAD_MB * 1024 * 1024)
 
 # Ensure directories exist
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['OUTPUT_FOLDER'], exist_ok=True)
 
 # Initialize components (lazily or globally)
@@ -29,90 +55,299 @@ os.makedirs(app.config['OUTPUT_FOLDER'], exist_ok=True)
 # Here we expect them in env vars or passed via args (but args are for CLI)
 # We will use env vars for the web app.
 
-# Global model cache
-LOADED_TRANSCRIBER = None
-CURRENT_MODEL_SIZE = None
+# Whisper weight precision ('fp32' or 'int8', CPU only) and torch threads for this process
+WHISPER_PRECISION = os.getenv("WHISPER_PRECISION", "fp32")
+TORCH_THREADS = int(os.environ["TORCH_THREADS"]) if os.getenv("TORCH_THREADS") else None
+# Memory-map fp32 weights exported to this directory so worker processes share one copy (see serve.py)
+WHISPER_MMAP_DIR = os.getenv("WHISPER_MMAP_DIR") or None
+
+def load_transcriber(model_size):
+    from transcriber import Transcriber
+    return Transcriber(model_size=model_size, precision=WHISPER_PRECISION, threads=TORCH_THREADS,
+                       mmap_dir=WHISPER_MMAP_DIR)
+
+# Resident Whisper models, shared by all job workers
+TRANSCRIBERS = TranscriberRegistry(
+    memory_budget_mb=float(os.getenv("WHISPER_MEMORY_BUDGET_MB", "4096")),
+    transcriber_factory=load_transcriber
+)
+
+# Per-stage results keyed by audio hash, so resubmitting a recording with new settings only redoes what changed
+RESULT_CACHE = None
+if os.getenv("RESULT_CACHE", "1") != "0":
+    RESULT_CACHE = ResultCache(
+        os.getenv("RESULT_CACHE_PATH", os.path.join(app.config['OUTPUT_FOLDER'], 'cache', 'results.sqlite')),
+        max_size_mb=float(os.getenv("RESULT_CACHE_MAX_MB", "512"))
+    )
+
+# Analysis jobs run on a bounded worker pool so HTTP threads return immediately.
+# Size it separately from the HTTP server: ANALYZE_WORKERS is CPU-bound work.
+JOB_QUEUE = JobQueue(
+    num_workers=int(os.getenv("ANALYZE_WORKERS", "1")),
+    max_queue=int(os.getenv("ANALYZE_MAX_QUEUE", "8")),
+    result_ttl=int(os.getenv("ANALYZE_RESULT_TTL", "600")),
+    id_prefix=os.getenv("JOB_ID_PREFIX", "")
+)
+
+# Decode 30-second windows from concurrent requests together in batched Whisper passes
+BATCH_INFERENCE = os.getenv("BATCH_INFERENCE", "0") == "1"
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "8"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "30"))
+
+# Trim silences before Whisper and pitch tracking (timestamps are mapped back to the original timeline)
+VAD_ENABLED = os.getenv("VAD", "1") != "0"
+
+# Reports are scored locally; the LLM only runs when the user asks for AI feedback, in this mode ('enrich' or 'full')
+REPORT_LLM_MODE = os.getenv("REPORT_LLM_MODE", "enrich")
+# Estimated tokens per LLM prompt; longer transcripts are summarized in sections first
+REPORT_TOKEN_BUDGET = int(os.getenv("REPORT_TOKEN_BUDGET", "8000"))
+
+# JSON responses at least this large are compressed for clients that accept gzip or brotli
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+
+# Seconds to wait for Groq before also asking Gemini (requires GEMINI_API_KEY); unset disables hedging
+LLM_HEDGE_DEADLINE = float(os.environ["LLM_HEDGE_DEADLINE"]) if os.getenv("LLM_HEDGE_DEADLINE") else None
+
+# Transcribe in silence-delimited chunks so partial transcripts can be streamed to the client
+STREAM_TRANSCRIPT = os.getenv("STREAM_TRANSCRIPT", "1") != "0"
+
+# Acoustic analysis runs alongside transcription. A process pool sidesteps the GIL
+# for pyin at the cost of copying the audio buffer to the worker. Each worker compiles
+# librosa's kernels when it starts, before its first task (WARMUP=0 skips this).
+if os.getenv("ACOUSTIC_EXECUTOR", "thread") == "process":
+    ACOUSTIC_EXECUTOR = ProcessPoolExecutor(max_workers=int(os.getenv("ACOUSTIC_WORKERS", "1")),
+                                            initializer=warm_acoustic if os.getenv("WARMUP", "1") != "0" else None)
+else:
+    ACOUSTIC_EXECUTOR = ThreadPoolExecutor(max_workers=int(os.getenv("ACOUSTIC_WORKERS", "1")))
+
+# Synthesized speech keyed on (text, voice), stored in the output folder with size/age eviction.
+# TTS_SYNTHESIZER=stub swaps edge_tts for an offline tone generator (tests, load testing), with
+# TTS_STUB_DELAY_SEC of latency and TTS_STUB_ERROR_RATE of failures injected.
+if os.getenv("TTS_SYNTHESIZER", "edge") == "stub":
+    TTS_SYNTHESIZER = StubSynthesizer(delay_sec=float(os.getenv("TTS_STUB_DELAY_SEC", "0")),
+                                      error_rate=float(os.getenv("TTS_STUB_ERROR_RATE", "0")))
+else:
+    TTS_SYNTHESIZER = EdgeTTSSynthesizer()
+TTS_CACHE = TTSCache(
+    app.config['OUTPUT_FOLDER'],
+    synthesizer=TTS_SYNTHESIZER,
+    max_size_mb=float(os.getenv("TTS_CACHE_MAX_MB", "200")),
+    max_age_sec=float(os.getenv("TTS_CACHE_MAX_AGE_SEC", str(7 * 24 * 3600)))
+)
+
+# Model sizes to load and warm up at startup (comma-separated, e.g. "medium,base"); /healthz
+# reports 503 until they are ready. WARMUP=0 skips warming the acoustic path as well.
+PRELOAD_MODELS = [size.strip() for size in os.getenv("PRELOAD_MODELS", "").split(",") if size.strip()]
+WARMUP = Warmup(TRANSCRIBERS, model_sizes=PRELOAD_MODELS, executor=ACOUSTIC_EXECUTOR,
+                executor_workers=int(os.getenv("ACOUSTIC_WORKERS", "1")))
+# Under the debug reloader only the child process (WERKZEUG_RUN_MAIN) serves requests
+if os.getenv("WARMUP", "1") != "0" and (__name__ != '__main__' or os.getenv("WERKZEUG_RUN_MAIN") == "true"):
+    WARMUP.start()
+else:
+    WARMUP.status = "ready"
+
+REGISTRY.gauge("speech_job_queue_depth", "Analysis jobs waiting for a worker", callback=JOB_QUEUE.depth)
+REGISTRY.gauge("speech_job_workers", "Analysis worker threads", callback=lambda: JOB_QUEUE.num_workers)
+REGISTRY.gauge("speech_process_resident_bytes", "Resident memory of this process",
+               callback=lambda: process_memory().get("rss_bytes", 0))
+REGISTRY.gauge("speech_process_shared_bytes", "Resident memory this process shares with others (e.g. mapped weights)",
+               callback=lambda: process_memory().get("shared_bytes", 0))
+
+@app.teardown_request
+def stop_decoders(exc):
+    # Kills ffmpeg for uploads that were rejected or disconnected before decoding finished
+    for decoder in request.environ.pop("speech.decoders", []):
+        decoder.abort()
+
+@app.after_request
+def compress(response):
+    # Event streams are left alone: each event has to reach the client as soon as it is written
+    if (response.is_streamed or response.direct_passthrough or response.mimetype != "application/json"
+            or "Content-Encoding" in response.headers):
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        encoding, body = "br", brotli.compress(data, quality=5)
+    elif accepted["gzip"]:
+        encoding, body = "gzip", gzip.compress(data, compresslevel=6)
+    else:
+        return response
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    return response
+
+@app.errorhandler(413)
+def too_large(e):
+    return jsonify({'error': f'Upload is larger than the {MAX_UPLOAD_MB:g} MB limit'}), 413
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+def run_analysis(job, y, sr, requested_model, language, groq_key, pitch_mode="pyin", ai_feedback=False):
+    """
+    Runs the full analysis pipeline for one decoded upload. Executed on a job worker thread.
+    """
+    # 1. Pipeline Execution
+    pipeline = AnalysisPipeline(acoustic_analyzer=AcousticAnalyzer(pitch_mode=pitch_mode), executor=ACOUSTIC_EXECUTOR,
+                                cache=RESULT_CACHE, vad=VAD_ENABLED)
+
+    # Use Groq by default for Web App if key is available. LLM clients are pooled across requests.
+    reporter = Reporter(api_key=None, provider="groq", groq_api_key=groq_key, hedge_deadline=LLM_HEDGE_DEADLINE,
+                        llm_mode=REPORT_LLM_MODE if ai_feedback else "off", token_budget=REPORT_TOKEN_BUDGET)
+
+    def publish_chunk(chunk):
+        # Partial transcripts are pushed to /jobs/<id>/events as they finish
+        job.update("transcript_partial", chunk=chunk["chunk"], chunks=chunk["chunks"],
+                   end=chunk["end"], text=chunk["text"])
+
+    def transcribe(audio, on_chunk):
+        if BATCH_INFERENCE:
+            with TRANSCRIBERS.scheduler(requested_model, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS) as scheduler:
+                return scheduler.transcribe(audio, language=language, on_chunk=on_chunk)
+        with TRANSCRIBERS.acquire(requested_model) as transcriber:
+            return transcriber.transcribe(audio, language=language, chunked=STREAM_TRANSCRIPT, on_chunk=on_chunk)
+
+    try:
+        result = pipeline.run(y, sr, transcribe, reporter, progress=job.update, on_chunk=publish_chunk,
+                              transcribe_params={"model_size": requested_model, "language": language,
+                                                 "chunked": STREAM_TRANSCRIPT, "batched": BATCH_INFERENCE,
+                                                 "precision": WHISPER_PRECISION})
+    except Exception:
+        REQUESTS.inc(outcome="error")
+        raise
+    REQUESTS.inc(outcome="ok")
+
+    return {
+        "transcript": result["transcript_data"]['text'],
+        "metrics": {
+            "acoustic": result["acoustic_metrics"],
+            "text": result["text_metrics"]
+        },
+        "report": result["report"],
+        "timings": result["timings"],
+        "cache_hits": result["cache_hits"],
+        "llm_usage": result["llm_usage"],
+        "vad": result["vad"]
+    }
+
 @app.route('/analyze', methods=['POST'])
 def analyze():
-    global LOADED_TRANSCRIBER, CURRENT_MODEL_SIZE
+    # Reject early if there is no room, before spending time on the upload
+    if JOB_QUEUE.depth() >= JOB_QUEUE.max_queue:
+        return jsonify({'error': 'Server busy, please retry shortly'}), 429
+
+    # Reading request.files streams the upload through ffmpeg (see StreamingUploadRequest)
+    try:
+        with stage_timer("decode"):
+            files = request.files
+            if 'audio' not in files:
+                return jsonify({'error': 'No audio file part'}), 400
+            file = files['audio']
+            if file.filename == '':
+                return jsonify({'error': 'No selected file'}), 400
+            # Decode once into a 16 kHz mono buffer shared by every stage
+            y, sr = file.stream.finish()
+    except AudioLimitError as e:
+        return jsonify({'error': str(e)}), 413
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 400
 
-    if 'audio' not in request.files:
-        return jsonify({'error': 'No audio file part'}), 400
-    
-    file = request.files['audio']
-    if file.filename == '':
-        return jsonify({'error': 'No selected file'}), 400
-    
     if file:
-        filename = secure_filename(f"{uuid.uuid4()}.wav")
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-        
+        requested_model = request.form.get('model_size', 'medium') # Default to medium
+
+        # Get language preference
+        language = request.form.get('language')
+        if language == 'auto':
+            language = None
+
+        groq_key = os.getenv("GROQ_API_KEY") or request.form.get('api_key')
+
+        pitch_mode = request.form.get('pitch_mode', 'pyin')
+        if pitch_mode not in PITCH_MODES:
+            return jsonify({'error': f'Unknown pitch mode: {pitch_mode}'}), 400
+
+        ai_feedback = request.form.get('ai_feedback') == '1'
+
         try:
-            # 1. Pipeline Execution
-            audio_processor = AudioProcessor()
-            
-            # Model Caching Logic
-            requested_model = request.form.get('model_size', 'medium') # Default to medium
-            
-            if LOADED_TRANSCRIBER is None or CURRENT_MODEL_SIZE != requested_model:
-                print(f"Switching model from {CURRENT_MODEL_SIZE} to {requested_model}...")
-                LOADED_TRANSCRIBER = Transcriber(model_size=requested_model)
-                CURRENT_MODEL_SIZE = requested_model
-            
-            transcriber = LOADED_TRANSCRIBER
-            acoustic_analyzer = AcousticAnalyzer()
-            text_analyzer = TextAnalyzer()
-            
-            # Get language preference
-            language = request.form.get('language')
-            if language == 'auto':
-                language = None
-
-            # Use Groq by default for Web App if key is available
-            groq_key = os.getenv("GROQ_API_KEY") or request.form.get('api_key')
-            reporter = Reporter(api_key=None, provider="groq")
-            if groq_key:
-                reporter.groq_key = groq_key
-                reporter.client = __import__('groq').Groq(api_key=groq_key)
-                reporter.model_id = "llama-3.3-70b-versatile"
-            
-            # Process
-            wav_path = audio_processor.convert_to_wav(filepath)
-            
-            # Load audio for acoustic analysis
-            y, sr = audio_processor.load_audio_librosa(wav_path)
-            
-            transcript_data = transcriber.transcribe(wav_path, language=language)
-            acoustic_metrics = acoustic_analyzer.analyze(y, sr)
-            text_metrics = text_analyzer.analyze(transcript_data)
-            
-            report = reporter.generate_report(transcript_data['text'], acoustic_metrics, text_metrics, audio_path=wav_path)
-            
-            # Clean up temp file
-            # os.remove(filepath) 
-            
-            response_data = {
-                "transcript": transcript_data['text'],
-                "metrics": {
-                    "acoustic": acoustic_metrics,
-                    "text": text_metrics
-                },
-                "report": report
-            }
-            
-            return jsonify(response_data)
-
-        except Exception as e:
-            print(f"Error executing pipeline: {e}")
-            import traceback
-            traceback.print_exc()
-            return jsonify({'error': str(e)}), 500
+            job = JOB_QUEUE.submit(run_analysis, y, sr, requested_model, language, groq_key, pitch_mode, ai_feedback)
+        except QueueFullError as e:
+            return jsonify({'error': str(e)}), 429
+
+        return jsonify({
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': f'/jobs/{job.id}',
+            'events_url': f'/jobs/{job.id}/events'
+        }), 202
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = JOB_QUEUE.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """
+    Streams job progress as Server-Sent Events until the job finishes.
+    """
+    job = JOB_QUEUE.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+
+    def stream():
+        seen = 0
+        while True:
+            events = job.wait_for_events(seen, timeout=15)
+            for event in events:
+                yield f"data: {json.dumps(event)}\n\n"
+            seen += len(events)
+            if job.finished and seen >= len(job.events):
+                yield f"event: result\ndata: {json.dumps(job.to_dict())}\n\n"
+                return
+            if not events:
+                # Keep-alive comment so proxies don't drop an idle connection
+                yield ": keep-alive\n\n"
+
+    return Response(stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+@app.route('/metrics')
+def metrics():
+    return Response(REGISTRY.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/healthz')
+def healthz():
+    """
+    Readiness probe: 200 once startup warm-up has finished, 503 while warming or if it failed.
+    """
+    body = WARMUP.to_dict()
+    body["loaded_models"] = TRANSCRIBERS.loaded_models()
+    body["queue_depth"] = JOB_QUEUE.depth()
+    return jsonify(body), 200 if WARMUP.ready else 503
+
+@app.route('/models')
+def models():
+    return jsonify(TRANSCRIBERS.stats())
+
+@app.route('/memory')
+def memory():
+    """
+    This process's RSS split into shared and private memory (see metrics.process_memory).
+    """
+    body = {"pid": os.getpid(), "loaded_models": TRANSCRIBERS.loaded_models(), "shared_weights": WHISPER_MMAP_DIR is not None}
+    body.update(process_memory())
+    return jsonify(body)
+
+@app.route('/tts/stats')
+def tts_stats():
+    return jsonify(TTS_CACHE.stats())
 
 @app.route('/tts', methods=['POST'])
 def tts():
@@ -123,15 +358,8 @@ def tts():
     if not text:
         return jsonify({'error': 'No text provided'}), 400
     
-    output_filename = f"tts_{uuid.uuid4()}.mp3"
-    output_path = os.path.join(app.config['OUTPUT_FOLDER'], output_filename)
-    
-    async def generate_speech():
-        communicate = edge_tts.Communicate(text, voice)
-        await communicate.save(output_path)
-
     try:
-        asyncio.run(generate_speech())
+        output_filename = TTS_CACHE.get(text, voice)
         return jsonify({'audio_url': f'/output/{output_filename}'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -0,0 +1,189 @@
+"""
+Multi-process server for the web app (Linux/macOS).
+
+    python src/web/serve.py --workers 4 --port 5000
+
+The master binds the port and forks the workers before anything heavy is imported; every worker
+then imports app.py, loads Whisper from memory-mapped fp32 checkpoints (WHISPER_MMAP_DIR) and
+accepts connections on the shared socket. The weights are mapped from the same file by every
+worker, so the host holds one copy of them however many workers run.
+
+Jobs live in the worker that accepted the upload. Job ids carry the worker's index, and a
+worker that receives /jobs/<id> for another worker's job forwards it over that worker's
+loopback port, so clients can poll or stream any job through the shared port.
+GET /workers lists each worker's RSS, PSS and shared memory.
+"""
+import argparse
+import http.client
+import json
+import os
+import re
+import signal
+import socket
+import threading
+import time
+
+from werkzeug.serving import make_server
+
+DEFAULT_MMAP_DIR = os.path.join(os.getenv("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+                                "whisper", "mmap")
+
+JOB_PATH = re.compile(r"^/jobs/w(\d+)-")
+# Headers that describe one connection and must not be copied onto another
+HOP_BY_HOP = {"connection", "keep-alive", "transfer-encoding", "date", "server"}
+
+
+class WorkerRouter:
+    def __init__(self, app, index, peers):
+        """
+        WSGI middleware in front of a worker's app.
+        peers: (host, port) of every worker's loopback listener, by worker index.
+        """
+        self.app = app
+        self.index = index
+        self.peers = peers
+
+    def __call__(self, environ, start_response):
+        path = environ.get("PATH_INFO", "")
+        if path == "/workers":
+            return self._workers(start_response)
+        match = JOB_PATH.match(path)
+        if match:
+            owner = int(match.group(1))
+            if owner != self.index and owner < len(self.peers):
+                return _forward(environ, start_response, self.peers[owner])
+        return self.app(environ, start_response)
+
+    def _workers(self, start_response):
+        workers = []
+        for index, peer in enumerate(self.peers):
+            try:
+                conn = http.client.HTTPConnection(*peer, timeout=5)
+                conn.request("GET", "/memory")
+                info = json.loads(conn.getresponse().read())
+                conn.close()
+            except (OSError, ValueError) as e:
+                info = {"error": str(e)}
+            info["worker"] = index
+            workers.append(info)
+
+        totals = {key: sum(w.get(key, 0) for w in workers)
+                  for key in ("rss_bytes", "pss_bytes", "shared_bytes", "private_bytes")}
+        body = json.dumps({"workers": workers, "totals": totals}).encode()
+        start_response("200 OK", [("Content-Type", "application/json"), ("Content-Length", str(len(body)))])
+        return [body]
+
+
+def _forward(environ, start_response, peer):
+    """
+    Replays a GET on another worker and streams its response back (including Server-Sent Events).
+    """
+    path = environ.get("PATH_INFO", "")
+    if environ.get("QUERY_STRING"):
+        path += "?" + environ["QUERY_STRING"]
+    conn = http.client.HTTPConnection(*peer)
+    try:
+        # The body is relayed as is, so the owner may compress it for this client
+        headers = {"Accept": environ.get("HTTP_ACCEPT", "*/*"), "Accept-Encoding": environ.get("HTTP_ACCEPT_ENCODING", "identity")}
+        conn.request(environ["REQUEST_METHOD"], path, headers=headers)
+        response = conn.getresponse()
+    except OSError:
+        conn.close()
+        start_response("502 Bad Gateway", [("Content-Type", "application/json")])
+        return [json.dumps({"error": "Worker owning this job is unavailable"}).encode()]
+
+    headers = [(name, value) for name, value in response.getheaders() if name.lower() not in HOP_BY_HOP]
+    start_response(f"{response.status} {response.reason}", headers)
+
+    def body():
+        try:
+            while True:
+                data = response.read1(65536)
+                if not data:
+                    return
+                yield data
+        finally:
+            conn.close()
+
+    return body()
+
+
+def _run_worker(index, listener, internal, peers, host, port):
+    # Inherited from the master, which would otherwise kill siblings on SIGTERM
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    os.environ["JOB_ID_PREFIX"] = f"w{index}-"
+
+    import app as web_app
+
+    internal_server = make_server(*peers[index], web_app.app, threaded=True, fd=internal.fileno())
+    threading.Thread(target=internal_server.serve_forever, name="internal-http", daemon=True).start()
+
+    server = make_server(host, port, WorkerRouter(web_app.app, index, peers), threaded=True, fd=listener.fileno())
+    print(f"Worker {index} (pid {os.getpid()}) serving on {host}:{port}")
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the web app from several worker processes sharing Whisper weights")
+    parser.add_argument("--workers", type=int, default=2, help="Worker processes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--torch_threads", type=int, default=None,
+                        help="torch threads per worker (default: CPU count / workers)")
+    parser.add_argument("--mmap_dir", default=None,
+                        help=f"Directory of memory-mapped fp32 checkpoints (default: $WHISPER_MMAP_DIR or {DEFAULT_MMAP_DIR})")
+    args = parser.parse_args()
+
+    # Read by app.py in each worker
+    os.environ["WHISPER_MMAP_DIR"] = args.mmap_dir or os.getenv("WHISPER_MMAP_DIR") or DEFAULT_MMAP_DIR
+    threads = args.torch_threads or int(os.getenv("TORCH_THREADS") or 0) or max(1, (os.cpu_count() or 1) // args.workers)
+    os.environ["TORCH_THREADS"] = str(threads)
+
+    listener = socket.create_server((args.host, args.port), backlog=128)
+    internal = [socket.create_server(("127.0.0.1", 0)) for _ in range(args.workers)]
+    peers = [sock.getsockname()[:2] for sock in internal]
+
+    children = {}
+    stopping = False
+
+    def spawn(index):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                _run_worker(index, listener, internal[index], peers, args.host, args.port)
+            finally:
+                os._exit(1)
+        children[pid] = index
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    print(f"Starting {args.workers} workers on {args.host}:{args.port} ({threads} torch threads each, "
+          f"weights mapped from {os.environ['WHISPER_MMAP_DIR']})")
+    for index in range(args.workers):
+        spawn(index)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = children.pop(pid, None)
+        if index is not None and not stopping:
+            print(f"Worker {index} (pid {pid}) exited with status {status}; restarting")
+            time.sleep(1)
+            spawn(index)
+
+
+if __name__ == '__main__':
+    main()
@@ -103,9 +103,13 @@ document.addEventListener('DOMContentLoaded', () => {
 
         const language = document.getElementById('languageSelect').value;
         const modelSize = document.getElementById('modelSelect').value;
+        const pitchMode = document.getElementById('pitchSelect').value;
+        const aiFeedback = document.getElementById('aiFeedbackToggle').checked;
 
         formData.append('language', language);
         formData.append('model_size', modelSize);
+        formData.append('pitch_mode', pitchMode);
+        formData.append('ai_feedback', aiFeedback ? '1' : '0');
 
         try {
             const response = await fetch('/analyze', {
@@ -118,7 +122,10 @@ document.addEventListener('DOMContentLoaded', () => {
                 throw new Error(errData.error || "Analysis failed");
             }
 
-            const data = await response.json();
+            const job = await response.json();
+            const data = window.EventSource
+                ? await streamJob(job.events_url, job.status_url)
+                : await waitForJob(job.status_url);
             displayResults(data);
 
         } catch (err) {
@@ -130,6 +137,63 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     });
 
+    // Follows job progress over Server-Sent Events, showing partial transcripts as they arrive.
+    // Falls back to polling if the stream drops.
+    function streamJob(eventsUrl, statusUrl) {
+        return new Promise((resolve, reject) => {
+            const source = new EventSource(eventsUrl);
+            let partialTranscript = '';
+
+            source.onmessage = (e) => {
+                const event = JSON.parse(e.data);
+                if (event.stage === 'transcript_partial') {
+                    partialTranscript += event.text;
+                    resultSection.classList.remove('hidden');
+                    transcriptText.textContent = partialTranscript;
+                    statusText.textContent = `Transcribing... (${event.chunk + 1}/${event.chunks})`;
+                } else {
+                    statusText.textContent = `AI is evaluating speech... (${event.stage.replace(/_/g, ' ')})`;
+                }
+            };
+
+            source.addEventListener('result', (e) => {
+                source.close();
+                const job = JSON.parse(e.data);
+                if (job.status === 'done') {
+                    resolve(job.result);
+                } else {
+                    reject(new Error(job.error || "Analysis failed"));
+                }
+            });
+
+            source.onerror = () => {
+                source.close();
+                waitForJob(statusUrl).then(resolve, reject);
+            };
+        });
+    }
+
+    // Polls the job status endpoint until the analysis finishes
+    async function waitForJob(statusUrl) {
+        while (true) {
+            const res = await fetch(statusUrl);
+            const job = await res.json();
+
+            if (!res.ok) {
+                throw new Error(job.error || "Lost track of analysis job");
+            }
+            if (job.status === 'done') {
+                return job.result;
+            }
+            if (job.status === 'failed') {
+                throw new Error(job.error || "Analysis failed");
+            }
+
+            statusText.textContent = `AI is evaluating speech... (${job.stage.replace(/_/g, ' ')})`;
+            await new Promise(resolve => setTimeout(resolve, 1000));
+        }
+    }
+
     function displayResults(data) {
         resultSection.classList.remove('hidden');
 
@@ -147,7 +211,8 @@ document.addEventListener('DOMContentLoaded', () => {
             { label: "WPM", val: fmt(data.metrics.text.wpm, 0) },
             { label: "Pitch (Hz)", val: fmt(data.metrics.acoustic.pitch_mean_hz, 0) },
             { label: "Pitch Var", val: fmt(data.metrics.acoustic.pitch_std_hz, 0) },
-            { label: "Pauses", val: fmt(data.metrics.acoustic.pause_fraction * 100, 1) + "%" }
+            { label: "Pauses", val: fmt(data.metrics.acoustic.pause_fraction * 100, 1) + "%" },
+            { label: "Fillers", val: data.metrics.text.filler_count ?? "-" }
         ];
 
         metrics.forEach(m => {
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Make src modules and the synthetic audio generator importable, as in benchmarks/
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(ROOT, 'src'))
+sys.path.append(os.path.join(ROOT, 'benchmarks'))
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from analyzer import AcousticAnalyzer, RunningStats, TextAnalyzer
+from audio_processor import AudioProcessor
+from synthetic_audio import synthesize_speech_like
+
+
+def test_running_stats_match_numpy():
+    values = np.random.default_rng(0).normal(150, 30, 10000)
+    stats = RunningStats()
+    for block in np.array_split(values, 7):
+        stats.update(block)
+    stats.update(np.array([]))
+
+    assert stats.count == len(values)
+    assert stats.mean == pytest.approx(values.mean())
+    assert stats.std == pytest.approx(values.std())
+
+
+@pytest.mark.parametrize("pitch_mode", ["fast", "pyin"])
+def test_blockwise_pitch_matches_single_pass(pitch_mode):
+    y = synthesize_speech_like(8, seed=1)
+    single = AcousticAnalyzer(pitch_mode, block_sec=1000).analyze(y, 16000)
+    blockwise = AcousticAnalyzer(pitch_mode, block_sec=2).analyze(y, 16000)
+
+    assert blockwise == pytest.approx(single, rel=1e-9)
+    assert 90 < single["pitch_mean_hz"] < 250
+
+
+def test_blockwise_pitch_matches_single_pass_with_vad():
+    y = synthesize_speech_like(8, seed=2)
+    timeline = AudioProcessor().detect_speech(y, 16000)
+    single = AcousticAnalyzer("fast", block_sec=1000).analyze(y, 16000, timeline)
+    blockwise = AcousticAnalyzer("fast", block_sec=2).analyze(y, 16000, timeline)
+
+    assert blockwise == pytest.approx(single, rel=1e-9)
+
+
+def _text_metrics(text, language="en"):
+    return TextAnalyzer().analyze({"text": text, "segments": [{"start": 0.0, "end": 10.0, "text": text}],
+                                   "language": language})
+
+
+def test_discourse_markers_count_as_fillers_only_when_set_off():
+    metrics = _text_metrics("I like pizza. Like, it was, um, like huge - you know - and I kind of liked it, kind of.")
+
+    assert metrics["fillers"] == {"like": 2, "um": 1, "you know": 1, "kind of": 1}
+    assert metrics["filler_count"] == 5
+    assert metrics["possible_fillers"] == {"like": 1, "kind of": 1}
+    assert metrics["word_count"] == 19
+
+
+def test_hindi_marker_in_ordinary_use_is_only_a_possible_filler():
+    metrics = _text_metrics("अच्छा है। अच्छा, तो हम्म हम गए।", language="hi")
+
+    assert metrics["fillers"] == {"अच्छा": 1, "हम्म": 1}
+    assert metrics["possible_fillers"] == {"अच्छा": 1}
+
+
+def test_rate_and_repetition_metrics():
+    text = "the the cat sat on the mat"
+    metrics = TextAnalyzer().analyze({"text": text, "language": "en", "segments": [
+        {"start": 0.0, "end": 2.0, "text": "the the cat"}, {"start": 3.0, "end": 5.0, "text": "sat on the mat"}]})
+
+    assert metrics["word_count"] == 7
+    assert metrics["wpm"] == pytest.approx(7 / (5 / 60))
+    assert metrics["articulation_wpm"] == pytest.approx(7 / (4 / 60))
+    assert metrics["gaps"]["count"] == 1 and metrics["gaps"]["max_sec"] == pytest.approx(1.0)
+    assert metrics["repeated_words"] == 1
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from audio_processor import AudioProcessor, SpeechTimeline
+from synthetic_audio import synthesize_speech_like
+from transcript import Segment
+
+
+@pytest.fixture
+def timeline():
+    # 100 Hz "audio" of 10 s with speech at 1-2 s and 5-6 s
+    return SpeechTimeline([(100, 200), (500, 600)], [(100, 200), (500, 600)], 100, 1000)
+
+
+def test_to_original_maps_compacted_times_back(timeline):
+    assert timeline.to_original(0.0) == 1.0
+    assert timeline.to_original(0.5) == 1.5
+    assert timeline.to_original(1.5) == 5.5
+    # Past the end of the speech clamps to the end of the last span
+    assert timeline.to_original(3.0) == 6.0
+    assert timeline.speech_samples == 200
+    assert timeline.removed_sec == 8.0
+
+
+def test_remap_transcript_and_chunk_share_one_clock(timeline):
+    segments = [Segment(0, 0.25, 0.75, " One."), {"id": 1, "start": 1.2, "end": 1.8, "text": " Two.",
+                                                  "words": [{"word": "Two", "start": 1.2, "end": 1.8}]}]
+    final = timeline.remap_transcript({"text": " One. Two.", "segments": segments, "language": "en"})
+    chunk = timeline.remap_chunk({"chunk": 1, "chunks": 2, "start": 1.0, "end": 2.0, "text": " Two.",
+                                  "segments": segments[1:], "language": "en"})
+
+    assert (final["segments"][0].start, final["segments"][0].end) == (1.25, 1.75)
+    assert (final["segments"][1]["start"], final["segments"][1]["end"]) == (5.2, 5.8)
+    assert final["segments"][1]["words"][0]["start"] == 5.2
+    assert (chunk["start"], chunk["end"]) == (5.0, 6.0)
+    assert chunk["segments"] == final["segments"][1:]
+    # Inputs are left on the compacted clock
+    assert segments[1]["start"] == 1.2
+
+
+def test_detect_speech_compacts_to_spans():
+    y = synthesize_speech_like(12, seed=0)
+    timeline = AudioProcessor().detect_speech(y, 16000)
+    compact = timeline.compact(y)
+
+    assert 0 < len(compact) < len(y)
+    assert len(compact) == timeline.speech_samples
+    np.testing.assert_array_equal(np.concatenate(list(timeline.iter_compact(y, block_len=4096))), compact)
+
+
+def test_detect_speech_keeps_silent_audio_whole():
+    y = np.zeros(16000, dtype=np.float32)
+    timeline = AudioProcessor().detect_speech(y, 16000)
+    assert timeline.compact(y) is y
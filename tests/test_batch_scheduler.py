@@ -0,0 +1,158 @@
+import threading
+import time
+import types
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("whisper")
+
+from audio_processor import TARGET_SR
+from batch_scheduler import WhisperBatchScheduler
+
+EOT = 50000
+TIMESTAMP_BEGIN = 50001
+TOKENIZER = types.SimpleNamespace(eot=EOT, timestamp_begin=TIMESTAMP_BEGIN,
+                                  decode=lambda tokens: "".join(f" r{t // 100}s{t % 100}" for t in tokens))
+
+
+class FakeModel:
+    """
+    Stands in for a Whisper model. Each "mel" is (first sample, window length) of its window, and
+    decoding answers with one segment whose text names the request and window it came from.
+    """
+    dims = types.SimpleNamespace(n_mels=80)
+
+    def __init__(self, delay_sec=0.0):
+        self.delay_sec = delay_sec
+        self.batches = []
+
+    def parameters(self):
+        return iter([torch.zeros(1)])
+
+    def decode(self, mels, options):
+        self.batches.append((options.language, len(mels)))
+        time.sleep(self.delay_sec)
+        results = []
+        for first_sample, length in mels.tolist():
+            request, start = divmod(first_sample, 1000)
+            text_token = int(request) * 100 + round(start)
+            results.append(types.SimpleNamespace(
+                tokens=[TIMESTAMP_BEGIN, text_token, TIMESTAMP_BEGIN + round(length / 0.02), EOT],
+                no_speech_prob=0.0, avg_logprob=-0.2, temperature=0.0, compression_ratio=1.0))
+        return results
+
+
+def speech(request, seconds):
+    # Sample values encode the request and the time, so the fake model can tell windows apart
+    return (request * 1000 + np.arange(int(seconds * TARGET_SR)) / TARGET_SR).astype(np.float32)
+
+
+@pytest.fixture
+def make_scheduler():
+    schedulers = []
+
+    def make(model=None, **kwargs):
+        model = model or FakeModel()
+        scheduler = WhisperBatchScheduler(types.SimpleNamespace(model=model), threading.Lock(), **kwargs)
+        scheduler._mel = lambda audio: torch.tensor([float(audio[0]), len(audio) / TARGET_SR], dtype=torch.float64)
+        scheduler._tokenizer = lambda language: TOKENIZER
+        schedulers.append(scheduler)
+        return scheduler, model
+
+    yield make
+    for scheduler in schedulers:
+        scheduler.stop()
+
+
+def transcribe_concurrently(scheduler, requests, seconds, languages=None):
+    results = {}
+    barrier = threading.Barrier(len(requests))
+
+    def run(request):
+        barrier.wait()
+        results[request] = scheduler.transcribe(speech(request, seconds), language=(languages or {}).get(request, "en"))
+
+    threads = [threading.Thread(target=run, args=(request,)) for request in requests]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_windows_are_batched_and_returned_to_their_request(make_scheduler):
+    scheduler, model = make_scheduler(max_batch_size=8, max_wait_ms=200)
+    results = transcribe_concurrently(scheduler, [1, 2, 3, 4], seconds=75)
+
+    for request, result in results.items():
+        # 75 s of uninterrupted voice is cut into 30 + 30 + 15 s windows
+        segments = result["segments"]
+        assert [segment.text for segment in segments] == [f" r{request}s0", f" r{request}s30", f" r{request}s60"]
+        assert [(segment.start, segment.end) for segment in segments] == [(0.0, 30.0), (30.0, 60.0), (60.0, 75.0)]
+        assert [segment.id for segment in segments] == [0, 1, 2]
+        assert result["text"] == "".join(segment.text for segment in segments)
+
+    stats = scheduler.stats()
+    assert stats["windows"] == 12
+    assert stats["batches"] < 12
+    assert max(size for _, size in model.batches) <= 8
+
+
+def test_batches_never_exceed_max_batch_size(make_scheduler):
+    scheduler, model = make_scheduler(max_batch_size=2, max_wait_ms=200)
+    transcribe_concurrently(scheduler, [1, 2, 3], seconds=75)
+    assert sum(size for _, size in model.batches) == 9
+    assert max(size for _, size in model.batches) == 2
+
+
+def test_lone_window_is_flushed_after_max_wait(make_scheduler):
+    scheduler, model = make_scheduler(max_batch_size=8, max_wait_ms=100)
+    started = time.perf_counter()
+    result = scheduler.transcribe(speech(1, 5), language="en")
+
+    assert [segment.text for segment in result["segments"]] == [" r1s0"]
+    assert model.batches == [("en", 1)]
+    assert 0.09 <= scheduler.stats()["mean_wait_sec"] and time.perf_counter() - started < 2
+
+
+def test_languages_are_decoded_separately(make_scheduler):
+    scheduler, model = make_scheduler(max_batch_size=8, max_wait_ms=200)
+    results = transcribe_concurrently(scheduler, [1, 2], seconds=20, languages={1: "en", 2: "hi"})
+
+    assert sorted(model.batches) == [("en", 1), ("hi", 1)]
+    assert results[2]["language"] == "hi" and results[2]["segments"][0].text == " r2s0"
+
+
+def test_chunks_are_reported_in_order(make_scheduler):
+    scheduler, _ = make_scheduler(max_wait_ms=10)
+    chunks = []
+    scheduler.transcribe(speech(1, 75), language="en", on_chunk=chunks.append)
+
+    assert [(chunk["chunk"], chunk["chunks"], chunk["start"], chunk["end"]) for chunk in chunks] == [
+        (0, 3, 0.0, 30.0), (1, 3, 30.0, 60.0), (2, 3, 60.0, 75.0)]
+
+
+def test_empty_audio_is_not_decoded(make_scheduler):
+    scheduler, model = make_scheduler()
+    assert scheduler.transcribe(np.zeros(0, dtype=np.float32), language="en") == {
+        "text": "", "segments": [], "language": "en"}
+    assert model.batches == []
+
+
+def test_stop_waits_for_registered_requests(make_scheduler):
+    scheduler, _ = make_scheduler(max_wait_ms=10)
+    assert scheduler.register()
+    scheduler.stop()
+
+    # Still serving the request registered before stop
+    assert scheduler.transcribe(speech(1, 5), language="en")["text"] == " r1s0"
+    assert scheduler._thread.is_alive()
+
+    scheduler.release()
+    scheduler._thread.join(timeout=5)
+    assert not scheduler._thread.is_alive()
+    assert not scheduler.register()
+    with pytest.raises(RuntimeError, match="shut down"):
+        scheduler.transcribe(speech(1, 5), language="en")
@@ -0,0 +1,44 @@
+import threading
+
+import pytest
+
+from job_queue import JobQueue, QueueFullError
+
+
+def test_submit_beyond_max_queue_raises():
+    release = threading.Event()
+    jobs = JobQueue(num_workers=1, max_queue=2)
+    running = jobs.submit(lambda job: release.wait(5))
+    # Once the worker has taken the first job, the queue holds only waiting jobs
+    assert running.wait_for_events(0, timeout=5)[0]["stage"] == "running"
+
+    jobs.submit(lambda job: None)
+    jobs.submit(lambda job: None)
+    with pytest.raises(QueueFullError):
+        jobs.submit(lambda job: None)
+    assert jobs.depth() == 2
+
+    release.set()
+
+
+def test_job_reports_progress_result_and_failure():
+    jobs = JobQueue(num_workers=1, max_queue=4, id_prefix="w0-")
+
+    def work(job, value):
+        job.update("halfway", done=1)
+        return value * 2
+
+    def fail(job):
+        raise ValueError("boom")
+
+    done = jobs.submit(work, 21)
+    failed = jobs.submit(fail)
+    for job in (done, failed):
+        while not job.finished:
+            job.wait_for_events(len(job.events), timeout=5)
+
+    assert done.id.startswith("w0-")
+    assert jobs.get(done.id) is done
+    assert done.to_dict()["status"] == "done" and done.result == 42
+    assert [event["stage"] for event in done.events] == ["running", "halfway", "done"]
+    assert failed.to_dict()["status"] == "failed" and "boom" in failed.error
@@ -0,0 +1,135 @@
+import types
+
+import pytest
+
+import llm_client
+from llm_client import LLMError, get_client, get_hedged_client
+from stub_llm import StubLLMServer, stub_report
+
+pytest.importorskip("groq")
+
+
+@pytest.fixture
+def delays(monkeypatch):
+    # Record backoff delays instead of sleeping through them
+    delays = []
+    monkeypatch.setattr(llm_client, "time", types.SimpleNamespace(sleep=delays.append))
+    monkeypatch.setenv("LLM_MAX_RETRIES", "3")
+    return delays
+
+
+@pytest.fixture
+def stub_server():
+    servers = []
+
+    def start(**kwargs):
+        kwargs.setdefault("latency_sec", 0.0)
+        servers.append(StubLLMServer(**kwargs).start())
+        return servers[-1]
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def groq_client(monkeypatch, server, name):
+    # get_client shares clients per (provider, key), so each test uses its own key
+    monkeypatch.setenv("GROQ_BASE_URL", server.url)
+    return get_client("groq", f"gsk_test_{name}")
+
+
+def test_rate_limit_honours_retry_after(monkeypatch, stub_server, delays):
+    server = stub_server(error_status=429, fail_first=2)
+    client = groq_client(monkeypatch, server, "429")
+    client.backoff_base = 30.0
+    usage = {}
+
+    assert client.generate_json("Rate this speech.", usage=usage) == stub_report()
+    assert server.stats() == {"requests": 3, "errors": 2}
+    assert delays == [1.0, 1.0]
+    assert usage["prompt_tokens"] > 0 and usage["completion_tokens"] > 0
+
+
+def test_server_error_is_retried_with_exponential_backoff(monkeypatch, stub_server, delays):
+    server = stub_server(error_status=500, fail_first=3)
+    client = groq_client(monkeypatch, server, "500")
+    client.backoff_base = 1.0
+
+    assert client.generate_json("Rate this speech.") == stub_report()
+    assert server.stats()["requests"] == 4
+    # Full backoff is 1, 2, 4 s, each scaled by a jitter factor in [0.5, 1]
+    assert [0.5 * 2 ** i <= delay <= 2 ** i for i, delay in enumerate(delays)] == [True] * 3
+
+
+def test_retries_are_bounded(monkeypatch, stub_server, delays):
+    server = stub_server(error_status=503, error_rate=1.0)
+    client = groq_client(monkeypatch, server, "503")
+
+    with pytest.raises(LLMError, match="after 4 attempt"):
+        client.generate_json("Rate this speech.")
+    assert server.stats()["requests"] == 4
+
+
+def test_client_error_is_not_retried(monkeypatch, stub_server, delays):
+    server = stub_server(error_status=400, error_rate=1.0)
+    client = groq_client(monkeypatch, server, "400")
+
+    with pytest.raises(LLMError, match="after 1 attempt"):
+        client.generate_json("Rate this speech.")
+    assert server.stats()["requests"] == 1
+    assert delays == []
+
+
+def test_gemini_client_is_retried_through_its_base_url(monkeypatch, stub_server, delays):
+    pytest.importorskip("google.genai")
+    server = stub_server(error_status=429, fail_first=1)
+    monkeypatch.setenv("GEMINI_BASE_URL", server.url)
+    client = get_client("gemini", "gemini-test-key")
+
+    assert client.generate_json("Rate this speech.") == stub_report()
+    assert server.stats()["requests"] == 2
+
+
+def hedge_pair(stub_server, primary_latency, primary_error_rate=0.0):
+    primary_server = stub_server(latency_sec=primary_latency, jitter=0.0, error_rate=primary_error_rate, error_status=400)
+    secondary_server = stub_server()
+    # Different model names give the two providers different prompt token counts
+    primary = llm_client.GroqClient("gsk_primary", model_id="primary-model-with-a-long-name", base_url=primary_server.url)
+    secondary = llm_client.GroqClient("gsk_secondary", model_id="secondary", base_url=secondary_server.url)
+    return primary, secondary, primary_server, secondary_server
+
+
+def test_hedge_fires_after_deadline_and_reports_winner_usage(stub_server):
+    primary, secondary, primary_server, secondary_server = hedge_pair(stub_server, primary_latency=2.0)
+    expected = {}
+    secondary.generate_json("Rate this speech.", usage=expected)
+
+    usage = {}
+    result = get_hedged_client(primary, secondary, 0.2).generate_json("Rate this speech.", usage=usage)
+
+    assert result == stub_report()
+    assert secondary_server.stats()["requests"] == 2
+    assert primary_server.stats()["requests"] == 1
+    assert usage == expected
+
+
+def test_hedge_waits_for_a_fast_primary(stub_server):
+    primary, secondary, primary_server, secondary_server = hedge_pair(stub_server, primary_latency=0.0)
+    usage = {}
+    get_hedged_client(primary, secondary, 5.0).generate_json("Rate this speech.", usage=usage)
+
+    assert secondary_server.stats()["requests"] == 0
+    assert usage["prompt_tokens"] > 0
+
+
+def test_hedge_starts_secondary_at_once_when_primary_fails(stub_server):
+    primary, secondary, primary_server, secondary_server = hedge_pair(stub_server, primary_latency=0.0,
+                                                                      primary_error_rate=1.0)
+    get_hedged_client(primary, secondary, 30.0).generate_json("Rate this speech.")
+    assert secondary_server.stats()["requests"] == 1
+
+
+def test_hedged_pairs_are_shared(stub_server):
+    primary, secondary, _, _ = hedge_pair(stub_server, primary_latency=0.0)
+    assert get_hedged_client(primary, secondary, 1.0) is get_hedged_client(primary, secondary, 1.0)
+    assert get_hedged_client(primary, secondary, 1.0) is not get_hedged_client(primary, secondary, 2.0)
@@ -0,0 +1,95 @@
+import sys
+import threading
+import types
+
+import pytest
+
+import model_registry
+from model_registry import TranscriberRegistry
+
+MB = 1024 * 1024
+SIZES = {"tiny": 100 * MB, "base": 200 * MB, "small": 500 * MB}
+
+
+class FakeTranscriber:
+    def __init__(self, model_size):
+        self.model_size = model_size
+
+
+class FakeScheduler:
+    """
+    Mirrors WhisperBatchScheduler's lifecycle: stop() lets registered requests finish, and
+    register() fails once the worker has exited.
+    """
+    def __init__(self, transcriber, lock, max_batch_size=8, max_wait_ms=30):
+        self.transcriber = transcriber
+        self.active = 0
+        self.stopping = False
+        self.exited = False
+        self._lock = threading.Lock()
+
+    def register(self):
+        with self._lock:
+            if self.exited:
+                return False
+            self.active += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+            self.exited = self.stopping and self.active == 0
+
+    def stop(self):
+        with self._lock:
+            self.stopping = True
+            self.exited = self.active == 0
+
+    def stats(self):
+        return {"active": self.active}
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(model_registry, "_model_size_bytes", lambda transcriber: SIZES[transcriber.model_size])
+    monkeypatch.setitem(sys.modules, "batch_scheduler", types.SimpleNamespace(WhisperBatchScheduler=FakeScheduler))
+    return TranscriberRegistry(memory_budget_mb=650, transcriber_factory=FakeTranscriber)
+
+
+def test_least_recently_used_model_is_evicted(registry):
+    for size in ("tiny", "base", "tiny"):
+        with registry.acquire(size) as transcriber:
+            assert transcriber.model_size == size
+    with registry.acquire("small"):
+        pass
+
+    assert registry.loaded_models() == ["tiny", "small"]
+    stats = registry.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (1, 3, 1)
+    assert stats["memory_used_mb"] == 600
+
+
+def test_requested_model_is_kept_even_over_budget(registry):
+    registry.memory_budget_bytes = 300 * MB
+    with registry.acquire("tiny"):
+        pass
+    with registry.acquire("small"):
+        pass
+    assert registry.loaded_models() == ["small"]
+
+
+def test_scheduler_is_shared_and_survives_eviction_until_released(registry):
+    with registry.scheduler("tiny") as scheduler:
+        with registry.scheduler("tiny") as again:
+            assert again is scheduler
+            assert scheduler.active == 2
+        with registry.acquire("base"), registry.acquire("small"):
+            pass
+        # Evicted while in use: stopped, but still serving the registered request
+        assert "tiny" not in registry.loaded_models()
+        assert scheduler.stopping and not scheduler.exited
+    assert scheduler.exited
+
+    with registry.scheduler("tiny") as reloaded:
+        assert reloaded is not scheduler
+        assert not reloaded.stopping
@@ -0,0 +1,96 @@
+import threading
+
+import pytest
+
+from prompt_builder import PromptBuilder
+from reporter import Reporter
+
+ACOUSTIC = {"duration_sec": 1200.0, "pause_fraction": 0.15, "pitch_std_hz": 35.0}
+TEXT = {"word_count": 24000, "wpm": 140.0, "avg_sentence_length": 8.0}
+LONG_TRANSCRIPT = " ".join(["This is a sentence about my summer holiday."] * 3000)
+
+
+def test_split_respects_budget_and_keeps_every_word():
+    builder = PromptBuilder(chars_per_token=4)
+    text = "First sentence here. Second one is a bit longer than the first! " + " ".join(["runon"] * 200)
+    chunks = builder.split(text, max_tokens=10)
+
+    assert all(len(chunk) <= 40 for chunk in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+
+def test_split_keeps_short_text_whole():
+    assert PromptBuilder().split("  One sentence. Two sentences.  ", 100) == ["One sentence. Two sentences."]
+
+
+def test_fits_and_room():
+    builder = PromptBuilder(token_budget=10, chars_per_token=4)
+    assert builder.fits("x" * 20, "y" * 15)
+    assert not builder.fits("x" * 20, "y" * 20)
+    assert builder.room("x" * 20, "y" * 4) == 10 - 7
+
+
+class RecordingClient:
+    model_id = "recording"
+
+    def __init__(self, fail_phase=None):
+        self.fail_phase = fail_phase
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def generate_json(self, prompt, audio_path=None, audio=None, system=None, usage=None):
+        phase = "map" if '"notes"' in system else "reduce"
+        with self._lock:
+            self.calls.append((phase, audio_path))
+        if phase == self.fail_phase:
+            raise RuntimeError("provider error")
+        usage.update(prompt_tokens=100, completion_tokens=10)
+        if phase == "map":
+            return {"summary": "The speaker describes a holiday.", "notes": {}}
+        return {"ratings": {}, "overall_summary": "Clear and well organized.", "improvement_recommendations": []}
+
+
+def make_reporter(client, token_budget=8000):
+    reporter = Reporter(api_key=None, provider="none", token_budget=token_budget)
+    reporter.client = client
+    reporter.provider = "stub"
+    reporter.model_id = client.model_id
+    return reporter
+
+
+def test_long_transcript_is_map_reduced():
+    client = RecordingClient()
+    reporter = make_reporter(client)
+    report = reporter.generate_report(LONG_TRANSCRIPT, ACOUSTIC, TEXT, audio_path="speech.wav")
+
+    assert not reporter.used_fallback
+    assert report["overall_summary"] == "Clear and well organized."
+    assert reporter.usage["sections"] > 1
+    assert reporter.usage["calls"] == len(client.calls) == reporter.usage["sections"] + 1
+    assert reporter.usage["prompt_tokens"] == 100 * reporter.usage["calls"]
+    # Sections are text only; the audio goes with the final call
+    assert [audio for phase, audio in client.calls if phase == "map"] == [None] * reporter.usage["sections"]
+    assert client.calls[-1] == ("reduce", "speech.wav")
+
+
+def test_short_transcript_is_a_single_call():
+    client = RecordingClient()
+    reporter = make_reporter(client)
+    reporter.generate_report("A short speech.", ACOUSTIC, TEXT)
+    assert reporter.usage["sections"] == 0
+    assert client.calls == [("reduce", None)]
+
+
+def test_failed_section_falls_back_to_local_report():
+    reporter = make_reporter(RecordingClient(fail_phase="map"))
+    report = reporter.generate_report(LONG_TRANSCRIPT, ACOUSTIC, TEXT)
+    assert reporter.used_fallback
+    assert report["overall_summary"].startswith("Overall score")
+
+
+def test_benchmark_stub_client_does_not_fall_back():
+    benchmark = pytest.importorskip("benchmark")
+    reporter = make_reporter(benchmark.StubLLMClient())
+    reporter.generate_report(LONG_TRANSCRIPT, ACOUSTIC, TEXT)
+    assert not reporter.used_fallback
+    assert reporter.usage["calls"] > 1
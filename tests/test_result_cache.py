@@ -0,0 +1,45 @@
+import numpy as np
+
+from result_cache import ResultCache
+from transcript import Segment
+
+
+def test_make_key_depends_on_stage_and_params_not_their_order():
+    key = ResultCache.make_key("acoustic", audio="abc", vad=True, pitch_mode="fast")
+    assert key == ResultCache.make_key("acoustic", pitch_mode="fast", vad=True, audio="abc")
+    assert key.startswith("acoustic:")
+    assert key != ResultCache.make_key("acoustic", audio="abc", vad=False, pitch_mode="fast")
+    assert key != ResultCache.make_key("transcript", audio="abc", vad=True, pitch_mode="fast")
+
+
+def test_audio_hash_follows_content_and_sample_rate():
+    y = np.linspace(-1, 1, 1000, dtype=np.float32)
+    assert ResultCache.audio_hash(y, 16000) == ResultCache.audio_hash(y.astype(np.float64), 16000)
+    assert ResultCache.audio_hash(y, 16000) != ResultCache.audio_hash(y, 8000)
+    assert ResultCache.audio_hash(y, 16000) != ResultCache.audio_hash(y[::-1], 16000)
+
+
+def test_round_trip_serializes_segments_and_numpy_values(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.sqlite"))
+    value = {"segments": [Segment(0, 0.0, 1.25, " Hi.")], "pitch": np.float32(120.5), "f0": np.arange(3)}
+    cache.put("transcript:1", value)
+
+    assert cache.get("transcript:1") == {"segments": [{"id": 0, "start": 0.0, "end": 1.25, "text": " Hi."}],
+                                         "pitch": 120.5, "f0": [0, 1, 2]}
+    assert cache.get("transcript:2") is None
+    assert cache.stats()["stages"]["transcript"]["entries"] == 1
+
+
+def test_evicts_least_recently_used_beyond_max_size(tmp_path):
+    entry = {"data": "x" * 1000}
+    # Room for two entries of about 1 KB
+    cache = ResultCache(str(tmp_path / "results.sqlite"), max_size_mb=2500 / (1024 * 1024))
+    cache.put("report:a", entry)
+    cache.put("report:b", entry)
+    # Reading a makes b the least recently used
+    assert cache.get("report:a") is not None
+    cache.put("report:c", entry)
+
+    assert cache.get("report:b") is None
+    assert cache.get("report:a") is not None
+    assert cache.get("report:c") is not None
@@ -0,0 +1,36 @@
+from scorer import CATEGORIES, LocalScorer
+
+ACOUSTIC = {"duration_sec": 120.0, "pause_fraction": 0.15, "pitch_std_hz": 35.0, "pitch_mean_hz": 150.0}
+TEXT = {"word_count": 280, "sentence_count": 16, "avg_sentence_length": 15.0, "wpm": 140.0, "articulation_wpm": 160.0,
+        "filler_count": 2, "filler_per_100_words": 0.7, "repeated_words": 1, "repeated_phrases": 0,
+        "segmental_ttr": 0.8, "gaps": {"long_pause_count": 1},
+        "rolling_wpm": {"std": 8.0, "values": [138.0, 142.0, 140.0]}}
+TRANSCRIPT = " ".join(["This sentence has exactly the number of words we are aiming for here."] * 16)
+
+
+def test_no_recognized_speech_scores_every_category_as_one():
+    report = LocalScorer().score("", ACOUSTIC, {"word_count": 0})
+    assert list(report["ratings"]) == CATEGORIES
+    assert all(rating["score"] == 1 for rating in report["ratings"].values())
+
+
+def test_metrics_in_target_ranges_score_high():
+    report = LocalScorer().score(TRANSCRIPT, ACOUSTIC, TEXT)
+    assert list(report["ratings"]) == CATEGORIES
+    assert all(rating["score"] >= 8 for rating in report["ratings"].values()), report["ratings"]
+    assert report["overall_summary"].startswith("Overall score")
+
+
+def test_fillers_lower_fluency_but_possible_fillers_do_not():
+    scorer = LocalScorer()
+    baseline = scorer.score(TRANSCRIPT, ACOUSTIC, TEXT)["ratings"]["Fluency"]["score"]
+    hesitant = scorer.score(TRANSCRIPT, ACOUSTIC, dict(TEXT, filler_count=28, filler_per_100_words=10.0))
+    possible = scorer.score(TRANSCRIPT, ACOUSTIC, dict(TEXT, possible_filler_count=28, possible_fillers={"like": 28}))
+
+    assert hesitant["ratings"]["Fluency"]["score"] < baseline
+    assert possible["ratings"]["Fluency"]["score"] == baseline
+
+
+def test_threshold_overrides():
+    strict = LocalScorer(thresholds={"duration_sec": (300, 400, 500, 600)})
+    assert strict.score(TRANSCRIPT, ACOUSTIC, TEXT)["ratings"]["Length"]["score"] == 1
@@ -0,0 +1,38 @@
+import pytest
+
+from transcript import Segment, compact_segments, read_transcript, write_transcript
+
+TRANSCRIPT = {
+    "text": " Hello there. नमस्ते, कैसे हो?",
+    "segments": [Segment(0, 0.0, 1.52, " Hello there."), Segment(1, 1.52, 3.04, " नमस्ते, कैसे हो?")],
+    "language": "hi",
+}
+
+
+@pytest.mark.parametrize("fmt", ["json", "jsonl", "npz"])
+def test_round_trip(tmp_path, fmt):
+    path = str(tmp_path / f"transcript.{fmt}")
+    write_transcript(TRANSCRIPT, path, fmt)
+    data = read_transcript(path)
+
+    assert data["text"] == TRANSCRIPT["text"]
+    assert data["language"] == "hi"
+    # npz stores float32 times; Segment's millisecond rounding recovers them exactly
+    assert [segment.to_dict() for segment in data["segments"]] == [segment.to_dict() for segment in TRANSCRIPT["segments"]]
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        write_transcript(TRANSCRIPT, str(tmp_path / "transcript.txt"), "txt")
+
+
+def test_compact_segments_drops_whisper_fields_and_rounds_times():
+    raw = [{"id": 3, "seek": 0, "start": 0.123456, "end": 1.98765, "text": " Hi.", "tokens": [1, 2],
+            "avg_logprob": -0.2, "no_speech_prob": 0.01}]
+    segment = compact_segments(raw)[0]
+
+    assert segment.to_dict() == {"id": 3, "start": 0.123, "end": 1.988, "text": " Hi."}
+    assert segment["text"] == segment.get("text") == " Hi."
+    assert segment.get("tokens") is None
+    with pytest.raises(KeyError):
+        segment["tokens"]
@@ -0,0 +1,59 @@
+import os
+import threading
+
+import pytest
+import soundfile as sf
+
+from tts_cache import StubSynthesizer, TTSCache
+
+VOICE = "en-US-AriaNeural"
+
+
+def test_concurrent_requests_share_one_synthesis(tmp_path):
+    cache = TTSCache(str(tmp_path), synthesizer=StubSynthesizer(delay_sec=0.2))
+    text = "Slow down between your main points."
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get(text, VOICE))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [cache.filename(text, VOICE)] * 8
+    assert cache.stats() == {"hits": 0, "misses": 1, "shared": 7, "evictions": 0, "in_flight": 0}
+    assert sf.info(os.path.join(tmp_path, results[0])).frames == StubSynthesizer.expected_frames(text)
+
+    cache.get(text, VOICE)
+    assert cache.stats()["hits"] == 1
+
+
+def test_key_depends_on_text_and_voice(tmp_path):
+    cache = TTSCache(str(tmp_path), synthesizer=StubSynthesizer())
+    assert cache.filename("Hi", VOICE) != cache.filename("Hi", "hi-IN-SwaraNeural")
+    assert cache.filename("Hi", VOICE) != cache.filename("Hello", VOICE)
+
+
+def test_failed_synthesis_raises_and_leaves_no_file(tmp_path):
+    cache = TTSCache(str(tmp_path), synthesizer=StubSynthesizer(error_rate=1.0))
+    with pytest.raises(RuntimeError):
+        cache.get("This will fail.", VOICE)
+    assert os.listdir(tmp_path) == []
+    assert cache.stats()["in_flight"] == 0
+
+
+def test_oldest_files_are_evicted_over_the_size_limit(tmp_path):
+    # Each stub file is about 80 KB (2.5 s of 16-bit audio at 16 kHz)
+    cache = TTSCache(str(tmp_path), synthesizer=StubSynthesizer(), max_size_mb=0.2)
+    texts = [f"Tip number {i} is to pause before the key point." for i in range(3)]
+    names = [cache.get(text, VOICE) for text in texts]
+
+    assert cache.stats()["evictions"] == 1
+    assert sorted(os.listdir(tmp_path)) == sorted(names[1:])
+
+
+def test_slow_synthesis_times_out_and_leaves_no_file(tmp_path):
+    cache = TTSCache(str(tmp_path), synthesizer=StubSynthesizer(delay_sec=2.0), timeout=0.1)
+    with pytest.raises(RuntimeError, match="timed out"):
+        cache.get("This takes too long.", VOICE)
+    assert os.listdir(tmp_path) == []
+    assert cache.stats()["in_flight"] == 0